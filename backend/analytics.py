@@ -0,0 +1,167 @@
+"""In-memory visit rollups.
+
+Visits are never stored one by one. Each is folded into hourly rollup
+documents (`{"id": "2026-01-01T13", "total": n, "pages": {...},
+"languages": {...}, "referrers": {...}}`) plus running totals over the
+retained hours, and only the per-hour deltas accumulated since the last
+flush are persisted.
+"""
+import logging
+from collections import Counter
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+from urllib.parse import urlsplit
+
+logger = logging.getLogger(__name__)
+
+DIMENSIONS = ("pages", "languages", "referrers")
+OTHER = "(other)"
+DIRECT = "(direct)"
+
+
+def hour_bucket(ts: datetime) -> str:
+    return ts.strftime("%Y-%m-%dT%H")
+
+
+def normalize_page(page: str) -> str:
+    try:
+        path = urlsplit(page or "/").path or "/"
+    except ValueError:  # e.g. "http://[oops"
+        return OTHER
+    return path[:200]
+
+
+def normalize_referrer(referrer: Optional[str]) -> str:
+    if not referrer:
+        return DIRECT
+    try:
+        host = urlsplit(referrer if "//" in referrer else "//" + referrer).hostname
+    except ValueError:
+        return DIRECT
+    return (host or DIRECT)[:100]
+
+
+def normalize_language(language: Optional[str]) -> str:
+    return (language or "en").strip().lower()[:8] or "en"
+
+
+class VisitRollups:
+    def __init__(self, max_keys: int = 500, retention_hours: int = 24 * 90):
+        self.max_keys = max_keys
+        self.retention_hours = retention_hours
+        self.reset()
+
+    def reset(self):
+        self.hours: Dict[str, dict] = {}
+        self.total = 0
+        self.totals = {dim: Counter() for dim in DIMENSIONS}
+        self._pending: Dict[str, dict] = {}
+
+    def load(self, docs: List[dict]):
+        self.reset()
+        self.merge(docs)
+
+    def merge(self, docs: List[dict]):
+        """Add already-persisted hourly rollups, e.g. imported ones."""
+        for doc in docs:
+            self._merge(self.hours.setdefault(doc["id"], self._empty(doc["id"])), doc)
+            self.total += doc.get("total", 0)
+            for dim in DIMENSIONS:
+                self.totals[dim].update(doc.get(dim) or {})
+        self._expire()
+
+    @staticmethod
+    def _empty(hour: str) -> dict:
+        return {"id": hour, "total": 0, **{dim: {} for dim in DIMENSIONS}}
+
+    @staticmethod
+    def _merge(into: dict, delta: dict):
+        into["total"] = into.get("total", 0) + delta.get("total", 0)
+        for dim in DIMENSIONS:
+            counts = into.setdefault(dim, {})
+            for key, n in (delta.get(dim) or {}).items():
+                counts[key] = counts.get(key, 0) + n
+
+    def _key(self, counts: dict, key: str) -> str:
+        # Cap cardinality per hour so a crawler can't blow up the rollups.
+        if key in counts or len(counts) < self.max_keys:
+            return key
+        return OTHER
+
+    def record(self, page: str, language: Optional[str], referrer: Optional[str], ts: datetime):
+        hour = hour_bucket(ts)
+        values = {
+            "pages": normalize_page(page),
+            "languages": normalize_language(language),
+            "referrers": normalize_referrer(referrer),
+        }
+        rollup = self.hours.get(hour)
+        if rollup is None:
+            rollup = self.hours[hour] = self._empty(hour)
+            self._expire()
+        pending = self._pending.get(hour)
+        if pending is None:
+            pending = self._pending[hour] = self._empty(hour)
+        rollup["total"] += 1
+        pending["total"] += 1
+        self.total += 1
+        for dim, value in values.items():
+            key = self._key(rollup[dim], value)
+            rollup[dim][key] = rollup[dim].get(key, 0) + 1
+            pending[dim][key] = pending[dim].get(key, 0) + 1
+            self.totals[dim][key] += 1
+
+    def _expire(self):
+        if len(self.hours) <= self.retention_hours:
+            return
+        for hour in sorted(self.hours)[:len(self.hours) - self.retention_hours]:
+            expired = self.hours.pop(hour)
+            self.total -= expired["total"]
+            for dim in DIMENSIONS:
+                self.totals[dim].subtract(expired[dim])
+                self.totals[dim] += Counter()  # drop keys that reached zero
+
+    def take_pending(self) -> List[dict]:
+        """Deltas since the last call, one document per touched hour."""
+        pending, self._pending = self._pending, {}
+        return list(pending.values())
+
+    def restore_pending(self, deltas: List[dict]):
+        """Put back deltas whose flush failed so the next flush retries them."""
+        for delta in deltas:
+            self._merge(self._pending.setdefault(delta["id"], self._empty(delta["id"])), delta)
+
+    def pending(self) -> List[dict]:
+        """Copies of the deltas not taken yet."""
+        return [{**d, **{dim: dict(d[dim]) for dim in DIMENSIONS}} for d in self._pending.values()]
+
+    def documents(self, pending: bool = True) -> List[dict]:
+        """Copies of the retained hourly rollups, safe to serialize off-loop.
+
+        With `pending=False` the deltas not taken yet are left out, i.e. only
+        what storage has once the flushed deltas are applied.
+        """
+        docs = []
+        for h in sorted(self.hours):
+            doc = {**self.hours[h], **{dim: dict(self.hours[h][dim]) for dim in DIMENSIONS}}
+            delta = None if pending else self._pending.get(h)
+            if delta is not None:
+                doc["total"] -= delta["total"]
+                for dim in DIMENSIONS:
+                    for key, n in delta[dim].items():
+                        doc[dim][key] -= n
+                        if doc[dim][key] <= 0:
+                            del doc[dim][key]
+                if doc["total"] <= 0:
+                    continue
+            docs.append(doc)
+        return docs
+
+    def stats(self, top: int = 20, hours: int = 48) -> dict:
+        now = datetime.utcnow()
+        recent = [hour_bucket(now - timedelta(hours=i)) for i in range(hours - 1, -1, -1)]
+        return {
+            "total": self.total,
+            **{dim: dict(self.totals[dim].most_common(top)) for dim in DIMENSIONS},
+            "hours": {h: self.hours[h]["total"] if h in self.hours else 0 for h in recent},
+        }
@@ -0,0 +1,500 @@
+#!/usr/bin/env python3
+"""
+FufuDev Portfolio API latency benchmark.
+
+Generates synthetic data.json files, starts `server:app` against each one
+(in-process over an ASGI transport by default, or a running server with
+--url) and drives every endpoint at the requested concurrency, reporting
+p50/p95/p99 latency and requests per second.
+
+    python benchmark.py --sizes 10,1000,100000 --concurrency 32 --requests 2000
+    python benchmark.py --url http://localhost:8001   # server's own data
+    python benchmark.py --compare old_results.json
+    python benchmark.py --profile-startup --sizes 10,10000
+    python benchmark.py --memory --sizes 100000
+    python benchmark.py --serialization --sizes 1000,100000
+
+--profile-startup measures cold starts instead: `import server` (broken down
+with -X importtime and checked against --import-budget-ms) and the startup
+phases with and without a precompiled snapshot. --memory reports the RSS of a
+started server and the memory the published collections take as loaded
+dicts versus compact records. --serialization times JSON encoding with the
+standard library against orjson: cached response bodies (and the
+jsonable_encoder path of FastAPI's JSONResponse), journal entries, snapshot
+writes and loads, and how long a snapshot write stalls the event loop.
+
+Each dataset runs in its own subprocess so module-level server state never
+leaks between sizes.
+"""
+import argparse, asyncio, json, logging, os, platform, random, subprocess, sys, tempfile, time, uuid
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Dict, List, Optional
+
+ROOT_DIR = Path(__file__).parent
+
+TECHNOLOGIES = ["Discord.js", "Node.js", "Python", "React", "FastAPI", "MongoDB", "JavaScript",
+                "TypeScript", "Web Scraping", "Docker", "PostgreSQL", "Tailwind CSS"]
+PROJECT_TYPES = ["Discord Bot", "Website", "Automation", "API"]
+WORDS = ("fast reliable modern custom automated secure scalable responsive bot web api "
+         "dashboard moderation music tracking alerts notifications analytics portfolio").split()
+
+
+def sentence(rng: random.Random, n: int = 14) -> str:
+    return " ".join(rng.choice(WORDS) for _ in range(n)).capitalize() + "."
+
+
+def localized(rng: random.Random, n: int = 14) -> dict:
+    return {"en": sentence(rng, n), "fr": sentence(rng, n)}
+
+
+def generate_data(size: int, seed: int = 42) -> dict:
+    """`size` projects, testimonials and contacts; services are capped at 20."""
+    rng = random.Random(seed)
+    start = datetime(2025, 1, 1)
+    stamp = lambda i: (start + timedelta(minutes=i)).isoformat()
+    return {
+        "projects": [{
+            "id": f"project-{i}",
+            "name": f"Project {i}",
+            "description": localized(rng, 20),
+            "technologies": rng.sample(TECHNOLOGIES, 4),
+            "status": "active" if i % 10 else "archived",
+            "type": rng.choice(PROJECT_TYPES),
+            "featured": i % 7 == 0,
+            "created_at": stamp(i),
+            "updated_at": stamp(i),
+        } for i in range(size)],
+        "services": [{
+            "id": f"service-{i}",
+            "title": localized(rng, 2),
+            "description": localized(rng),
+            "icon": "Globe",
+            "active": True,
+            "order": i,
+            "created_at": stamp(i),
+        } for i in range(min(size, 20))],
+        "profile": {
+            "id": "profile",
+            "name": "FufuDev",
+            "email": "bench@example.com",
+            "bio": localized(rng, 30),
+            "skills": TECHNOLOGIES,
+            "location": {"en": "France", "fr": "France"},
+            "social_links": {"github": "https://github.com/example"},
+        },
+        "testimonials": [{
+            "id": f"testimonial-{i}",
+            "name": f"Client {i}",
+            "role": localized(rng, 2),
+            "content": localized(rng, 25),
+            "rating": rng.randint(3, 5),
+            "approved": i % 5 != 0,
+            "featured": i % 11 == 0,
+            "created_at": stamp(i),
+        } for i in range(size)],
+        "contacts": [{
+            "id": str(uuid.UUID(int=rng.getrandbits(128))),
+            "name": f"Visitor {i}",
+            "email": f"visitor{i}@example.com",
+            "subject": sentence(rng, 4),
+            "message": sentence(rng, 40),
+            "language": rng.choice(["en", "fr"]),
+            "status": "new",
+            "created_at": stamp(i),
+        } for i in range(size)],
+    }
+
+
+def endpoints(project_id: str):
+    """(label, method, path, json body) for every endpoint worth timing."""
+    contact = {"name": "Bench", "email": "bench@example.com", "subject": "Hi",
+               "message": "Benchmark message", "language": "en"}
+    return [
+        ("GET /api/", "GET", "/api/", None),
+        ("GET /api/projects", "GET", "/api/projects", None),
+        ("GET /api/projects?lang=fr", "GET", "/api/projects?lang=fr", None),
+        ("GET /api/projects?featured=true", "GET", "/api/projects?featured=true&type=Discord%20Bot", None),
+        ("GET /api/projects/{id}", "GET", f"/api/projects/{project_id}", None),
+        ("GET /api/services", "GET", "/api/services", None),
+        ("GET /api/profile", "GET", "/api/profile", None),
+        ("GET /api/testimonials", "GET", "/api/testimonials", None),
+        ("GET /api/bootstrap", "GET", "/api/bootstrap", None),
+        ("GET /api/bootstrap?lang=fr", "GET", "/api/bootstrap?lang=fr", None),
+        ("GET /api/search?q=bot", "GET", "/api/search?q=bot&lang=en", None),
+        ("GET /api/search?q=discord mod", "GET", "/api/search?q=discord%20mod&lang=fr", None),
+        ("GET /api/analytics/stats", "GET", "/api/analytics/stats", None),
+        ("GET /metrics", "GET", "/metrics", None),
+        ("POST /api/analytics/visit", "POST", "/api/analytics/visit", {"page": "/", "language": "en"}),
+        ("POST /api/contact", "POST", "/api/contact", contact),
+    ]
+
+
+def percentile(sorted_values, pct: float) -> float:
+    if not sorted_values:
+        return 0.0
+    k = (len(sorted_values) - 1) * pct / 100
+    lo, hi = int(k), min(int(k) + 1, len(sorted_values) - 1)
+    return sorted_values[lo] + (sorted_values[hi] - sorted_values[lo]) * (k - lo)
+
+
+async def drive(client, method: str, path: str, body, total: int, concurrency: int) -> dict:
+    latencies = []
+    errors = 0
+    remaining = total
+
+    async def worker():
+        nonlocal remaining, errors
+        while remaining > 0:
+            remaining -= 1
+            started = time.perf_counter()
+            try:
+                response = await client.request(method, path, json=body)
+                if response.status_code >= 400:
+                    errors += 1
+            except Exception:
+                errors += 1
+            latencies.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+    latencies.sort()
+    return {
+        "requests": len(latencies),
+        "errors": errors,
+        "rps": round(len(latencies) / elapsed, 1) if elapsed else 0.0,
+        **{f"p{p}_ms": round(percentile(latencies, p) * 1000, 3) for p in (50, 95, 99)},
+    }
+
+
+async def run_dataset(url: str, total: int, concurrency: int) -> dict:
+    import httpx
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+    if url:
+        client = httpx.AsyncClient(base_url=url, timeout=60)
+        app = None
+    else:
+        import server
+        app = server.app
+        client = httpx.AsyncClient(transport=httpx.ASGITransport(app=app),
+                                   base_url="http://bench", timeout=60)
+    results = {}
+    try:
+        if app is not None:
+            await app.router.startup()
+        projects = (await client.get("/api/projects?fields=id")).json()
+        for label, method, path, body in endpoints(projects[0]["id"] if projects else "missing"):
+            await drive(client, method, path, body, min(total, 50), min(concurrency, 8))  # warm-up
+            results[label] = await drive(client, method, path, body, total, concurrency)
+            print(f"  {label:<36} p50 {results[label]['p50_ms']:>9.3f}ms  "
+                  f"p99 {results[label]['p99_ms']:>9.3f}ms  {results[label]['rps']:>9.1f} req/s",
+                  file=sys.stderr)
+    finally:
+        if app is not None:
+            await app.router.shutdown()
+        await client.aclose()
+    return results
+
+
+async def startup_timings() -> dict:
+    import server
+    await server.app.router.startup()
+    try:
+        return dict(server.app.state.startup_timings)
+    finally:
+        await server.app.router.shutdown()
+
+
+def rss_mb() -> float:
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2**20
+    except OSError:  # not Linux: fall back to the peak
+        return peak_rss_mb()
+
+
+def peak_rss_mb() -> float:
+    import resource
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / 2**20 if sys.platform == "darwin" else peak / 2**10
+
+
+async def memory_usage() -> dict:
+    import gc, tracemalloc, server
+    baseline = rss_mb()
+    await server.app.router.startup()
+    try:
+        gc.collect()
+        report = {"rss_mb": round(rss_mb(), 1), "rss_startup_mb": round(rss_mb() - baseline, 1),
+                  "peak_rss_mb": round(peak_rss_mb(), 1)}
+    finally:
+        await server.app.router.shutdown()
+    # Allocations traced from here on are only the second copy loaded below.
+    tracemalloc.start()
+    loaded = server.store.load()
+    data = {name: loaded[name] for name in server.SCHEMAS}
+    del loaded
+    gc.collect()
+    as_dicts = tracemalloc.get_traced_memory()[0]
+    server.compact_data(data)
+    gc.collect()
+    as_records = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    report.update(published_dicts_mb=round(as_dicts / 2**20, 1), published_records_mb=round(as_records / 2**20, 1))
+    return report
+
+
+@contextmanager
+def dataset(size: int, env_overrides: Optional[Dict[str, str]] = None):
+    """The environment of a worker serving a generated `size` dataset."""
+    with tempfile.TemporaryDirectory() as tmp:
+        data_file = Path(tmp) / "data.json"
+        with open(data_file, "w", encoding="utf-8") as f:
+            json.dump(generate_data(size), f, ensure_ascii=False)
+        yield {**os.environ, "DATA_FILE": str(data_file), "DATA_WATCH_INTERVAL": "0", **(env_overrides or {})}
+
+
+def worker(mode: List[str], env: Optional[dict] = None) -> dict:
+    """Run this script with --worker and `mode`; the JSON it prints last."""
+    cmd = [sys.executable, str(Path(__file__).resolve()), "--worker", *mode]
+    out = subprocess.run(cmd, cwd=ROOT_DIR, env=env, check=True, stdout=subprocess.PIPE, text=True)
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def run_worker(size: int, mode: List[str], env_overrides: Optional[Dict[str, str]] = None) -> dict:
+    with dataset(size, env_overrides) as env:
+        return worker(mode, env)
+
+
+def write_report(report: dict, output: str):
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print(f"\nResults written to {output}", file=sys.stderr)
+
+
+def measure_memory(sizes) -> dict:
+    report = {}
+    for size in sizes:
+        report[str(size)] = usage = run_worker(size, ["--memory"], {"STARTUP_CACHE": "0"})
+        print(f"Dataset: {size} records", file=sys.stderr)
+        print(f"  started server  RSS {usage['rss_mb']:.1f}MB ({usage['rss_startup_mb']:+.1f}MB for startup), "
+              f"peak {usage['peak_rss_mb']:.1f}MB", file=sys.stderr)
+        print(f"  published docs  {usage['published_dicts_mb']:.1f}MB as dicts -> "
+              f"{usage['published_records_mb']:.1f}MB as records", file=sys.stderr)
+    return report
+
+
+def best_ms(fn, repeat: int = 3) -> float:
+    times = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - started)
+    return round(min(times) * 1000, 2)
+
+
+async def loop_stall_ms(fn) -> float:
+    """The longest the event loop went without running while `fn` ran in a thread."""
+    loop = asyncio.get_running_loop()
+    worst = 0.0
+    done = False
+
+    async def tick():
+        nonlocal worst
+        last = loop.time()
+        while not done:
+            await asyncio.sleep(0.001)
+            now = loop.time()
+            worst = max(worst, now - last)
+            last = now
+
+    ticker = asyncio.create_task(tick())
+    await asyncio.sleep(0.01)
+    await loop.run_in_executor(None, fn)
+    done = True
+    await ticker
+    return round(worst * 1000, 1)
+
+
+def serialization_timings() -> dict:
+    import jsoncodec, readmodel, server
+    from fastapi.encoders import jsonable_encoder
+    from fastapi.responses import JSONResponse
+    from storage import JournalStore
+    data = server.store.load()
+    snap = server.build_snapshot(data)
+    projects = server.build_projects(snap)
+    entries = [{"op": "insert", "collection": "contacts", "doc": doc} for doc in data["contacts"][:1000]]
+    copy = JournalStore(Path(tempfile.mkdtemp()) / "data.json")
+    report = {"jsonable_encoder_response_ms": best_ms(lambda: JSONResponse(jsonable_encoder(projects)))}
+    for encoder in ("json", "orjson"):
+        jsoncodec.use(encoder)
+        if jsoncodec.ENCODER != encoder:
+            continue
+        report[encoder] = {
+            "response_ms": best_ms(lambda: readmodel.encode(projects)),
+            "journal_1000_ms": best_ms(lambda: [jsoncodec.dumps(e, default=str) for e in entries]),
+            "snapshot_write_ms": best_ms(lambda: copy.write_snapshot(data)),
+            "snapshot_load_ms": best_ms(copy.load),
+            "write_loop_stall_ms": asyncio.run(loop_stall_ms(lambda: copy.write_snapshot(data))),
+        }
+    report["snapshot_mb"] = round(copy.snapshot_path.stat().st_size / 2**20, 1)
+    return report
+
+
+def measure_serialization(sizes) -> dict:
+    report = {}
+    for size in sizes:
+        report[str(size)] = timings = run_worker(size, ["--serialization"], {"STARTUP_CACHE": "0"})
+        print(f"Dataset: {size} records ({timings['snapshot_mb']}MB snapshot)", file=sys.stderr)
+        print(f"  {'':22}{'json':>10}{'orjson':>10}", file=sys.stderr)
+        print(f"  {'jsonable_encoder resp.':22}{timings['jsonable_encoder_response_ms']:>10.1f}", file=sys.stderr)
+        for key in ("response_ms", "journal_1000_ms", "snapshot_write_ms", "snapshot_load_ms", "write_loop_stall_ms"):
+            row = [timings[e][key] for e in ("json", "orjson") if e in timings]
+            print(f"  {key:22}" + "".join(f"{v:>10.1f}" for v in row)
+                  + (f"  x{row[0] / max(row[1], 0.01):.1f}" if len(row) == 2 else ""), file=sys.stderr)
+    return report
+
+
+def import_profile(env: dict, top: int = 10) -> dict:
+    """`import server` cost from -X importtime: total and the heaviest modules."""
+    out = subprocess.run([sys.executable, "-X", "importtime", "-c", "import server"], cwd=ROOT_DIR, env=env,
+                         check=True, stderr=subprocess.PIPE, text=True).stderr
+    modules = []
+    for line in out.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        modules.append((name.strip(), int(self_us), int(cumulative_us), len(name) - len(name.lstrip())))
+    # Children are reported before their parent; walk back over server's subtree.
+    end = max(i for i, m in enumerate(modules) if m[0] == "server" and m[3] == 1)
+    start = end
+    while start > 0 and modules[start - 1][3] > 1:
+        start -= 1
+    total = modules[end][2]
+    direct = [m for m in modules[start:end] if m[3] == 3]
+    heaviest = sorted(direct, key=lambda m: -m[2])[:top]
+    return {"total_ms": round(total / 1000, 1),
+            "heaviest": {name: round(cum / 1000, 1) for name, _, cum, _ in heaviest}}
+
+
+def profile_startup(sizes, budget_ms: float) -> dict:
+    report = {}
+    for size in sizes:
+        with dataset(size) as env:
+            imports = import_profile(env)
+            # The first run writes the cache the second one reads.
+            phases = {run: worker(["--profile-startup"], env) for run in ("cold", "precompiled")}
+        report[str(size)] = {"import": imports, "startup": phases}
+        print(f"Dataset: {size} records", file=sys.stderr)
+        flag = "  <-- over budget" if imports["total_ms"] > budget_ms else ""
+        print(f"  import server {imports['total_ms']:>9.1f}ms (budget {budget_ms:.0f}ms){flag}", file=sys.stderr)
+        for name, ms in imports["heaviest"].items():
+            print(f"    {name:<32} {ms:>9.1f}ms", file=sys.stderr)
+        for run, timings in phases.items():
+            detail = "  ".join(f"{k} {v * 1000:.1f}ms" for k, v in timings.items() if not isinstance(v, bool))
+            print(f"  startup ({run:<11})  {detail}", file=sys.stderr)
+    return report
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT_DIR,
+                                       stderr=subprocess.DEVNULL, text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def compare(old_file: str, new: dict):
+    with open(old_file, encoding="utf-8") as f:
+        old = json.load(f)
+    print(f"\nComparing against {old_file} ({old['meta'].get('commit')})")
+    for size, endpoints_ in new["results"].items():
+        for label, stats in endpoints_.items():
+            before = old.get("results", {}).get(size, {}).get(label)
+            if not before or not before["p50_ms"]:
+                continue
+            change = (stats["p50_ms"] - before["p50_ms"]) / before["p50_ms"] * 100
+            flag = "  <-- regression" if change > 10 else ""
+            print(f"  [{size}] {label:<36} p50 {before['p50_ms']:.3f} -> {stats['p50_ms']:.3f}ms "
+                  f"({change:+.1f}%){flag}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", default="10,1000,100000", help="comma-separated records per collection")
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--requests", type=int, default=1000, help="requests per endpoint")
+    parser.add_argument("--url", help="benchmark a running server instead, e.g. http://localhost:8001")
+    parser.add_argument("--output", default="benchmark_results.json")
+    parser.add_argument("--compare", help="previous results file to diff against")
+    parser.add_argument("--profile-startup", action="store_true",
+                        help="measure import and startup time instead of request latency")
+    parser.add_argument("--import-budget-ms", type=float, default=750,
+                        help="fail --profile-startup when `import server` takes longer")
+    parser.add_argument("--memory", action="store_true",
+                        help="measure memory use instead of request latency")
+    parser.add_argument("--serialization", action="store_true",
+                        help="compare the JSON encoders instead of measuring request latency")
+    parser.add_argument("--worker", action="store_true", help=argparse.SUPPRESS)  # internal
+    args = parser.parse_args()
+
+    if args.worker and args.profile_startup:
+        print(json.dumps(asyncio.run(startup_timings())))
+        return
+    if args.worker and args.memory:
+        print(json.dumps(asyncio.run(memory_usage())))
+        return
+    if args.worker and args.serialization:
+        print(json.dumps(serialization_timings()))
+        return
+    if args.worker:
+        results = asyncio.run(run_dataset(args.url, args.requests, args.concurrency))
+        print(json.dumps(results))
+        return
+
+    report = {
+        "meta": {
+            "commit": git_commit(),
+            "timestamp": datetime.utcnow().isoformat(),
+            "python": platform.python_version(),
+            "mode": args.url or "in-process",
+            "concurrency": args.concurrency,
+            "requests": args.requests,
+        },
+        "results": {},
+    }
+    if args.profile_startup:
+        report["meta"]["import_budget_ms"] = args.import_budget_ms
+        report["startup"] = profile_startup([int(s) for s in args.sizes.split(",")], args.import_budget_ms)
+        write_report(report, args.output)
+        if any(r["import"]["total_ms"] > args.import_budget_ms for r in report["startup"].values()):
+            sys.exit(1)
+        return
+    if args.memory:
+        report["memory"] = measure_memory([int(s) for s in args.sizes.split(",")])
+        write_report(report, args.output)
+        return
+    if args.serialization:
+        report["serialization"] = measure_serialization([int(s) for s in args.sizes.split(",")])
+        write_report(report, args.output)
+        return
+    mode = ["--requests", str(args.requests), "--concurrency", str(args.concurrency)]
+    if args.url:
+        print(f"Server: {args.url}", file=sys.stderr)
+        report["results"]["remote"] = worker(mode + ["--url", args.url])
+    for size in () if args.url else (int(s) for s in args.sizes.split(",")):
+        print(f"Dataset: {size} records", file=sys.stderr)
+        # One client posting the same message over and over: measure the write path, not the limits.
+        report["results"][str(size)] = run_worker(size, mode, {
+            "CONTACT_LIMIT_PER_IP": "0", "CONTACT_LIMIT_PER_EMAIL": "0", "CONTACT_DEDUP_WINDOW": "0"})
+
+    write_report(report, args.output)
+    if args.compare:
+        compare(args.compare, report)
+
+
+if __name__ == "__main__":
+    main()
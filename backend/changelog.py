@@ -0,0 +1,81 @@
+"""Change log of the published content, for incremental sync.
+
+Every write to a published document also records `{"id": seq, "collection",
+"doc_id"}` in the "changes" collection, in the same storage batch as the
+write itself, with `seq` increasing by one per change. Clients remember the
+last seq they saw and ask for what changed since.
+
+The log is bounded: once it holds more than `max_entries`, the oldest half
+is pruned and folded into the `{"floor": seq}` marker stored as
+"changelog". A client whose last seq is below the floor can no longer be
+told what it missed and has to start over from the full content.
+"""
+from bisect import bisect_right
+from typing import Dict, List, Optional, Tuple
+
+PUBLISHED = ("projects", "services", "testimonials")
+PROFILE_KEY = ("profile", "profile")
+
+Key = Tuple[str, str]  # (collection, doc id)
+
+
+def floor(data: dict) -> int:
+    return (data.get("changelog") or {}).get("floor", 0)
+
+
+def latest(data: dict) -> int:
+    changes = data.get("changes")
+    return changes[-1]["id"] if changes else floor(data)
+
+
+def journal_entries(data: dict, keys: List[Key], first: int, max_entries: int) -> List[dict]:
+    """Storage entries logging `keys` as changes `first`, `first` + 1, ...,
+    pruning the log if it outgrows `max_entries`."""
+    entries = [{"op": "insert", "collection": "changes", "doc": {"id": seq, "collection": c, "doc_id": d}}
+               for seq, (c, d) in enumerate(keys, first)]
+    changes = data.get("changes") or []
+    if entries and len(changes) + len(entries) > max_entries:
+        new_floor = first + len(entries) - 1 - max_entries // 2
+        entries.append({"op": "prune", "collection": "changes", "doc": {"field": "id", "below": new_floor + 1}})
+        entries.append({"op": "set", "collection": "changelog", "doc": {"floor": new_floor}})
+    return entries
+
+
+def changed_keys(old: dict, new: dict) -> List[Key]:
+    """Published documents that differ between two versions of the data."""
+    keys = []
+    for name in PUBLISHED:
+        before = {d["id"]: d for d in old.get(name) or []}
+        for doc in new.get(name) or []:
+            previous = before.pop(doc["id"], None)
+            if previous is None or (previous is not doc and previous != doc):
+                keys.append((name, doc["id"]))
+        keys.extend((name, doc_id) for doc_id in before)  # deleted
+    if old.get("profile") != new.get("profile"):
+        keys.append(PROFILE_KEY)
+    return keys
+
+
+def collapse(changes: List[dict], limit: int) -> Tuple[List[Tuple[Key, int]], Optional[int]]:
+    """The distinct documents changed in `changes` (ordered by seq) with
+    the seq of their last change, oldest first, at most `limit` of them.
+
+    Also returns the seq up to which `changes` were consumed if `limit` cut
+    them short, else None.
+    """
+    last: Dict[Key, int] = {}
+    for change in changes:
+        key = (change["collection"], change["doc_id"])
+        if key not in last and len(last) == limit:
+            return list(last.items()), change["id"] - 1
+        last.pop(key, None)  # re-inserted, so `last` stays ordered by seq
+        last[key] = change["id"]
+    return list(last.items()), None
+
+
+def since(data: dict, seq: int) -> Optional[List[dict]]:
+    """Changes after `seq`, or None if the log no longer reaches back to it."""
+    if seq < floor(data):
+        return None
+    changes = data.get("changes") or []
+    return changes[bisect_right(changes, seq, key=lambda c: c["id"]):]
@@ -0,0 +1,52 @@
+"""Content-Encoding negotiation and compression helpers.
+
+Brotli is used when the optional `brotli` package is installed; gzip is
+always available.
+"""
+import gzip
+from importlib.util import find_spec
+from typing import Optional
+
+# Imported on first use: a process restored from a precompiled snapshot may
+# never need to compress anything.
+HAVE_BROTLI = find_spec("brotli") is not None
+
+MIN_SIZE = 500
+# Max-effort settings cost ~100x the default ones (over a second for a few
+# hundred KB of brotli), so they are only used for small pre-warmed bodies.
+MAX_EFFORT_SIZE = 64 << 10
+
+ENCODINGS = ("br", "gzip") if HAVE_BROTLI else ("gzip",)
+
+
+def negotiate_encoding(accept_encoding: Optional[str]) -> Optional[str]:
+    """Best supported encoding the client accepts, preferring brotli."""
+    if not accept_encoding:
+        return None
+    accepted = {}
+    for part in accept_encoding.split(","):
+        coding, _, params = part.strip().partition(";")
+        q = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        accepted[coding.strip().lower()] = q
+    for coding in ENCODINGS:
+        q = accepted.get(coding, accepted.get("*", 0.0))
+        if q > 0:
+            return coding
+    return None
+
+
+def compress(body: bytes, encoding: str, best: bool = False) -> bytes:
+    """`best` asks for max effort, which bodies over MAX_EFFORT_SIZE don't get."""
+    best = best and len(body) <= MAX_EFFORT_SIZE
+    if encoding == "br":
+        import brotli
+        return brotli.compress(body, quality=11 if best else 5)
+    if encoding == "gzip":
+        return gzip.compress(body, compresslevel=9 if best else 6, mtime=0)
+    raise ValueError(f"Unsupported encoding: {encoding}")
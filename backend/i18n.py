@@ -0,0 +1,81 @@
+"""Single-language projections of the localized `Dict[str, str]` fields."""
+from typing import Dict, Iterable, Optional, Tuple
+
+DEFAULT_LANGUAGE = "en"
+
+LOCALIZED_FIELDS = {
+    "projects": ("description",),
+    "services": ("title", "description"),
+    "profile": ("bio", "location"),
+    "testimonials": ("role", "content"),
+}
+
+
+def available_languages(data: dict) -> Tuple[str, ...]:
+    langs = {DEFAULT_LANGUAGE}
+    for collection, fields in LOCALIZED_FIELDS.items():
+        docs = data.get(collection) or []
+        if isinstance(docs, dict):
+            docs = [docs]
+        for doc in docs:
+            for field in fields:
+                value = doc.get(field)
+                if isinstance(value, dict):
+                    langs.update(value)
+    return tuple(sorted(langs))
+
+
+def fallback_chain(lang: str, available: Iterable[str]) -> Tuple[str, ...]:
+    """Requested tag, its primary subtag, the default, then everything else."""
+    chain = []
+    lang = (lang or "").strip().lower()
+    for candidate in (lang, lang.split("-")[0], DEFAULT_LANGUAGE, *available):
+        if candidate and candidate not in chain:
+            chain.append(candidate)
+    return tuple(chain)
+
+
+def resolve_language(lang: str, available: Tuple[str, ...]) -> str:
+    for candidate in fallback_chain(lang, available):
+        if candidate in available:
+            return candidate
+    return DEFAULT_LANGUAGE
+
+
+def negotiate(accept_language: Optional[str], available: Tuple[str, ...]) -> str:
+    ranked = []
+    for i, part in enumerate((accept_language or "").split(",")):
+        tag, _, params = part.strip().partition(";")
+        if not tag or tag == "*":
+            continue
+        q = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                continue
+        if q > 0:
+            ranked.append((-q, i, tag.lower()))
+    for _, _, tag in sorted(ranked):
+        for candidate in (tag, tag.split("-")[0]):
+            if candidate in available:
+                return candidate
+    return DEFAULT_LANGUAGE
+
+
+def pick(value: Dict[str, str], chain: Tuple[str, ...]) -> str:
+    for lang in chain:
+        text = value.get(lang)
+        if text:
+            return text
+    return next(iter(value.values()), "")
+
+
+def localize(doc: dict, fields: Tuple[str, ...], chain: Tuple[str, ...]) -> dict:
+    flat = dict(doc)
+    for field in fields:
+        value = flat.get(field)
+        if isinstance(value, dict):
+            flat[field] = pick(value, chain)
+    return flat
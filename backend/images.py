@@ -0,0 +1,249 @@
+"""Uploaded images and their resized variants.
+
+Uploads are stored once under the hex digest of their content, so an image's
+URL never changes meaning and can be cached forever. Resized WebP/JPEG/PNG
+variants are rendered on first request in a process pool (decoding and
+resampling are CPU-bound and would stall the event loop and the GIL), then
+kept in an on-disk cache that evicts the least recently used files beyond
+its size budget.
+
+Rendering needs the optional `Pillow` package; without it only originals are
+served.
+"""
+import os, re, asyncio, hashlib, logging, multiprocessing
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from importlib.util import find_spec
+from pathlib import Path
+from typing import AsyncIterator, Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+HAVE_PILLOW = find_spec("PIL") is not None
+
+# Pillow format -> (extension, media type) of the originals we accept.
+FORMATS = {
+    "JPEG": ("jpg", "image/jpeg"),
+    "PNG": ("png", "image/png"),
+    "WEBP": ("webp", "image/webp"),
+    "GIF": ("gif", "image/gif"),
+}
+MEDIA_TYPES = {ext: media_type for ext, media_type in FORMATS.values()}
+VARIANT_FORMATS = {"webp": "WEBP", "jpg": "JPEG", "png": "PNG"}
+# Only these widths are rendered, so URLs can't be used to fill the cache.
+WIDTHS = (64, 128, 256, 400, 800, 1200, 1600)
+# Refuse decompression bombs; Pillow itself only warns above its limit and
+# raises above twice that.
+MAX_PIXELS = 40_000_000
+
+DIGEST_RE = re.compile(r"[0-9a-f]{32}")
+VARIANT_RE = re.compile(r"w(\d+)\.(webp|jpg|png)")
+URL_PREFIX = "/api/images/"
+
+
+class InvalidImage(ValueError):
+    pass
+
+
+# ----- WORKER PROCESS -----
+def probe(path: str) -> Tuple[str, int, int]:
+    """(Pillow format, width, height) of a readable image we accept."""
+    from PIL import Image
+    Image.MAX_IMAGE_PIXELS = MAX_PIXELS
+    try:
+        with Image.open(path) as im:
+            im.verify()
+            fmt, (width, height) = im.format, im.size
+    except Exception as e:  # Pillow raises a variety of errors for bad input
+        raise InvalidImage(f"Not a supported image: {e}") from None
+    if fmt not in FORMATS:
+        raise InvalidImage(f"Unsupported image format {fmt}")
+    if width * height > MAX_PIXELS:
+        raise InvalidImage(f"Image too large: {width}x{height} pixels")
+    return fmt, width, height
+
+
+def render(source: str, target: str, width: int, fmt: str) -> int:
+    """Write `source` scaled down to at most `width` pixels wide as `fmt`;
+    returns the size of the written file."""
+    from PIL import Image, ImageOps
+    Image.MAX_IMAGE_PIXELS = MAX_PIXELS
+    with Image.open(source) as im:
+        im = ImageOps.exif_transpose(im)
+        if im.width > width:
+            im = im.resize((width, max(1, round(im.height * width / im.width))), Image.LANCZOS)
+        if fmt == "JPEG":
+            im = im.convert("RGB")
+            options = {"quality": 82, "optimize": True, "progressive": True}
+        elif fmt == "WEBP":
+            im = im.convert("RGBA" if im.has_transparency_data else "RGB")
+            options = {"quality": 80, "method": 4}
+        else:
+            options = {"optimize": True}
+        tmp = f"{target}.{os.getpid()}.tmp"
+        im.save(tmp, fmt, **options)
+    os.replace(tmp, target)  # other workers may render the same variant
+    return os.path.getsize(target)
+
+
+# ----- CACHE -----
+class VariantCache:
+    """Rendered files in one directory, evicted least recently used first
+    once they add up to more than `max_bytes`.
+
+    Recency survives restarts through file mtimes. Each server process keeps
+    its own view; files another process added or evicted are picked up or
+    forgotten when they are next looked up.
+    """
+
+    def __init__(self, directory: Path, max_bytes: int):
+        self.directory = Path(directory)
+        self.max_bytes = max_bytes
+        self.size = 0
+        self._entries: "OrderedDict[str, int]" = OrderedDict()
+
+    def open(self):
+        self.directory.mkdir(parents=True, exist_ok=True)
+        files = []
+        for entry in os.scandir(self.directory):
+            if entry.is_file() and not entry.name.endswith(".tmp"):
+                stat = entry.stat()
+                files.append((stat.st_mtime, entry.name, stat.st_size))
+        self._entries.clear()
+        self.size = 0
+        for _, name, size in sorted(files):
+            self._entries[name] = size
+            self.size += size
+        self._evict()
+
+    def get(self, name: str) -> Optional[Path]:
+        path = self.directory / name
+        try:
+            os.utime(path)  # refresh recency, and check the file is still there
+        except FileNotFoundError:
+            self.size -= self._entries.pop(name, 0)
+            return None
+        if name in self._entries:
+            self._entries.move_to_end(name)
+        else:
+            self.add(name, path.stat().st_size)
+        return path
+
+    def add(self, name: str, size: int):
+        self.size += size - self._entries.pop(name, 0)
+        self._entries[name] = size
+        self._evict()
+
+    def _evict(self):
+        # The newest entry stays even if it alone is over budget.
+        while self.size > self.max_bytes and len(self._entries) > 1:
+            name, size = self._entries.popitem(last=False)
+            self.size -= size
+            try:
+                os.unlink(self.directory / name)
+            except FileNotFoundError:
+                pass
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+# ----- STORE -----
+class ImageStore:
+    def __init__(self, upload_dir: Path, cache: VariantCache, workers: int = 2,
+                 max_upload: int = 10 * 2**20, base_url: str = ""):
+        """`base_url` is prepended to the URLs put into API responses, e.g. a CDN origin."""
+        self.upload_dir = Path(upload_dir)
+        self.cache = cache
+        self.workers = workers
+        self.max_upload = max_upload
+        self.base_url = base_url.rstrip("/")
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._pending: Dict[str, asyncio.Future] = {}
+
+    def open(self):
+        self.upload_dir.mkdir(parents=True, exist_ok=True)
+        self.cache.open()
+
+    def close(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    async def _run(self, fn, *args):
+        if self._executor is None:
+            # Spawned, not forked: the server process has threads running.
+            self._executor = ProcessPoolExecutor(self.workers, mp_context=multiprocessing.get_context("spawn"))
+        return await asyncio.get_running_loop().run_in_executor(self._executor, fn, *args)
+
+    # ----- originals -----
+    def original(self, digest: str) -> Optional[Path]:
+        if not DIGEST_RE.fullmatch(digest):
+            return None
+        for ext in MEDIA_TYPES:
+            path = self.upload_dir / f"{digest}.{ext}"
+            if path.is_file():
+                return path
+        return None
+
+    async def save(self, chunks: AsyncIterator[bytes]) -> dict:
+        """Store an uploaded image; raises InvalidImage or OverflowError (too large)."""
+        hasher = hashlib.blake2b(digest_size=16)
+        tmp = self.upload_dir / f"upload-{os.getpid()}-{id(hasher):x}.tmp"
+        size = 0
+        try:
+            with open(tmp, "wb") as f:
+                async for chunk in chunks:
+                    size += len(chunk)
+                    if size > self.max_upload:
+                        raise OverflowError(f"Images are limited to {self.max_upload} bytes")
+                    hasher.update(chunk)
+                    f.write(chunk)
+            if not HAVE_PILLOW:
+                raise InvalidImage("Image uploads need Pillow installed")
+            fmt, width, height = await self._run(probe, str(tmp))
+            digest = hasher.hexdigest()
+            ext = FORMATS[fmt][0]
+            os.replace(tmp, self.upload_dir / f"{digest}.{ext}")
+        finally:
+            tmp.unlink(missing_ok=True)
+        return {"id": digest, "url": URL_PREFIX + digest, "format": ext, "width": width, "height": height,
+                "size": size}
+
+    # ----- variants -----
+    async def variant(self, digest: str, width: int, ext: str) -> Optional[Path]:
+        """The cached variant, rendering it first if needed; None if there is
+        no such upload or variant."""
+        if width not in WIDTHS or ext not in VARIANT_FORMATS or not HAVE_PILLOW:
+            return None
+        name = f"{digest}-w{width}.{ext}"
+        path = self.cache.get(name)
+        if path is not None:
+            return path
+        future = self._pending.get(name)
+        if future is None:
+            source = self.original(digest)
+            if source is None:
+                return None
+            # Concurrent requests for the same variant share one render.
+            future = self._pending[name] = asyncio.ensure_future(self._render(source, name, width, ext))
+            future.add_done_callback(lambda _: self._pending.pop(name, None))
+        return await asyncio.shield(future)
+
+    async def _render(self, source: Path, name: str, width: int, ext: str) -> Path:
+        target = self.cache.directory / name
+        size = await self._run(render, str(source), str(target), width, VARIANT_FORMATS[ext])
+        self.cache.add(name, size)
+        return target
+
+    def display_url(self, value, width: int, ext: str = "webp"):
+        """The URL to hand out for a stored image reference: a resized
+        variant for our own uploads, anything else unchanged."""
+        if not isinstance(value, str) or not value.startswith(URL_PREFIX):
+            return value
+        digest = value[len(URL_PREFIX):]
+        if not DIGEST_RE.fullmatch(digest):
+            return value
+        if HAVE_PILLOW:
+            return f"{self.base_url}{URL_PREFIX}{digest}/w{width}.{ext}"
+        return self.base_url + value
@@ -0,0 +1,143 @@
+"""Bounded in-process queue that hands items to a sink in batches.
+
+Producers call `put_nowait()` and return immediately; a single consumer task
+collects up to `batch_size` items (or whatever arrived within
+`flush_interval` of the first one) and awaits `flush(batch)`. A full queue
+raises `asyncio.QueueFull` so callers can push back on the client.
+
+Only `flush` is retried, so it should be the idempotent part (the storage
+write); `after_flush(batch)` runs once it succeeded, e.g. to update
+in-memory indexes. `guard()`, if given, is entered around each attempt
+together with `after_flush`, so nothing holding the same lock sees one
+without the other. A batch that fails `max_attempts` times, or with one of
+the `permanent` errors, goes to `dead_letter(batch, error)` instead of
+blocking the queue.
+"""
+import math, asyncio, logging
+from contextlib import nullcontext
+from typing import AsyncContextManager, Awaitable, Callable, List, Optional, Tuple, Type
+
+logger = logging.getLogger(__name__)
+
+# Queued by drain() so a partial batch is flushed without waiting out the interval.
+_FLUSH = object()
+
+
+class BatchQueue:
+    def __init__(self, flush: Callable[[List], Awaitable[None]], maxsize: int = 1000,
+                 batch_size: int = 100, flush_interval: float = 0.05, name: str = "queue",
+                 after_flush: Optional[Callable[[List], None]] = None, max_attempts: int = 10,
+                 permanent: Tuple[Type[Exception], ...] = (TypeError, ValueError),
+                 dead_letter: Optional[Callable[[List, Exception], None]] = None,
+                 guard: Optional[Callable[[], AsyncContextManager]] = None):
+        self.flush = flush
+        self.after_flush = after_flush
+        self.guard = guard
+        self.max_attempts = max_attempts
+        self.permanent = permanent
+        self.dead_letter = dead_letter
+        self.maxsize = maxsize
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.name = name
+        self._queue: Optional[asyncio.Queue] = None
+        self._task: Optional[asyncio.Task] = None
+        self.closed = True
+
+    def start(self):
+        self._queue = asyncio.Queue(self.maxsize)
+        self._task = asyncio.create_task(self._run())
+        self.closed = False
+
+    def put_nowait(self, item):
+        if self.closed:
+            raise asyncio.QueueFull()
+        self._queue.put_nowait(item)
+
+    def qsize(self) -> int:
+        return self._queue.qsize() if self._queue is not None else 0
+
+    def retry_after(self) -> int:
+        """Seconds until roughly a batch worth of room frees up."""
+        batches = self._queue.qsize() / max(self.batch_size, 1)
+        return max(1, math.ceil(batches * self.flush_interval))
+
+    async def join(self):
+        """Wait until everything queued so far has been flushed."""
+        await self._queue.join()
+
+    async def drain(self, timeout: float = 10.0):
+        """Stop accepting items and flush what is already queued."""
+        self.closed = True
+        if self._task is None:
+            return
+        try:
+            self._queue.put_nowait(_FLUSH)
+        except asyncio.QueueFull:
+            pass  # full batches are flushed right away anyway
+        try:
+            await asyncio.wait_for(self._queue.join(), timeout)
+        except asyncio.TimeoutError:
+            logger.error("%s: %d items still unflushed at shutdown", self.name, self._queue.qsize())
+        self._task.cancel()
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self._queue.get()]
+            deadline = loop.time() + self.flush_interval
+            while len(batch) < self.batch_size and batch[-1] is not _FLUSH:
+                if not self._queue.empty():
+                    batch.append(self._queue.get_nowait())
+                    continue
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+            items = [item for item in batch if item is not _FLUSH]
+            if items:
+                await self._flush_with_retry(items)
+            for _ in batch:
+                self._queue.task_done()
+
+    async def _flush_with_retry(self, batch: List) -> bool:
+        """True once `batch` is flushed, False if it went to the dead letters."""
+        delay = 0.1
+        for attempt in range(1, self.max_attempts + 1):
+            async with self.guard() if self.guard is not None else nullcontext():
+                try:
+                    await self.flush(batch)
+                except Exception as e:
+                    error = e
+                else:
+                    self._after_flush(batch)
+                    return True
+            if isinstance(error, self.permanent) or attempt == self.max_attempts:
+                logger.error("%s: flushing %d items failed for good after %d attempts",
+                             self.name, len(batch), attempt, exc_info=error)
+                self._give_up(batch, error)
+                return False
+            logger.error("%s: flushing %d items failed, retrying in %.1fs",
+                         self.name, len(batch), delay, exc_info=error)
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, 5.0)
+        return False
+
+    def _after_flush(self, batch: List):
+        if self.after_flush is None:
+            return
+        try:
+            self.after_flush(batch)
+        except Exception:  # already persisted; never flush it again
+            logger.exception("%s: post-processing %d flushed items failed", self.name, len(batch))
+
+    def _give_up(self, batch: List, error: Exception):
+        if self.dead_letter is None:
+            return
+        try:
+            self.dead_letter(batch, error)
+        except Exception:
+            logger.exception("%s: could not record %d dead-lettered items", self.name, len(batch))
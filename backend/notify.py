@@ -0,0 +1,490 @@
+"""Notifications about new contact submissions.
+
+`Notifier.notify()` only queues contacts, so the request path never waits on
+delivery. Contacts arriving within `digest_window` of the first one are
+coalesced into a single message per sink (a digest when there are several),
+which is stored in an `Outbox` before delivery is attempted. A background
+loop sends due messages and reschedules failed ones with exponential
+backoff until `max_attempts`. Delivery is at least once: a message whose
+send was interrupted by a shutdown is sent again on the next start.
+
+Sinks keep their connections between messages: `SmtpSink` one SMTP session,
+`WebhookSink` an httpx connection pool. `FileOutbox` keeps the outbox in its
+own journal file; `MongoOutbox` in a collection all workers claim due
+messages from.
+"""
+import ssl, json, hmac, time, uuid, random, asyncio, hashlib, logging, smtplib, threading
+from abc import ABC, abstractmethod
+from datetime import datetime
+from email.message import EmailMessage
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from ingest import BatchQueue
+from metrics import NOTIFICATIONS
+from storage import JournalStore
+
+logger = logging.getLogger(__name__)
+
+
+class DeliveryFailed(Exception):
+    def __init__(self, message: str, retry_after: Optional[float] = None):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class PermanentFailure(DeliveryFailed):
+    """Retrying the same message can't succeed."""
+
+
+def plain(contact: dict) -> dict:
+    return {k: v.isoformat() if isinstance(v, datetime) else v for k, v in contact.items()}
+
+
+def _one_line(text, limit: int = 120) -> str:
+    # Contact fields end up in mail headers; newlines there would inject headers.
+    text = " ".join(str(text).split())
+    return text if len(text) <= limit else text[:limit - 1] + "…"
+
+
+def summary(contacts: List[dict]) -> Tuple[str, str]:
+    """(subject, plain-text body) of the message about `contacts`."""
+    if len(contacts) == 1:
+        subject = f"New contact: {_one_line(contacts[0]['subject'])}"
+    else:
+        subject = f"{len(contacts)} new contacts"
+    body = "\n\n-----\n\n".join(
+        f"From: {c['name']} <{c['email']}>\nSubject: {c['subject']}\nReceived: {c.get('created_at')}\n\n{c['message']}"
+        for c in contacts
+    )
+    return subject, body
+
+
+# ----- SINKS -----
+class Sink(ABC):
+    name = "sink"
+
+    async def open(self):
+        pass
+
+    @abstractmethod
+    async def send(self, contacts: List[dict]):
+        """Deliver one message about `contacts`; raises if that failed."""
+
+    async def close(self):
+        pass
+
+
+class LogSink(Sink):
+    name = "log"
+
+    async def send(self, contacts: List[dict]):
+        subject, _ = summary(contacts)
+        logger.info("Notification: %s (%s)", subject, ", ".join(_one_line(c["email"]) for c in contacts))
+
+
+class SmtpSink(Sink):
+    """Mail to `recipients` over one SMTP session, reused while the server
+    keeps it open and closed after `keepalive` idle seconds."""
+    name = "smtp"
+
+    def __init__(self, host: str, port: int = 587, sender: str = "", recipients: Sequence[str] = (),
+                 username: Optional[str] = None, password: Optional[str] = None, security: str = "starttls",
+                 timeout: float = 10.0, keepalive: float = 60.0):
+        """`security` is "starttls", "ssl" or "none"."""
+        if security not in ("starttls", "ssl", "none"):
+            raise ValueError(f"Unknown SMTP security {security!r}")
+        self.host = host
+        self.port = port
+        self.sender = sender or username or f"notifications@{host}"
+        self.recipients = list(recipients)
+        self.username = username
+        self.password = password
+        self.security = security
+        self.timeout = timeout
+        self.keepalive = keepalive
+        self._smtp: Optional[smtplib.SMTP] = None
+        self._last_used = 0.0
+        self._lock = threading.Lock()
+
+    async def send(self, contacts: List[dict]):
+        await asyncio.to_thread(self._send, self.message(contacts))
+
+    def message(self, contacts: List[dict]) -> EmailMessage:
+        subject, body = summary(contacts)
+        msg = EmailMessage()
+        msg["Subject"] = subject
+        msg["From"] = self.sender
+        msg["To"] = ", ".join(self.recipients)
+        if len(contacts) == 1:
+            msg["Reply-To"] = _one_line(contacts[0]["email"], 254)
+        msg.set_content(body)
+        return msg
+
+    def _send(self, msg: EmailMessage):
+        with self._lock:
+            if self._smtp is not None and time.monotonic() - self._last_used > self.keepalive:
+                self._disconnect()
+            reused = self._smtp is not None
+            try:
+                try:
+                    self._session().send_message(msg)
+                except (smtplib.SMTPServerDisconnected, ConnectionError):
+                    if not reused:
+                        raise
+                    # The server dropped the idle session; one fresh attempt.
+                    self._disconnect()
+                    self._session().send_message(msg)
+            except OSError as e:  # smtplib's errors are OSErrors too
+                self._disconnect()
+                if self._permanent(e):
+                    raise PermanentFailure(f"SMTP server refused the message: {e}") from e
+                raise
+            self._last_used = time.monotonic()
+
+    @staticmethod
+    def _permanent(error: OSError) -> bool:
+        # 5xx replies are final, except to a login: the credentials can be fixed.
+        if isinstance(error, smtplib.SMTPAuthenticationError):
+            return False
+        if isinstance(error, smtplib.SMTPResponseException):
+            return error.smtp_code >= 500
+        if isinstance(error, smtplib.SMTPRecipientsRefused):
+            return all(code >= 500 for code, _ in error.recipients.values())
+        return False
+
+    def _session(self) -> smtplib.SMTP:
+        if self._smtp is None:
+            if self.security == "ssl":
+                smtp = smtplib.SMTP_SSL(self.host, self.port, timeout=self.timeout,
+                                        context=ssl.create_default_context())
+            else:
+                smtp = smtplib.SMTP(self.host, self.port, timeout=self.timeout)
+            try:
+                if self.security == "starttls":
+                    smtp.starttls(context=ssl.create_default_context())
+                if self.username:
+                    smtp.login(self.username, self.password or "")
+            except BaseException:
+                smtp.close()
+                raise
+            self._smtp = smtp
+        return self._smtp
+
+    def _disconnect(self):
+        smtp, self._smtp = self._smtp, None
+        if smtp is not None:
+            try:
+                smtp.quit()
+            except (OSError, smtplib.SMTPException):
+                smtp.close()
+
+    async def close(self):
+        def disconnect():
+            with self._lock:
+                self._disconnect()
+        await asyncio.to_thread(disconnect)
+
+
+class WebhookSink(Sink):
+    """POSTs `{"event": "contacts.created", "summary", "contacts"}` as JSON,
+    signed with HMAC-SHA256 of the body in X-Signature when `secret` is set.
+
+    `client` may be any httpx.AsyncClient, e.g. one with a mock transport.
+    """
+    name = "webhook"
+
+    def __init__(self, url: str, secret: Optional[str] = None, timeout: float = 10.0, client=None):
+        self.url = url
+        self.secret = secret
+        self.timeout = timeout
+        self.client = client
+        self._own_client = client is None
+
+    async def open(self):
+        if self.client is None:
+            import httpx
+            self.client = httpx.AsyncClient(timeout=self.timeout,
+                                            limits=httpx.Limits(max_connections=4, max_keepalive_connections=2))
+
+    async def send(self, contacts: List[dict]):
+        subject, _ = summary(contacts)
+        body = json.dumps({"event": "contacts.created", "summary": subject, "contacts": contacts},
+                          ensure_ascii=False).encode()
+        headers = {"Content-Type": "application/json"}
+        if self.secret:
+            headers["X-Signature"] = "sha256=" + hmac.new(self.secret.encode(), body, hashlib.sha256).hexdigest()
+        response = await self.client.post(self.url, content=body, headers=headers)
+        status = response.status_code
+        if status < 300:
+            return
+        error = f"{self.url} answered {status}"
+        if status < 500 and status not in (408, 429):
+            raise PermanentFailure(error)
+        retry_after = response.headers.get("Retry-After", "")
+        raise DeliveryFailed(error, float(retry_after) if retry_after.isdigit() else None)
+
+    async def close(self):
+        if self._own_client and self.client is not None:
+            await self.client.aclose()
+            self.client = None
+
+
+# ----- OUTBOX -----
+class Outbox(ABC):
+    """Messages waiting to be sent: {"id", "sink", "contacts", "attempts",
+    "next_attempt" (epoch seconds), "created_at", "last_error"}."""
+
+    async def open(self):
+        pass
+
+    @abstractmethod
+    async def add(self, messages: List[dict]):
+        ...
+
+    @abstractmethod
+    async def due(self, now: float, limit: int) -> List[dict]:
+        """Up to `limit` messages due by `now`, claimed so no other worker
+        sends them until they are done or rescheduled."""
+
+    @abstractmethod
+    async def done(self, message: dict):
+        """Drop a message, sent or given up on."""
+
+    @abstractmethod
+    async def reschedule(self, message: dict):
+        """Store a message's new attempts, next_attempt and last_error."""
+
+    @abstractmethod
+    async def next_due(self) -> Optional[float]:
+        ...
+
+    @abstractmethod
+    async def count(self) -> int:
+        ...
+
+    async def close(self):
+        pass
+
+
+class FileOutbox(Outbox):
+    """The outbox in its own JournalStore, for a single server process."""
+
+    def __init__(self, path, compact_every: int = 200):
+        self.store = JournalStore(path, compact_every=compact_every)
+        self.messages: List[dict] = []
+        self._lock = asyncio.Lock()
+
+    async def open(self):
+        data = await asyncio.to_thread(self.store.load)
+        self.messages = data.get("outbox") or []
+
+    async def _write(self, op: str, messages: List[dict]):
+        entries = [{"op": op, "collection": "outbox", "doc": m} for m in messages]
+        # One writer at a time, so a compaction can't drop an entry journaled meanwhile.
+        async with self._lock:
+            await asyncio.to_thread(self.store.append_batch, entries)
+            data = {"outbox": self.messages}
+            JournalStore.apply(data, {"op": "batch", "entries": entries})
+            self.messages = data["outbox"]
+            if self.store.needs_compaction:
+                await asyncio.to_thread(self.store.compact, {"outbox": list(self.messages)})
+
+    async def add(self, messages: List[dict]):
+        await self._write("insert", messages)
+
+    async def due(self, now: float, limit: int) -> List[dict]:
+        return sorted((m for m in self.messages if m["next_attempt"] <= now),
+                      key=lambda m: m["next_attempt"])[:limit]
+
+    async def done(self, message: dict):
+        await self._write("delete", [{"id": message["id"]}])
+
+    async def reschedule(self, message: dict):
+        await self._write("insert", [message])  # replaces the stored message with the same id
+
+    async def next_due(self) -> Optional[float]:
+        return min((m["next_attempt"] for m in self.messages), default=None)
+
+    async def count(self) -> int:
+        return len(self.messages)
+
+    async def close(self):
+        self.store.close()
+
+
+class MongoOutbox(Outbox):
+    """The outbox in the database of an opened `MotorBackend`, shared by all
+    workers. A claimed message is leased for `lease` seconds, after which
+    another worker may send it if the claiming one died."""
+
+    def __init__(self, backend, collection: str = "notification_outbox", lease: float = 120.0):
+        self.backend = backend
+        self.name = collection
+        self.lease = lease
+        self.messages = None
+
+    async def open(self):
+        self.messages = self.backend.db[self.name]
+        await self.messages.create_index("id", unique=True)
+        await self.messages.create_index("next_attempt")
+
+    async def add(self, messages: List[dict]):
+        if messages:
+            await self.messages.insert_many([dict(m) for m in messages])
+
+    async def due(self, now: float, limit: int) -> List[dict]:
+        claimed = []
+        while len(claimed) < limit:
+            doc = await self.messages.find_one_and_update(
+                {"next_attempt": {"$lte": now}}, {"$set": {"next_attempt": now + self.lease}},
+                sort=[("next_attempt", 1)], projection={"_id": 0})
+            if doc is None:
+                break
+            claimed.append(doc)
+        return claimed
+
+    async def done(self, message: dict):
+        await self.messages.delete_one({"id": message["id"]})
+
+    async def reschedule(self, message: dict):
+        await self.messages.replace_one({"id": message["id"]}, dict(message))
+
+    async def next_due(self) -> Optional[float]:
+        doc = await self.messages.find_one({}, {"next_attempt": 1}, sort=[("next_attempt", 1)])
+        return doc["next_attempt"] if doc else None
+
+    async def count(self) -> int:
+        return await self.messages.count_documents({})
+
+
+# ----- DISPATCHER -----
+class Notifier:
+    def __init__(self, sinks: Sequence[Sink], outbox: Outbox, digest_window: float = 30.0,
+                 digest_max: int = 50, max_attempts: int = 8, base_delay: float = 30.0,
+                 max_delay: float = 3600.0, send_timeout: float = 30.0, poll_interval: float = 60.0,
+                 queue_size: int = 1000, clock=time.time):
+        """Retries wait about `base_delay` * 2**attempt seconds, at most
+        `max_delay`. `poll_interval` bounds how long another worker's new
+        messages may wait in a shared outbox."""
+        self.sinks: Dict[str, Sink] = {sink.name: sink for sink in sinks}
+        self.outbox = outbox
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.send_timeout = send_timeout
+        self.poll_interval = poll_interval
+        self.clock = clock
+        self.queue = BatchQueue(self._store, maxsize=queue_size, batch_size=digest_max,
+                                flush_interval=digest_window, name="notifications")
+        self._wake: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.sinks)
+
+    async def start(self):
+        if not self.enabled:
+            return
+        await self.outbox.open()
+        for sink in self.sinks.values():
+            await sink.open()
+        self.queue.start()
+        self._wake = asyncio.Event()
+        self._task = asyncio.create_task(self._run())
+
+    def notify(self, contacts: List[dict]):
+        """Queue notifications about new contacts; never waits."""
+        if self._task is None:
+            return
+        for contact in contacts:
+            try:
+                self.queue.put_nowait(plain(contact))
+            except asyncio.QueueFull:
+                NOTIFICATIONS.inc(("all", "dropped"))
+                logger.warning("Notification queue full; not notifying about contact %s", contact.get("id"))
+
+    async def _store(self, contacts: List[dict]):
+        now = self.clock()
+        await self.outbox.add([
+            {"id": uuid.uuid4().hex, "sink": name, "contacts": contacts, "attempts": 0,
+             "next_attempt": now, "created_at": now, "last_error": None}
+            for name in self.sinks
+        ])
+        self._wake.set()
+
+    async def _run(self):
+        while True:
+            self._wake.clear()
+            try:
+                await self.deliver_due()
+                next_due = await self.outbox.next_due()
+            except Exception:
+                logger.exception("Delivering notifications failed")
+                next_due = None
+            delay = self.poll_interval if next_due is None else max(0.0, next_due - self.clock())
+            try:
+                await asyncio.wait_for(self._wake.wait(), min(delay, self.poll_interval))
+            except asyncio.TimeoutError:
+                pass
+
+    async def deliver_due(self):
+        """Send every message that is due, each sink's in order and the sinks
+        concurrently."""
+        while True:
+            messages = await self.outbox.due(self.clock(), 100)
+            if not messages:
+                return
+            by_sink: Dict[str, List[dict]] = {}
+            for message in messages:
+                by_sink.setdefault(message["sink"], []).append(message)
+            await asyncio.gather(*(self._deliver(queue) for queue in by_sink.values()))
+
+    async def _deliver(self, messages: List[dict]):
+        for message in messages:
+            sink = self.sinks.get(message["sink"])
+            if sink is None:
+                logger.warning("Dropping notification %s for unconfigured sink %s", message["id"], message["sink"])
+                NOTIFICATIONS.inc((message["sink"], "dropped"))
+                await self.outbox.done(message)
+                continue
+            try:
+                await asyncio.wait_for(sink.send(message["contacts"]), self.send_timeout)
+            except Exception as e:
+                await self._failed(message, e)
+            else:
+                NOTIFICATIONS.inc((sink.name, "sent"))
+                await self.outbox.done(message)
+
+    async def _failed(self, message: dict, error: Exception):
+        attempts = message["attempts"] + 1
+        reason = str(error) or type(error).__name__
+        if isinstance(error, PermanentFailure) or attempts >= self.max_attempts:
+            logger.error("Giving up on %s notification %s after %d attempt(s): %s",
+                         message["sink"], message["id"], attempts, reason)
+            NOTIFICATIONS.inc((message["sink"], "failed"))
+            await self.outbox.done(message)
+            return
+        delay = max(self.backoff(attempts), getattr(error, "retry_after", None) or 0)
+        logger.warning("%s notification %s failed (%s); retrying in %.1fs", message["sink"], message["id"],
+                       reason, delay)
+        NOTIFICATIONS.inc((message["sink"], "retried"))
+        await self.outbox.reschedule({**message, "attempts": attempts, "next_attempt": self.clock() + delay,
+                                      "last_error": reason})
+
+    def backoff(self, attempts: int) -> float:
+        # Jittered, so messages that failed together don't all retry together.
+        delay = min(self.max_delay, self.base_delay * 2 ** (attempts - 1))
+        return random.uniform(delay / 2, delay)
+
+    async def close(self, timeout: float = 10.0):
+        """Move queued contacts to the outbox and stop; undelivered messages
+        are sent after the next start."""
+        if self._task is None:
+            return
+        await self.queue.drain(timeout)
+        self._task.cancel()
+        self._task = None
+        for sink in self.sinks.values():
+            await sink.close()
+        await self.outbox.close()
@@ -0,0 +1,56 @@
+"""Precompiled startup state.
+
+Most of a cold start goes into parsing data.json, validating it and building
+the indexed, pre-encoded Snapshot. After a full build the result is pickled
+next to the data file together with the store position it reflects; the next
+start unpickles it instead, as long as data.json and the code that built it
+are unchanged, and only replays the journal entries appended since.
+"""
+import os, sys, logging
+from pathlib import Path
+from typing import Iterable, Optional, Tuple
+
+from watcher import file_signature
+
+logger = logging.getLogger(__name__)
+
+FORMAT = 1
+
+
+class StartupCache:
+    def __init__(self, path, modules: Iterable[str] = (), settings: tuple = ()):
+        """`modules` are the source files whose code shapes the cached objects,
+        `settings` any configuration that does; changing either invalidates
+        the cache."""
+        self.path = Path(path)
+        self.modules = tuple(modules)
+        self.settings = settings
+
+    def code_key(self) -> tuple:
+        return (FORMAT, sys.version, tuple((m, file_signature(m)) for m in self.modules), self.settings)
+
+    def load(self) -> Optional[Tuple[dict, object, dict]]:
+        """(data, state, store position) from the last save(), or None."""
+        import pickle
+        try:
+            with open(self.path, "rb") as f:
+                cached = pickle.load(f)
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            logger.warning("Ignoring unreadable startup cache %s: %s", self.path.name, e)
+            return None
+        if cached.get("code") != self.code_key():
+            logger.info("Startup cache %s was built by different code", self.path.name)
+            return None
+        return cached["data"], cached["state"], cached["position"]
+
+    def save(self, data: dict, state, position: dict):
+        """Pickle `data` and the state built from it; both must not change meanwhile."""
+        import pickle
+        body = pickle.dumps({"code": self.code_key(), "position": position, "data": data, "state": state},
+                            protocol=pickle.HIGHEST_PROTOCOL)
+        tmp = self.path.with_suffix(self.path.suffix + ".tmp")
+        with open(tmp, "wb") as f:
+            f.write(body)
+        os.replace(tmp, self.path)
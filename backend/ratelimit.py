@@ -0,0 +1,175 @@
+"""Sliding-window rate limits and duplicate detection for form submissions.
+
+A window's count is approximated from two fixed buckets: the current one
+plus the previous one weighted by how much of it still overlaps the sliding
+window. That needs two integers per key instead of a timestamp per hit.
+
+`MemoryCounterStore` keeps the buckets in-process and evicts them once they
+can no longer affect a count; `MongoCounterStore` keeps them in MongoDB
+(expired by TTL indexes) so every worker sees the same counts.
+"""
+import time, hashlib, logging
+from abc import ABC, abstractmethod
+from datetime import datetime, timedelta
+from typing import Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class CounterStore(ABC):
+    async def open(self):
+        pass
+
+    @abstractmethod
+    async def hit(self, key: str, window: float) -> float:
+        """Count one hit on `key`; returns the hits within the last `window` seconds."""
+
+    @abstractmethod
+    async def claim(self, key: str, value: str, ttl: float) -> Optional[str]:
+        """Store `value` under `key` for `ttl` seconds unless a live value is
+        already there, which is returned instead."""
+
+    @abstractmethod
+    async def release(self, key: str):
+        """Drop a claim, e.g. when the claimed work did not happen after all."""
+
+
+class _Buckets:
+    __slots__ = ("index", "previous", "current")
+
+    def __init__(self, index: int):
+        self.index = index
+        self.previous = 0
+        self.current = 0
+
+
+def sliding_count(previous: int, current: int, now: float, window: float) -> float:
+    overlap = 1.0 - (now % window) / window
+    return previous * overlap + current
+
+
+class MemoryCounterStore(CounterStore):
+    def __init__(self, max_keys: int = 100_000, clock=time.time):
+        self.max_keys = max_keys
+        self.clock = clock
+        self._buckets: Dict[Tuple[str, float], _Buckets] = {}
+        self._claims: Dict[str, Tuple[float, str]] = {}
+        self._next_sweep = 0.0
+
+    async def hit(self, key: str, window: float) -> float:
+        now = self.clock()
+        self._maybe_sweep(now, window)
+        index = int(now // window)
+        buckets = self._buckets.get((key, window))
+        if buckets is None:
+            buckets = self._buckets[(key, window)] = _Buckets(index)
+        elif buckets.index != index:
+            buckets.previous = buckets.current if buckets.index == index - 1 else 0
+            buckets.current = 0
+            buckets.index = index
+        buckets.current += 1
+        return sliding_count(buckets.previous, buckets.current, now, window)
+
+    async def claim(self, key: str, value: str, ttl: float) -> Optional[str]:
+        now = self.clock()
+        existing = self._claims.get(key)
+        if existing is not None and existing[0] > now:
+            return existing[1]
+        self._claims[key] = (now + ttl, value)
+        self._maybe_sweep(now, ttl)
+        return None
+
+    async def release(self, key: str):
+        self._claims.pop(key, None)
+
+    def __len__(self) -> int:
+        return len(self._buckets) + len(self._claims)
+
+    def _maybe_sweep(self, now: float, interval: float):
+        if now < self._next_sweep and len(self) < self.max_keys:
+            return
+        self._next_sweep = now + min(interval, 60.0)
+        # A bucket older than the previous window can no longer count.
+        self._buckets = {k: b for k, b in self._buckets.items() if b.index >= int(now // k[1]) - 1}
+        self._claims = {k: c for k, c in self._claims.items() if c[0] > now}
+        # Still full of live keys (e.g. a distributed flood): drop the oldest
+        # tenth, so a flood doesn't trigger a full sweep on every hit.
+        overflow = len(self) - self.max_keys * 9 // 10
+        if len(self) >= self.max_keys and overflow > 0:
+            logger.warning("Rate limit store full; evicting %d keys", overflow)
+            for k in list(self._buckets)[:overflow]:
+                del self._buckets[k]
+            for k in list(self._claims)[:len(self) - self.max_keys * 9 // 10]:
+                del self._claims[k]
+
+
+class MongoCounterStore(CounterStore):
+    """Counters shared through the database of an opened `MotorBackend`."""
+
+    def __init__(self, backend, buckets: str = "rate_limits", claims: str = "submission_claims"):
+        self.backend = backend
+        self.names = (buckets, claims)
+        self.buckets = self.claims = None
+
+    async def open(self):
+        self.buckets, self.claims = (self.backend.db[name] for name in self.names)
+        await self.buckets.create_index("expires_at", expireAfterSeconds=0)
+        await self.claims.create_index("expires_at", expireAfterSeconds=0)
+
+    async def hit(self, key: str, window: float) -> float:
+        from pymongo import ReturnDocument
+        now = time.time()
+        index = int(now // window)
+        doc = await self.buckets.find_one_and_update(
+            {"_id": f"{key}:{window:g}:{index}"},
+            {"$inc": {"count": 1},
+             "$setOnInsert": {"expires_at": datetime.utcfromtimestamp((index + 2) * window)}},
+            upsert=True, return_document=ReturnDocument.AFTER,
+        )
+        previous = await self.buckets.find_one({"_id": f"{key}:{window:g}:{index - 1}"})
+        return sliding_count(previous["count"] if previous else 0, doc["count"], now, window)
+
+    async def claim(self, key: str, value: str, ttl: float) -> Optional[str]:
+        from pymongo.errors import DuplicateKeyError
+        now = datetime.utcnow()
+        try:
+            await self.claims.insert_one({"_id": key, "value": value, "expires_at": now + timedelta(seconds=ttl)})
+            return None
+        except DuplicateKeyError:
+            pass
+        # The TTL monitor only runs once a minute, so an expired claim may linger.
+        existing = await self.claims.find_one_and_update(
+            {"_id": key, "expires_at": {"$lte": now}},
+            {"$set": {"value": value, "expires_at": now + timedelta(seconds=ttl)}},
+        )
+        if existing is not None:
+            return None
+        existing = await self.claims.find_one({"_id": key})
+        return existing["value"] if existing else None
+
+    async def release(self, key: str):
+        await self.claims.delete_one({"_id": key})
+
+
+class SlidingWindowLimit:
+    def __init__(self, store: CounterStore, limit: int, window: float, prefix: str):
+        self.store = store
+        self.limit = limit
+        self.window = window
+        self.prefix = prefix
+
+    async def check(self, key: str) -> Optional[int]:
+        """Seconds to wait before retrying, or None while under the limit."""
+        if self.limit <= 0:
+            return None
+        count = await self.store.hit(f"{self.prefix}:{key}", self.window)
+        if count <= self.limit:
+            return None
+        # Roughly when enough of the older hits slide out of the window.
+        return max(1, int(self.window * (count - self.limit) / count) + 1)
+
+
+def content_hash(*parts: str) -> str:
+    """Normalized hash of a submission, so trivial resubmissions collide."""
+    normalized = "\x00".join(" ".join(p.split()).casefold() for p in parts)
+    return hashlib.blake2b(normalized.encode(), digest_size=16).hexdigest()
@@ -0,0 +1,134 @@
+"""Pre-serialized response cache for the read endpoints.
+
+Each endpoint's filtered, sorted and JSON-encoded body is built once per data
+version and then served as raw bytes with a strong, content-derived ETag.
+Compressed variants are produced at most once per payload, off the event
+loop when a request needs one that wasn't pre-warmed. Every Snapshot
+has a ReadModel of its own, so a write or reload that swaps in a new
+snapshot starts from an empty cache and nothing is ever invalidated.
+"""
+import asyncio, hashlib
+from collections import OrderedDict
+from typing import Callable, Dict, Hashable, Optional
+
+from fastapi import Request
+from fastapi.encoders import jsonable_encoder
+from starlette.responses import JSONResponse, Response
+
+import jsoncodec
+from compression import MIN_SIZE, compress, negotiate_encoding
+from metrics import SERIALIZATION_DURATION
+
+CACHE_CONTROL = "public, max-age=0, must-revalidate"
+
+
+class CachedPayload:
+    __slots__ = ("body", "digest", "etag", "_variants")
+
+    def __init__(self, body: bytes):
+        self.body = body
+        self.digest = hashlib.blake2b(body, digest_size=16).hexdigest()
+        self.etag = '"%s"' % self.digest
+        self._variants: Dict[str, bytes] = {}
+
+    def variant(self, encoding: Optional[str], best: bool = False) -> bytes:
+        """The body in `encoding`, compressed on first use. Blocking."""
+        if encoding is None or len(self.body) < MIN_SIZE:
+            return self.body
+        data = self._variants.get(encoding)
+        if data is None:
+            with SERIALIZATION_DURATION.time((encoding,)):
+                data = self._variants[encoding] = compress(self.body, encoding, best)
+        return data
+
+    async def encoded(self, encoding: Optional[str]) -> bytes:
+        """`variant()`, compressing in a worker thread if it isn't cached."""
+        if encoding is None or len(self.body) < MIN_SIZE or encoding in self._variants:
+            return self.variant(encoding)
+        return await asyncio.to_thread(self.variant, encoding)
+
+    def etag_for(self, encoding: Optional[str]) -> str:
+        # Each encoding is its own representation, so it needs its own strong ETag.
+        if encoding is None or len(self.body) < MIN_SIZE:
+            return self.etag
+        return '"%s-%s"' % (self.digest, encoding)
+
+
+def encode(content) -> bytes:
+    # The same JSON as FastAPI's JSONResponse of jsonable_encoder(content);
+    # Records encode as the dicts they stand for, models the way FastAPI would.
+    return jsoncodec.dumps(content, default=jsonable_encoder)
+
+
+class FastJSONResponse(JSONResponse):
+    """A JSONResponse whose content may hold Records, datetimes and models,
+    encoded in one pass without jsonable_encoder()."""
+
+    def render(self, content) -> bytes:
+        return encode(content)
+
+
+class ReadModel:
+    def __init__(self, max_entries: int = 256):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[Hashable, Optional[CachedPayload]]" = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: Hashable, build: Callable[[], object]) -> Optional[CachedPayload]:
+        """Return the cached payload for `key`, building it on first use.
+
+        `build` returns the response content, or None when there is nothing to
+        serve (e.g. a missing profile); that outcome is cached too.
+        """
+        def build_bytes():
+            content = build()
+            if content is None:
+                return None
+            with SERIALIZATION_DURATION.time(("json",)):
+                return encode(content)
+        return self.get_bytes(key, build_bytes)
+
+    def get_bytes(self, key: Hashable, build: Callable[[], Optional[bytes]]) -> Optional[CachedPayload]:
+        """Like `get()`, for builders that return an already-encoded body."""
+        try:
+            payload = self._entries[key]
+            self._entries.move_to_end(key)
+            return payload
+        except KeyError:
+            pass
+        body = build()
+        payload = None if body is None else CachedPayload(body)
+        self._entries[key] = payload
+        if len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+        return payload
+
+
+def etag_matches(if_none_match: Optional[str], digest: str) -> bool:
+    """True if any listed tag names this payload, in whichever encoding."""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    for tag in if_none_match.split(","):
+        tag = tag.strip().removeprefix("W/").strip('"')
+        if tag == digest or tag.startswith(digest + "-"):
+            return True
+    return False
+
+
+async def cached_response(request: Request, payload: CachedPayload, headers: Optional[dict] = None,
+                    cache_control: str = CACHE_CONTROL) -> Response:
+    encoding = negotiate_encoding(request.headers.get("accept-encoding"))
+    headers = dict(headers or {})
+    headers["ETag"] = payload.etag_for(encoding)
+    headers["Cache-Control"] = cache_control
+    headers["Vary"] = ", ".join(filter(None, (headers.get("Vary"), "Accept-Encoding")))
+    if etag_matches(request.headers.get("if-none-match"), payload.digest):
+        return Response(status_code=304, headers=headers)
+    body = await payload.encoded(encoding)
+    if body is not payload.body:
+        headers["Content-Encoding"] = encoding
+    return Response(content=body, media_type="application/json", headers=headers)
@@ -0,0 +1,107 @@
+"""Compact read-only records for the published collections.
+
+A stored document is validated against its model once, when it is loaded,
+and then kept as a `Record`: a tuple of values in model field order, with
+the field names held once per collection by its `Schema`. Language codes
+and other short strings that repeat across documents (technology names,
+statuses, ...) are interned, so a large collection shares one copy of each
+instead of one per document.
+
+Records are read-only Mappings, so code written against the stored dicts
+keeps working, and their fields are exactly what the model would dump, so
+responses serialize straight from them without building model instances.
+"""
+import sys
+from collections.abc import Mapping
+from typing import Dict, Iterable, Iterator, Optional, Tuple
+
+_SCHEMAS: Dict[str, "Schema"] = {}
+
+
+def _schema(name: str) -> "Schema":
+    return _SCHEMAS[name]
+
+
+class Schema:
+    __slots__ = ("name", "model", "fields", "positions", "interned")
+
+    def __init__(self, name: str, model, interned: Iterable[str] = ()):
+        """`interned` names the fields whose strings (or strings in a list)
+        repeat across documents."""
+        self.name = name
+        self.model = model
+        self.fields: Tuple[str, ...] = tuple(model.model_fields)
+        self.positions = {f: i for i, f in enumerate(self.fields)}
+        self.interned = frozenset(interned)
+        _SCHEMAS[name] = self
+
+    def __reduce__(self):
+        # Unpickled records must share the live schema, not a copy of it.
+        return _schema, (self.name,)
+
+    def record(self, doc: Mapping, validate: bool = True) -> "Record":
+        """`doc` as a Record; raises ValidationError if it doesn't fit the
+        model. Records of this schema are returned as they are."""
+        if isinstance(doc, Record) and doc.schema is self:
+            return doc
+        if validate:
+            doc = self.model(**doc).model_dump()
+        return Record(self, tuple(self._compact(f, doc.get(f)) for f in self.fields))
+
+    def _compact(self, field: str, value):
+        intern = field in self.interned
+        if isinstance(value, str):
+            return sys.intern(value) if intern else value
+        if isinstance(value, dict):
+            # Localized text: keys are language codes, and untranslated
+            # entries often repeat another language's text.
+            texts = {}
+            return {sys.intern(k) if isinstance(k, str) else k: texts.setdefault(v, v) if isinstance(v, str) else v
+                    for k, v in value.items()}
+        if isinstance(value, list):
+            return tuple(sys.intern(v) if intern and isinstance(v, str) else v for v in value)
+        return value
+
+
+class Record(Mapping):
+    __slots__ = ("schema", "values")
+
+    def __init__(self, schema: Schema, values: tuple):
+        self.schema = schema
+        self.values = values
+
+    def __getitem__(self, key: str):
+        return self.values[self.schema.positions[key]]
+
+    def get(self, key: str, default=None):
+        pos = self.schema.positions.get(key)
+        return default if pos is None else self.values[pos]
+
+    def __contains__(self, key) -> bool:
+        return key in self.schema.positions
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.schema.fields)
+
+    def __len__(self) -> int:
+        return len(self.values)
+
+    def __eq__(self, other) -> bool:
+        if isinstance(other, Record) and other.schema is self.schema:
+            return self.values == other.values
+        return Mapping.__eq__(self, other)
+
+    __hash__ = None
+
+    def __reduce__(self):
+        return Record, (self.schema, self.values)
+
+    def __repr__(self) -> str:
+        return f"Record({self.schema.name}, {dict(self)!r})"
+
+    def project(self, fields: Optional[Iterable[str]] = None) -> dict:
+        """A plain dict of `fields` (default: all), in model field order."""
+        if fields is None:
+            return dict(zip(self.schema.fields, self.values))
+        wanted = set(fields)
+        return {f: v for f, v in zip(self.schema.fields, self.values) if f in wanted}
@@ -0,0 +1,191 @@
+"""Indexed in-memory view over the loaded data.
+
+Each collection keeps a primary-key hash index plus secondary hash indexes on
+a few low-cardinality fields, so lookups by id and equality filters never
+scan the underlying list. The lists in `Repository.data` stay the source of
+truth for persistence; the indexes are maintained alongside them.
+"""
+from bisect import bisect_left, insort
+from datetime import datetime, timezone
+from itertools import combinations
+from typing import Dict, Iterator, List, Optional, Tuple
+
+INDEXED_FIELDS = {
+    "projects": ("status", "type", "featured"),
+    "services": ("active",),
+    "testimonials": ("approved", "featured"),
+    "contacts": ("status", "language"),
+}
+
+# Collections paged newest-first by (created_at, id), per combination of these fields.
+TIMELINE_FIELDS = {
+    "contacts": ("status", "language"),
+}
+
+
+def naive_utc(value: datetime) -> datetime:
+    """`value` as naive UTC, the way stored datetimes compare with each
+    other; raises OverflowError at the very ends of the range."""
+    if value.tzinfo is None:
+        return value
+    return value.astimezone(timezone.utc).replace(tzinfo=None)
+
+
+def sort_key(doc: dict) -> Tuple[datetime, str]:
+    created = doc.get("created_at")
+    if isinstance(created, str):
+        try:
+            created = datetime.fromisoformat(created)
+        except ValueError:
+            created = None
+    if isinstance(created, datetime):
+        try:
+            created = naive_utc(created)
+        except OverflowError:
+            created = None
+    else:
+        created = None
+    return (created or datetime.min, str(doc.get("id") or ""))
+
+
+class TimelineIndex:
+    """(created_at, id) keys kept sorted for every combination of `fields`.
+
+    A page is a bisect into the matching list plus a slice, so paging cost
+    doesn't depend on how deep the cursor is or how many docs exist.
+    """
+    def __init__(self, fields: Tuple[str, ...]):
+        self.fields = fields
+        self.lists: Dict[tuple, List[Tuple[datetime, str]]] = {}
+
+    def _buckets(self, doc: dict):
+        for n in range(len(self.fields) + 1):
+            for combo in combinations(self.fields, n):
+                yield tuple((f, doc.get(f)) for f in combo)
+
+    def add(self, doc: dict):
+        key = sort_key(doc)
+        for bucket in self._buckets(doc):
+            keys = self.lists.setdefault(bucket, [])
+            if not keys or keys[-1] <= key:
+                keys.append(key)
+            else:
+                insort(keys, key)
+
+    def remove(self, doc: dict):
+        key = sort_key(doc)
+        for bucket in self._buckets(doc):
+            keys = self.lists.get(bucket)
+            if keys:
+                i = bisect_left(keys, key)
+                if i < len(keys) and keys[i] == key:
+                    del keys[i]
+
+    def page(self, filters: dict, before: Optional[Tuple[datetime, str]], limit: int):
+        """Up to `limit` keys older than `before`, newest first."""
+        bucket = tuple((f, filters[f]) for f in self.fields if filters.get(f) is not None)
+        keys = self.lists.get(bucket, [])
+        end = len(keys) if before is None else bisect_left(keys, before)
+        return keys[max(0, end - limit):end][::-1]
+
+
+class Collection:
+    def __init__(self, docs: list, indexed: Tuple[str, ...] = (),
+                 timeline: Optional[Tuple[str, ...]] = None):
+        self.docs = docs
+        self.positions: Dict[str, int] = {}
+        self.indexes: Dict[str, Dict[object, Dict[str, dict]]] = {f: {} for f in indexed}
+        self.timeline = TimelineIndex(timeline) if timeline is not None else None
+        for pos, doc in enumerate(docs):
+            self.positions[doc.get("id")] = pos
+            self._index(doc)
+
+    def __len__(self) -> int:
+        return len(self.docs)
+
+    def __iter__(self) -> Iterator[dict]:
+        return iter(self.docs)
+
+    def _index(self, doc: dict):
+        doc_id = doc.get("id")
+        for field, index in self.indexes.items():
+            index.setdefault(doc.get(field), {})[doc_id] = doc
+        if self.timeline is not None:
+            self.timeline.add(doc)
+
+    def _unindex(self, doc: dict):
+        doc_id = doc.get("id")
+        if self.timeline is not None:
+            self.timeline.remove(doc)
+        for field, index in self.indexes.items():
+            bucket = index.get(doc.get(field))
+            if bucket is not None:
+                bucket.pop(doc_id, None)
+                if not bucket:
+                    del index[doc.get(field)]
+
+    def get(self, doc_id: str) -> Optional[dict]:
+        pos = self.positions.get(doc_id)
+        return None if pos is None else self.docs[pos]
+
+    def upsert(self, doc: dict):
+        doc_id = doc.get("id")
+        pos = self.positions.get(doc_id)
+        if pos is None:
+            self.positions[doc_id] = len(self.docs)
+            self.docs.append(doc)
+        else:
+            self._unindex(self.docs[pos])
+            self.docs[pos] = doc
+        self._index(doc)
+
+    def find(self, **filters) -> list:
+        """Equality match on indexed fields; None values are ignored."""
+        buckets = []
+        for field, value in filters.items():
+            if value is None:
+                continue
+            if field not in self.indexes:
+                raise KeyError(f"'{field}' is not an indexed field")
+            bucket = self.indexes[field].get(value)
+            if not bucket:
+                return []
+            buckets.append(bucket)
+        if not buckets:
+            return list(self.docs)
+        buckets.sort(key=len)
+        first, rest = buckets[0], buckets[1:]
+        matches = [doc for doc_id, doc in first.items() if all(doc_id in b for b in rest)]
+        # Buckets drift from list order once a doc changes an indexed value.
+        matches.sort(key=lambda d: self.positions[d.get("id")])
+        return matches
+
+    def page(self, filters: dict, before: Optional[Tuple[datetime, str]] = None,
+             limit: int = 50) -> List[dict]:
+        """Newest-first keyset page; see TimelineIndex."""
+        return [self.get(doc_id) for _, doc_id in self.timeline.page(filters, before, limit)]
+
+
+class Repository:
+    def __init__(self, data: dict, shared: Optional[Dict[str, Collection]] = None):
+        """`shared` hands over already-built collections, e.g. the live
+        contacts across a reload, instead of indexing `data`'s copy."""
+        self.data = data
+        self.collections = {}
+        for name, fields in INDEXED_FIELDS.items():
+            if shared and name in shared:
+                self.collections[name] = shared[name]
+                data[name] = shared[name].docs
+            else:
+                self.collections[name] = Collection(data.setdefault(name, []), fields,
+                                                    TIMELINE_FIELDS.get(name))
+
+    def __getitem__(self, name: str) -> Collection:
+        return self.collections[name]
+
+    @property
+    def profile(self) -> Optional[dict]:
+        return self.data.get("profile")
+
+    def insert(self, collection: str, doc: dict):
+        self.collections[collection].upsert(doc)
@@ -0,0 +1,210 @@
+"""In-memory full-text search over the public portfolio content.
+
+Every searchable document is analysed once per language (accent-folded,
+case-folded word tokens, weighted by field) into an inverted index of
+`term -> [(doc, weighted tf)]`. Queries are ranked with BM25; the last
+query word also matches as a prefix so results can follow the user's
+typing. A new index reuses the analysis of every document whose searchable
+fields did not change since the previous one, so a reload only re-tokenizes
+what was edited. Terms are interned, so the per-document analyses and the
+postings share one string per distinct word.
+"""
+import re, sys, math, heapq, unicodedata
+from bisect import bisect_left
+from collections import defaultdict
+from itertools import islice
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from i18n import fallback_chain, pick
+
+# collection -> {field: weight}
+SEARCH_FIELDS = {
+    "projects": {"name": 3.0, "technologies": 2.0, "type": 1.5, "description": 1.0},
+    "services": {"title": 3.0, "description": 1.0},
+    "testimonials": {"name": 1.5, "role": 1.0, "content": 1.0},
+}
+
+K1 = 1.2
+B = 0.75
+MAX_EXPANSIONS = 50
+
+TOKEN_RE = re.compile(r"\w+")
+
+
+def fold(text: str) -> str:
+    """Lower-case and strip accents: "Développeur" -> "developpeur"."""
+    if text.isascii():
+        return text.lower()
+    decomposed = unicodedata.normalize("NFKD", text)
+    return "".join(c for c in decomposed if not unicodedata.combining(c)).casefold()
+
+
+def tokenize(text: str) -> List[str]:
+    return TOKEN_RE.findall(fold(text))
+
+
+def field_texts(value, chain: Optional[Tuple[str, ...]]) -> List[str]:
+    """The strings to index for one field; every translation when `chain` is None."""
+    if isinstance(value, dict):
+        if chain is None:
+            return [v for v in value.values() if isinstance(v, str)]
+        return [pick(value, chain)]
+    if isinstance(value, (list, tuple)):
+        return [v for v in value if isinstance(v, str)]
+    return [value] if isinstance(value, str) else []
+
+
+class _Postings:
+    """The inverted index for one language, with BM25 scores precomputed per posting."""
+    __slots__ = ("docs", "postings", "terms", "_ranked")
+
+    def __init__(self, analyzed: List[Tuple[Tuple[str, str], Tuple[str, ...], Tuple[float, ...], float]]):
+        self.docs = [key for key, _, _, _ in analyzed]
+        lengths = [length for _, _, _, length in analyzed]
+        avg = (sum(lengths) / len(lengths)) if lengths else 0.0
+        avg = avg or 1.0
+        postings = defaultdict(list)
+        for i, (_, terms, tfs, _) in enumerate(analyzed):
+            for term, tf in zip(terms, tfs):
+                postings[term].append((i, tf))
+        n = len(self.docs)
+        self.postings: Dict[str, Dict[int, float]] = {}
+        for term, docs in postings.items():
+            idf = math.log(1 + (n - len(docs) + 0.5) / (len(docs) + 0.5))
+            self.postings[term] = {
+                i: idf * tf * (K1 + 1) / (tf + K1 * (1 - B + B * lengths[i] / avg))
+                for i, tf in docs
+            }
+        self.terms = sorted(self.postings)
+        self._ranked: Dict[str, List[int]] = {}
+
+    def expand(self, prefix: str) -> List[str]:
+        """Indexed terms starting with `prefix`, most common first."""
+        matches = []
+        for i in range(bisect_left(self.terms, prefix), len(self.terms)):
+            if not self.terms[i].startswith(prefix):
+                break
+            matches.append(self.terms[i])
+        if len(matches) > MAX_EXPANSIONS:
+            matches.sort(key=lambda t: -len(self.postings[t]))
+            del matches[MAX_EXPANSIONS:]
+        return matches
+
+    def ranked(self, term: str) -> List[int]:
+        """Documents containing `term`, best first; sorted once, on first use."""
+        ranked = self._ranked.get(term)
+        if ranked is None:
+            scores = self.postings[term]
+            ranked = self._ranked[term] = sorted(scores, key=scores.__getitem__, reverse=True)
+        return ranked
+
+    def search(self, words: List[str], prefix: bool) -> Tuple[Dict[int, float], Optional[str]]:
+        """Scores of the documents matching every word.
+
+        When the query comes down to a single indexed term, that term is
+        returned as well so callers can read its presorted ranking instead of
+        sorting the scores.
+        """
+        alternatives = [self.expand(word) if prefix and j == len(words) - 1 else [word]
+                        for j, word in enumerate(words)]
+        if len(alternatives) == 1 and len(alternatives[0]) == 1:
+            term = alternatives[0][0]
+            return self.postings.get(term, {}), term if term in self.postings else None
+        total: Optional[Dict[int, float]] = None
+        # Rarest word first keeps the running intersection small.
+        for terms in sorted(alternatives, key=lambda ts: sum(len(self.postings.get(t, ())) for t in ts)):
+            if len(terms) == 1:
+                best = self.postings.get(terms[0], {})
+            else:
+                best = {}
+                for term in terms:
+                    for i, score in self.postings[term].items():
+                        if score > best.get(i, 0.0):
+                            best[i] = score
+            if total is None:
+                total = dict(best)
+            else:
+                total = {i: s + best[i] for i, s in total.items() if i in best}
+            if not total:
+                return {}, None
+        return total, None
+
+
+class SearchIndex:
+    """Immutable per-snapshot index over `{collection: [doc, ...]}`."""
+
+    def __init__(self, sources: Dict[str, Iterable[dict]], languages: Tuple[str, ...],
+                 previous: Optional["SearchIndex"] = None):
+        self.languages = languages
+        reusable = previous._analysis if previous is not None and previous.languages == languages else {}
+        self._analysis: Dict[Tuple[str, str], tuple] = {}
+        # Weighted term frequencies take few distinct values; share the floats.
+        self._weights: Dict[float, float] = {}
+        self.reused = 0
+        for collection, docs in sources.items():
+            fields = SEARCH_FIELDS[collection]
+            for doc in docs:
+                key = (collection, doc["id"])
+                source = tuple(doc.get(f) for f in fields)
+                cached = reusable.get(key)
+                if cached is not None and cached[0] == source:
+                    self.reused += 1
+                else:
+                    cached = (source, self._analyze(fields, source))
+                self._analysis[key] = cached
+        self._indexes = {
+            lang: _Postings([(key, *analysis[1][lang]) for key, analysis in self._analysis.items()])
+            for lang in (None, *languages)
+        }
+
+    def _analyze(self, fields: Dict[str, float],
+                 source: tuple) -> Dict[Optional[str], Tuple[Tuple[str, ...], Tuple[float, ...], float]]:
+        """Per language: the document's terms, their weighted frequencies and its length."""
+        analyzed = {}
+        tokenized: Dict[str, List[str]] = {}  # translations recur across languages
+        for lang in (None, *self.languages):
+            chain = fallback_chain(lang, self.languages) if lang else None
+            terms: Dict[str, float] = defaultdict(float)
+            length = 0.0
+            for weight, value in zip(fields.values(), source):
+                for text in field_texts(value, chain):
+                    tokens = tokenized.get(text)
+                    if tokens is None:
+                        tokens = tokenized[text] = [sys.intern(t) for t in tokenize(text)]
+                    length += weight * len(tokens)
+                    for token in tokens:
+                        terms[token] += weight
+            # Kept for reuse by the next index: two tuples are far smaller
+            # than a dict per document and language.
+            weights = tuple(self._weights.setdefault(tf, tf) for tf in terms.values())
+            analyzed[lang] = (tuple(terms), weights, length)
+        return analyzed
+
+    def __len__(self) -> int:
+        return len(self._analysis)
+
+    def search(self, query: str, lang: Optional[str] = None, limit: int = 20,
+               collection: Optional[str] = None) -> Tuple[int, List[Tuple[str, str, float]]]:
+        """(total hits, [(collection, id, score)]) for `query`.
+
+        The last word is matched as a prefix unless the query ends in
+        whitespace, i.e. the user has finished typing it.
+        """
+        words = tokenize(query)
+        if not words:
+            return 0, []
+        index = self._indexes.get(lang, self._indexes[None])
+        scores, term = index.search(words, prefix=not query[-1:].isspace())
+        if term is not None and collection is None:
+            best = index.ranked(term)[:limit]
+            total = len(scores)
+        elif term is not None:
+            matching = (i for i in index.ranked(term) if index.docs[i][0] == collection)
+            best = list(islice(matching, limit))
+            total = sum(1 for doc_collection, _ in map(index.docs.__getitem__, scores) if doc_collection == collection)
+        else:
+            if collection is not None:
+                scores = {i: score for i, score in scores.items() if index.docs[i][0] == collection}
+            best = heapq.nlargest(limit, scores, key=scores.__getitem__)
+            total = len(scores)
+        return total, [(*index.docs[i], round(scores[i], 4)) for i in best]
@@ -1,18 +1,40 @@
-from fastapi import FastAPI, APIRouter, HTTPException
+from fastapi import FastAPI, APIRouter, Depends, HTTPException, Query, Request
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import FileResponse, Response, StreamingResponse
+from fastapi.exceptions import RequestValidationError
 from dotenv import load_dotenv
 from starlette.middleware.cors import CORSMiddleware
+from starlette.middleware.gzip import GZipMiddleware
 from pathlib import Path
-from pydantic import BaseModel, Field
-from typing import List, Optional, Dict
-import uuid, os, logging, json
+from pydantic import BaseModel, Field, ValidationError
+from typing import List, Literal, Optional, Dict, Tuple
+import uuid, os, logging, asyncio, json, base64, time, hmac, tempfile
 from datetime import datetime
 
-ROOT_DIR = Path(__file__).parent
-DATA_FILE = ROOT_DIR / "data/data.json"
+import changelog, jsoncodec
+from storage import JournalStore, JsonFileBackend, MotorBackend, StorageBackend
+from readmodel import FastJSONResponse, ReadModel, cached_response
+from repository import Repository, naive_utc, sort_key
+from records import Schema
+from watcher import DataFileWatcher
+from ingest import BatchQueue
+from analytics import VisitRollups
+from compression import ENCODINGS, MIN_SIZE
+from search import SEARCH_FIELDS, SearchIndex
+from precompiled import StartupCache
+from notify import FileOutbox, LogSink, MongoOutbox, Notifier, Sink, SmtpSink, WebhookSink
+from images import HAVE_PILLOW, MEDIA_TYPES, VARIANT_RE, ImageStore, InvalidImage, VariantCache
+from ratelimit import CounterStore, MemoryCounterStore, MongoCounterStore, SlidingWindowLimit, content_hash
+from metrics import (REGISTRY, CONTENT_TYPE as METRICS_CONTENT_TYPE, RELOAD_DURATION, STORAGE_DURATION,
+                     MetricsMiddleware)
+from i18n import LOCALIZED_FIELDS, available_languages, fallback_chain, localize, negotiate, resolve_language
 
+ROOT_DIR = Path(__file__).parent
 load_dotenv(ROOT_DIR / ".env")
 
-app = FastAPI(title="FufuDev Portfolio API", version="1.0.0")
+DATA_FILE = Path(os.environ.get("DATA_FILE", ROOT_DIR / "data/data.json"))
+
+app = FastAPI(title="FufuDev Portfolio API", version="1.0.0", default_response_class=FastJSONResponse)
 api_router = APIRouter(prefix="/api")
 
 # ----- MODELS -----
@@ -80,18 +102,346 @@ class Testimonial(BaseModel):
     featured: bool = False
     created_at: datetime = Field(default_factory=datetime.utcnow)
 
+class VisitCreate(BaseModel):
+    page: str
+    referrer: Optional[str] = None
+    user_agent: Optional[str] = Field(None, alias="userAgent")
+    language: str = "en"
+
+    model_config = {"populate_by_name": True}
+
 # ----- DATA LOADING -----
-def load_data():
-    if not DATA_FILE.exists():
-        return {"projects": [], "services": [], "profile": None, "testimonials": [], "contacts": []}
-    with open(DATA_FILE, "r", encoding="utf-8") as f:
-        return json.load(f)
+store = JournalStore(
+    DATA_FILE,
+    fsync_batch=int(os.environ.get("JOURNAL_FSYNC_BATCH", "32")),
+    fsync_interval=float(os.environ.get("JOURNAL_FSYNC_INTERVAL", "1.0")),
+    compact_every=int(os.environ.get("JOURNAL_COMPACT_EVERY", "1000")),
+)
+
+def create_storage() -> StorageBackend:
+    if os.environ.get("STORAGE_BACKEND", "json") == "mongo":
+        return MotorBackend(
+            os.environ["MONGO_URL"],
+            os.environ.get("DB_NAME", "FufuDev"),
+            seed_file=DATA_FILE,
+            max_pool_size=int(os.environ.get("MONGO_MAX_POOL_SIZE", "50")),
+        )
+    return JsonFileBackend(store)
+
+storage = create_storage()
+
+def create_rate_store() -> CounterStore:
+    # Workers sharing a database share their counters too.
+    if isinstance(storage, MotorBackend) and os.environ.get("RATE_LIMIT_STORE", "shared") == "shared":
+        return MongoCounterStore(storage)
+    return MemoryCounterStore(max_keys=int(os.environ.get("RATE_LIMIT_MAX_KEYS", "100000")))
+
+rate_store = create_rate_store()
+
+images = ImageStore(
+    Path(os.environ.get("IMAGE_UPLOAD_DIR", DATA_FILE.parent / "uploads")),
+    VariantCache(Path(os.environ.get("IMAGE_CACHE_DIR", DATA_FILE.parent / "image-cache")),
+                 max_bytes=int(os.environ.get("IMAGE_CACHE_MB", "512")) * 2**20),
+    workers=int(os.environ.get("IMAGE_WORKERS", "2")),
+    max_upload=int(os.environ.get("IMAGE_MAX_UPLOAD_MB", "10")) * 2**20,
+    base_url=os.environ.get("IMAGE_BASE_URL", ""),
+)
+
+def create_sinks() -> List[Sink]:
+    sinks = []
+    for name in filter(None, (s.strip() for s in os.environ.get("NOTIFY_SINKS", "").split(","))):
+        if name == "smtp":
+            sinks.append(SmtpSink(
+                os.environ["NOTIFY_SMTP_HOST"],
+                int(os.environ.get("NOTIFY_SMTP_PORT", "587")),
+                sender=os.environ.get("NOTIFY_SMTP_FROM", ""),
+                recipients=[r.strip() for r in os.environ["NOTIFY_SMTP_TO"].split(",") if r.strip()],
+                username=os.environ.get("NOTIFY_SMTP_USER"),
+                password=os.environ.get("NOTIFY_SMTP_PASSWORD"),
+                security=os.environ.get("NOTIFY_SMTP_SECURITY", "starttls"),
+            ))
+        elif name == "webhook":
+            sinks.append(WebhookSink(os.environ["NOTIFY_WEBHOOK_URL"], os.environ.get("NOTIFY_WEBHOOK_SECRET")))
+        elif name == "log":
+            sinks.append(LogSink())
+        else:
+            raise ValueError(f"Unknown notification sink {name!r} in NOTIFY_SINKS")
+    return sinks
+
+notifier = Notifier(
+    create_sinks(),
+    # Workers sharing a database share the outbox too.
+    MongoOutbox(storage) if isinstance(storage, MotorBackend) else FileOutbox(DATA_FILE.with_suffix(".outbox.json")),
+    digest_window=float(os.environ.get("NOTIFY_DIGEST_WINDOW", "30")),
+    digest_max=int(os.environ.get("NOTIFY_DIGEST_MAX", "50")),
+    max_attempts=int(os.environ.get("NOTIFY_MAX_ATTEMPTS", "8")),
+    base_delay=float(os.environ.get("NOTIFY_RETRY_DELAY", "30")),
+    max_delay=float(os.environ.get("NOTIFY_MAX_RETRY_DELAY", "3600")),
+)
+
+async def load_data() -> dict:
+    with STORAGE_DURATION.time(("load",)):
+        return await storage.load()
+
+# The published collections are held as compact Records; see records.py.
+SCHEMAS = {
+    "projects": Schema("projects", Project, interned=("technologies", "status", "type")),
+    "services": Schema("services", Service, interned=("icon",)),
+    "testimonials": Schema("testimonials", Testimonial, interned=("company",)),
+}
+
+def compact_data(data: dict, validate: bool = True):
+    """Turn the published documents into Records in place, validating the
+    ones that aren't Records yet. Raises ValidationError if any doesn't fit
+    its model."""
+    for name, schema in SCHEMAS.items():
+        docs = data.setdefault(name, [])
+        for i, doc in enumerate(docs):
+            docs[i] = schema.record(doc, validate)
+    if validate and data.get("profile"):
+        Profile(**data["profile"])
+
+class Snapshot:
+    """One immutable, indexed and pre-serialized version of the data.
+
+    Requests read `snapshot` once and use only that object, so a reload
+    swapping in a new one never exposes a half-built state. The contacts
+    collection is the exception: it is append-only and carried across swaps.
+    """
+    def __init__(self, data: dict, version: int, shared: Optional[dict] = None,
+                 previous_search: Optional[SearchIndex] = None):
+        self.version = version
+        self.repo = Repository(data, shared)
+        self.languages = available_languages(data)
+        self.read_model = ReadModel()
+        self.search = SearchIndex({
+            "projects": self.repo["projects"].find(status="active"),
+            "services": self.repo["services"].find(active=True),
+            "testimonials": self.repo["testimonials"].find(approved=True),
+        }, self.languages, previous_search)
+        for lang in (None, *self.languages):
+            for name in BOOTSTRAP_VIEWS:
+                build = READ_VIEWS[name]
+                payload = self.read_model.get((name, lang), lambda: build(self, lang=lang))
+                for encoding in ENCODINGS if payload else ():
+                    payload.variant(encoding, best=True)
+            payload = self.bootstrap(lang)
+            for encoding in ENCODINGS:
+                payload.variant(encoding, best=True)
+
+    def bootstrap(self, lang: Optional[str]):
+        """All first-paint views in one body, spliced from their cached bytes."""
+        def build():
+            parts = []
+            for name in BOOTSTRAP_VIEWS:
+                payload = self.read_model.get((name, lang), lambda: READ_VIEWS[name](self, lang=lang))
+                parts.append(b'"%s":%s' % (name.encode(), payload.body if payload else b"null"))
+            return b"{" + b",".join(parts) + b"}"
+        return self.read_model.get_bytes(("bootstrap", lang), build)
+
+snapshot: Optional[Snapshot] = None
+
+def build_snapshot(data: dict, shared: Optional[dict] = None, validate: bool = True) -> Snapshot:
+    compact_data(data, validate)
+    if snapshot is None:
+        return Snapshot(data, 1, shared)
+    return Snapshot(data, snapshot.version + 1, shared, snapshot.search)
+
+# ----- STARTUP CACHE -----
+# Modules whose code determines what a pickled Snapshot contains.
+SNAPSHOT_MODULES = ("server", "readmodel", "jsoncodec", "records", "repository", "search", "i18n", "compression")
+
+startup_cache = StartupCache(
+    DATA_FILE.with_suffix(".startup.pickle"),
+    [ROOT_DIR / f"{name}.py" for name in SNAPSHOT_MODULES],
+    # They shape the image URLs and the encoding of cached views.
+    settings=(images.base_url, HAVE_PILLOW, jsoncodec.ENCODER),
+) if os.environ.get("STARTUP_CACHE", "1") != "0" else None
+
+def resume_from_cache() -> Optional[Tuple[dict, Optional[Snapshot]]]:
+    """Cached (data, snapshot) brought up to date with the journal.
+
+    None on a cache miss; the snapshot is None when journal entries changed
+    published content, so it must be rebuilt from the (current) data.
+    """
+    cached = startup_cache.load()
+    if cached is None:
+        return None
+    data, snap, position = cached
+    entries = storage.resume(data, position)
+    if entries is None:
+        return None
+    positions, stale = {}, False
+    for entry in entries:
+        if entry.get("collection") == "contacts" and entry.get("op") == "insert":
+            snap.repo.insert("contacts", entry["doc"])  # also appends to data["contacts"]
+        else:
+            JournalStore.apply(data, entry, positions)
+            stale = stale or entry.get("collection") != "analytics"
+    return data, None if stale else snap
 
-def save_data(data: dict):
-    with open(DATA_FILE, "w", encoding="utf-8") as f:
-        json.dump(data, f, indent=2, ensure_ascii=False, default=str)
+async def reload_data():
+    global snapshot
+    async with admin_lock:  # both log changes against the current snapshot
+        with RELOAD_DURATION.time(("watcher",)):
+            data = await load_data()
+            previous = snapshot
+            fresh = await asyncio.to_thread(build_snapshot, data, {"contacts": previous.repo["contacts"]})
+            # data.json was edited by hand: log whatever differs for /api/changes.
+            keys = await asyncio.to_thread(changelog.changed_keys, previous.repo.data, data)
+            logged = await log_changes(data, keys)
+        async with storage.write_lock:
+            if logged:
+                await storage.apply_batch(logged)
+                JournalStore.apply(data, {"op": "batch", "entries": logged})
+            storage.adopt(data)
+            snapshot = fresh
+    logger.info("Loaded data version %d", fresh.version)
 
-db_data = load_data()
+async def refresh_shared(seen: int) -> int:
+    """With shared storage, rebuild the snapshot if another worker logged
+    changes after seq `seen`. Returns the newest seq now accounted for."""
+    global snapshot
+    newer = await storage.find("changes", {"id": {"$gt": seen}}, sort=[("id", 1)])
+    if not newer:
+        return seen
+    # Our own admin writes are in the snapshot already; anything else isn't.
+    ours = {c["id"] for c in changelog.since(snapshot.repo.data, seen) or []}
+    if any(c["id"] not in ours for c in newer):
+        async with admin_lock:
+            with RELOAD_DURATION.time(("shared",)):
+                data = await load_data()
+                previous = snapshot
+                fresh = await asyncio.to_thread(build_snapshot, data, {"contacts": previous.repo["contacts"]})
+            storage.adopt(data)
+            snapshot = fresh
+        logger.info("Loaded data version %d after changes from another worker", fresh.version)
+    return newer[-1]["id"]
+
+async def shared_watcher(interval: float):
+    seen = changelog.latest(snapshot.repo.data)
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            seen = await refresh_shared(seen)
+        except Exception:
+            logger.exception("Checking for changes from other workers failed")
+
+CHANGELOG_MAX_ENTRIES = int(os.environ.get("CHANGELOG_MAX_ENTRIES", "10000"))
+
+async def log_changes(data: dict, keys: List[Tuple[str, str]]) -> List[dict]:
+    """Storage entries recording `keys` in the change log; see changelog.py."""
+    if not keys:
+        return []
+    first = await storage.reserve_sequence("changes", len(keys), changelog.latest(data))
+    return changelog.journal_entries(data, keys, first, CHANGELOG_MAX_ENTRIES)
+
+async def flush_contacts(docs: List[dict]):
+    # Retried by the queue, so only the (idempotent) storage write goes here.
+    with STORAGE_DURATION.time(("insert_many",)):
+        await storage.insert_many("contacts", docs)
+
+def index_contacts(docs: List[dict]):
+    """Runs once per persisted batch; a failure here must not re-persist it."""
+    for doc in docs:
+        try:
+            snapshot.repo.insert("contacts", doc)
+        except Exception:
+            logger.exception("Could not index contact %s", doc.get("id"))
+    notifier.notify(docs)
+
+def dead_letter_contacts(docs: List[dict], error: Exception):
+    """Contacts that could not be persisted, one NDJSON line each, for a
+    later POST /api/import/contacts."""
+    path = DATA_FILE.with_suffix(".deadletter.ndjson")
+    with open(path, "ab") as f:
+        f.write(b"".join(jsoncodec.dumps(doc, default=str) + b"\n" for doc in docs))
+    logger.error("Wrote %d unpersisted contacts to %s: %r", len(docs), path, error)
+
+contact_queue = BatchQueue(
+    flush_contacts,
+    maxsize=int(os.environ.get("CONTACT_QUEUE_SIZE", "1000")),
+    batch_size=int(os.environ.get("CONTACT_BATCH_SIZE", "100")),
+    flush_interval=float(os.environ.get("CONTACT_FLUSH_INTERVAL", "0.05")),
+    name="contacts",
+    after_flush=index_contacts,
+    max_attempts=int(os.environ.get("CONTACT_FLUSH_ATTEMPTS", "10")),
+    dead_letter=dead_letter_contacts,
+    guard=lambda: storage.write_lock,
+)
+
+visit_rollups = VisitRollups(
+    max_keys=int(os.environ.get("ANALYTICS_MAX_KEYS", "500")),
+    retention_hours=int(os.environ.get("ANALYTICS_RETENTION_HOURS", str(24 * 90))),
+)
+ANALYTICS_FLUSH_INTERVAL = float(os.environ.get("ANALYTICS_FLUSH_INTERVAL", "10"))
+MAX_VISIT_BATCH = 100
+
+async def flush_visits():
+    # Taken and journaled under the lock: a checkpoint in between would both
+    # fold these deltas into data.json and find them in the new journal.
+    async with storage.write_lock:
+        deltas = visit_rollups.take_pending()
+        if not deltas:
+            return
+        try:
+            with STORAGE_DURATION.time(("merge_counters",)):
+                await storage.merge_counters("analytics", deltas)
+        except Exception:
+            visit_rollups.restore_pending(deltas)
+            raise
+
+async def analytics_flusher():
+    while True:
+        await asyncio.sleep(ANALYTICS_FLUSH_INTERVAL)
+        try:
+            await flush_visits()
+        except Exception:
+            logger.exception("Flushing visit rollups failed")
+
+async def shared_rollups() -> VisitRollups:
+    """Every worker's flushed rollups from storage, plus our unflushed visits."""
+    rollups = VisitRollups(visit_rollups.max_keys, visit_rollups.retention_hours)
+    async for batch in storage.stream("analytics"):
+        rollups.merge(batch)
+    rollups.merge(visit_rollups.pending())
+    return rollups
+
+def live_data() -> dict:
+    # The rollups in memory include merges not applied to the loaded analytics,
+    # and visits not flushed yet, which the journal will get after a checkpoint.
+    return {**snapshot.repo.data, "analytics": visit_rollups.documents(pending=False)}
+
+async def storage_maintenance():
+    while True:
+        await asyncio.sleep(store.fsync_interval)
+        try:
+            with STORAGE_DURATION.time(("maintain",)):
+                await storage.maintain(live_data)
+        except Exception:
+            logger.exception("Storage maintenance failed")
+
+CONTACT_LIMIT_WINDOW = float(os.environ.get("CONTACT_LIMIT_WINDOW", "600"))
+contact_limits = (
+    ("ip", SlidingWindowLimit(rate_store, int(os.environ.get("CONTACT_LIMIT_PER_IP", "5")),
+                              CONTACT_LIMIT_WINDOW, "contact-ip")),
+    ("email", SlidingWindowLimit(rate_store, int(os.environ.get("CONTACT_LIMIT_PER_EMAIL", "3")),
+                                 CONTACT_LIMIT_WINDOW, "contact-email")),
+)
+# Identical submissions within this many seconds are answered but stored once.
+CONTACT_DEDUP_WINDOW = float(os.environ.get("CONTACT_DEDUP_WINDOW", "3600"))
+CONTACT_SUBMISSIONS = REGISTRY.counter("contact_submissions_total", "Contact form submissions by outcome.",
+                                       ("outcome",))
+
+# ----- AUTH -----
+ADMIN_TOKEN = os.environ.get("ADMIN_TOKEN")
+
+def require_admin(request: Request):
+    if not ADMIN_TOKEN:
+        raise HTTPException(status_code=503, detail="Admin API is disabled; set ADMIN_TOKEN")
+    scheme, _, token = request.headers.get("authorization", "").partition(" ")
+    if scheme.lower() != "bearer" or not hmac.compare_digest(token.strip().encode(), ADMIN_TOKEN.encode()):
+        raise HTTPException(status_code=401, detail="Invalid admin token", headers={"WWW-Authenticate": "Bearer"})
 
 # ----- API ROUTES -----
 @api_router.get("/")
@@ -99,50 +449,720 @@ async def root():
     return {"message": "FufuDev Portfolio API", "version": "1.0.0"}
 
 @api_router.post("/contact", response_model=dict)
-async def create_contact(contact_data: ContactCreate):
+async def create_contact(request: Request, contact_data: ContactCreate):
     contact = Contact(**contact_data.dict())
-    db_data["contacts"].append(contact.dict())
-    save_data(db_data)
+    # Behind a proxy, run uvicorn with --proxy-headers so this is the real client.
+    keys = {"ip": request.client.host if request.client else "unknown", "email": contact.email.strip().lower()}
+    for name, limit in contact_limits:
+        retry_after = await limit.check(keys[name])
+        if retry_after is not None:
+            CONTACT_SUBMISSIONS.inc(("rate_limited",))
+            raise HTTPException(
+                status_code=429,
+                detail="Too many messages, please try again later",
+                headers={"Retry-After": str(retry_after)},
+            )
+    digest = "contact:" + content_hash(contact.email, contact.subject, contact.message)
+    if CONTACT_DEDUP_WINDOW > 0:
+        original = await rate_store.claim(digest, contact.id, CONTACT_DEDUP_WINDOW)
+        if original is not None:
+            CONTACT_SUBMISSIONS.inc(("duplicate",))
+            return {"success": True, "message": "Message sent!", "id": original}
+    try:
+        # Persisted in batches by flush_contacts(); contacts are not part of
+        # any cached read model, so no version bump here.
+        contact_queue.put_nowait(contact.dict())
+    except asyncio.QueueFull:
+        CONTACT_SUBMISSIONS.inc(("queue_full",))
+        if CONTACT_DEDUP_WINDOW > 0:
+            await rate_store.release(digest)
+        raise HTTPException(
+            status_code=429,
+            detail="Too many messages right now, please retry shortly",
+            headers={"Retry-After": str(contact_queue.retry_after())},
+        )
+    CONTACT_SUBMISSIONS.inc(("accepted",))
     return {"success": True, "message": "Message sent!", "id": contact.id}
 
+def encode_cursor(doc: dict) -> str:
+    created, doc_id = sort_key(doc)
+    raw = json.dumps([created.isoformat(), doc_id]).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+def decode_cursor(cursor: str):
+    try:
+        created, doc_id = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+        return naive_utc(datetime.fromisoformat(created)), str(doc_id)
+    except (ValueError, TypeError, OverflowError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+@api_router.get("/contacts", response_model=List[Contact], dependencies=[Depends(require_admin)])
+async def get_contacts(request: Request, cursor: Optional[str] = None, limit: int = Query(50, ge=1, le=200),
+                       status: Optional[str] = None, language: Optional[str] = None):
+    """Newest first. The next page's cursor comes back in X-Next-Cursor / Link."""
+    before = decode_cursor(cursor) if cursor else None
+    filters = {"status": status, "language": language}
+    if storage.shared:
+        # Other workers append too, so ask the database rather than our copy.
+        docs = await storage.find_page("contacts", filters, before, limit)
+    else:
+        docs = snapshot.repo["contacts"].page(filters, before, limit)
+    headers = {}
+    if len(docs) == limit:
+        next_cursor = encode_cursor(docs[-1])
+        headers["X-Next-Cursor"] = next_cursor
+        headers["Link"] = f'<{request.url.include_query_params(cursor=next_cursor)}>; rel="next"'
+    return FastJSONResponse([Contact(**d).dict() for d in docs], headers=headers)
+
+@api_router.post("/analytics/visit", status_code=202)
+async def record_visits(request: Request):
+    # Parsed by hand: navigator.sendBeacon posts text/plain, and the body may
+    # be one visit, a list of visits or {"visits": [...]}.
+    try:
+        payload = json.loads(await request.body())
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Body must be JSON")
+    if isinstance(payload, dict):
+        payload = payload.get("visits", [payload])
+    if not isinstance(payload, list) or len(payload) > MAX_VISIT_BATCH:
+        raise HTTPException(status_code=400, detail=f"Expected up to {MAX_VISIT_BATCH} visits")
+    try:
+        visits = [VisitCreate(**v) for v in payload]
+    except (TypeError, ValidationError) as e:
+        raise RequestValidationError(e.errors() if isinstance(e, ValidationError) else [])
+    now = datetime.utcnow()
+    for visit in visits:
+        visit_rollups.record(visit.page, visit.language, visit.referrer, now)
+    return {"accepted": len(visits)}
+
+@api_router.get("/analytics/stats")
+async def get_analytics_stats():
+    # Other workers count visits too, so add up what they flushed.
+    rollups = await shared_rollups() if storage.shared else visit_rollups
+    return rollups.stats()
+
+# ----- READ MODELS -----
+# Image references to our own uploads are served as variants this wide.
+IMAGE_FIELDS = {
+    "projects": {"image_url": 800},
+    "profile": {"avatar_url": 256},
+    "testimonials": {"avatar_url": 128},
+}
+
+def with_image_urls(doc, collection: str):
+    changes = {}
+    for field, width in IMAGE_FIELDS.get(collection, {}).items():
+        value = doc.get(field)
+        url = images.display_url(value, width)
+        if url is not value:
+            changes[field] = url
+    return {**doc, **changes} if changes else doc
+
+def shaped(snap: Snapshot, content, collection: str, lang: Optional[str],
+           fields: Optional[Tuple[str, ...]] = None):
+    """Resolve image URLs, then flatten to one language and/or keep only
+    `fields` if asked to."""
+    if content is None:
+        return content
+    chain = fallback_chain(lang, snap.languages) if lang else None
+    localized_fields = LOCALIZED_FIELDS[collection]
+
+    def shape(doc):
+        if fields is not None:
+            doc = doc.project(fields)
+        doc = with_image_urls(doc, collection)
+        return localize(doc, localized_fields, chain) if chain else doc
+
+    return [shape(m) for m in content] if isinstance(content, list) else shape(content)
+
+# Projects, services and testimonials are validated Records already, so views
+# select and shape them without building model instances.
+def build_projects(snap: Snapshot, lang: Optional[str] = None, fields=None, **filters):
+    projects = snap.repo["projects"].find(status="active", **filters)
+    return shaped(snap, projects, "projects", lang, fields)
+
+def build_services(snap: Snapshot, lang: Optional[str] = None, fields=None):
+    services = sorted(snap.repo["services"].find(active=True), key=lambda x: x["order"])
+    return shaped(snap, services, "services", lang, fields)
+
+def build_profile(snap: Snapshot, lang: Optional[str] = None):
+    profile = snap.repo.profile
+    return shaped(snap, Profile(**profile).dict() if profile else None, "profile", lang)
+
+def build_testimonials(snap: Snapshot, lang: Optional[str] = None, fields=None, **filters):
+    testimonials = snap.repo["testimonials"].find(approved=True, **filters)
+    return shaped(snap, testimonials, "testimonials", lang, fields)
+
+def build_project(snap: Snapshot, project_id: str, lang: Optional[str] = None):
+    return shaped(snap, snap.repo["projects"].get(project_id), "projects", lang)
+
+BOOTSTRAP_VIEWS = ("projects", "services", "profile", "testimonials")
+
+READ_VIEWS = {
+    "projects": build_projects,
+    "services": build_services,
+    "profile": build_profile,
+    "testimonials": build_testimonials,
+    "project": build_project,
+}
+
+def requested_language(request: Request, snap: Snapshot, lang: Optional[str]) -> Optional[str]:
+    if lang is None:
+        return None
+    if lang == "auto":
+        return negotiate(request.headers.get("accept-language"), snap.languages)
+    return resolve_language(lang, snap.languages)
+
+def language_headers(resolved: Optional[str], lang: Optional[str]) -> dict:
+    """Content-Language for a localized response, and Vary when it was negotiated."""
+    headers = {}
+    if resolved is not None:
+        headers["Content-Language"] = resolved
+    if lang == "auto":
+        headers["Vary"] = "Accept-Language"
+    return headers
+
+def parse_fields(fields: Optional[str], model) -> Optional[Tuple[str, ...]]:
+    """`?fields=id,name` -> ("id", "name"), validated against the model."""
+    if not fields:
+        return None
+    requested = tuple(sorted({f.strip() for f in fields.split(",") if f.strip()}))
+    unknown = [f for f in requested if f not in model.model_fields]
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown fields: {', '.join(unknown)}")
+    return requested or None
+
+async def serve_view(request: Request, name: str, lang: Optional[str], *args, **filters):
+    snap = snapshot
+    resolved = requested_language(request, snap, lang)
+    filters = {k: v for k, v in filters.items() if v is not None}
+    key = (name, resolved, *args, *sorted(filters.items()))
+    payload = snap.read_model.get(key, lambda: READ_VIEWS[name](snap, *args, lang=resolved, **filters))
+    if payload is None:
+        raise HTTPException(status_code=404, detail=f"{name.capitalize()} not found")
+    return await cached_response(request, payload, language_headers(resolved, lang))
+
 @api_router.get("/projects", response_model=List[Project])
-async def get_projects():
-    return [Project(**p) for p in db_data.get("projects", []) if p.get("status") == "active"]
+async def get_projects(request: Request, lang: Optional[str] = None, fields: Optional[str] = None,
+                       featured: Optional[bool] = None, type: Optional[str] = None):
+    return await serve_view(request, "projects", lang, fields=parse_fields(fields, Project),
+                      featured=featured, type=type)
+
+@api_router.get("/projects/{project_id}", response_model=Project)
+async def get_project(request: Request, project_id: str, lang: Optional[str] = None):
+    return await serve_view(request, "project", lang, project_id)
 
 @api_router.get("/services", response_model=List[Service])
-async def get_services():
-    services = sorted(
-        [Service(**s) for s in db_data.get("services", []) if s.get("active")],
-        key=lambda x: x.order
-    )
-    return services
+async def get_services(request: Request, lang: Optional[str] = None, fields: Optional[str] = None):
+    return await serve_view(request, "services", lang, fields=parse_fields(fields, Service))
 
 @api_router.get("/profile", response_model=Profile)
-async def get_profile():
-    profile = db_data.get("profile")
-    if not profile:
-        raise HTTPException(status_code=404, detail="Profile not found")
-    return Profile(**profile)
+async def get_profile(request: Request, lang: Optional[str] = None):
+    return await serve_view(request, "profile", lang)
 
 @api_router.get("/testimonials", response_model=List[Testimonial])
-async def get_testimonials():
-    return [Testimonial(**t) for t in db_data.get("testimonials", []) if t.get("approved")]
+async def get_testimonials(request: Request, lang: Optional[str] = None, fields: Optional[str] = None,
+                           featured: Optional[bool] = None):
+    return await serve_view(request, "testimonials", lang, fields=parse_fields(fields, Testimonial),
+                      featured=featured)
+
+@api_router.get("/search")
+async def search_content(request: Request, q: str = Query(..., min_length=1, max_length=200),
+                         lang: Optional[str] = None, limit: int = Query(20, ge=1, le=50),
+                         collection: Optional[str] = None):
+    """Ranked hits across projects, services and testimonials; the last word matches as a prefix."""
+    if collection is not None and collection not in SEARCH_FIELDS:
+        raise HTTPException(status_code=400, detail=f"Unknown collection: {collection}")
+    snap = snapshot
+    resolved = requested_language(request, snap, lang)
+    total, hits = snap.search.search(q, resolved, limit, collection)
+    results = []
+    for name, doc_id, score in hits:
+        document = shaped(snap, snap.repo[name].get(doc_id), name, resolved)
+        results.append({"collection": name, "id": doc_id, "score": score, "document": dict(document)})
+    return FastJSONResponse({"query": q, "total": total, "results": results},
+                            headers=language_headers(resolved, lang))
+
+# Unversioned: CDNs may serve it a little stale while they revalidate.
+BOOTSTRAP_CACHE_CONTROL = "public, max-age=60, s-maxage=300, stale-while-revalidate=86400"
+# ?v=<digest> URLs name exactly one body, so they never need revalidating.
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+
+@api_router.get("/bootstrap")
+async def get_bootstrap(request: Request, lang: Optional[str] = None, v: Optional[str] = None):
+    """Projects, services, profile and testimonials for first paint, in one response."""
+    snap = snapshot
+    resolved = requested_language(request, snap, lang)
+    payload = snap.bootstrap(resolved)
+    headers = {"Link": '<{}>; rel="preload"; as="fetch"; crossorigin="anonymous"'.format(
+        request.url.include_query_params(v=payload.digest)), **language_headers(resolved, lang)}
+    cache_control = IMMUTABLE_CACHE_CONTROL if v == payload.digest else BOOTSTRAP_CACHE_CONTROL
+    return await cached_response(request, payload, headers, cache_control)
+
+# ----- CHANGES -----
+# What a document must look like to appear in the public views.
+PUBLIC = {"projects": ("status", "active"), "services": ("active", True), "testimonials": ("approved", True)}
+MAX_CHANGES = 5000
+
+def is_public(collection: str, doc) -> bool:
+    if doc is None or collection not in PUBLIC:
+        return doc is not None
+    field, value = PUBLIC[collection]
+    return doc.get(field) == value
+
+async def read_changes(snap: Snapshot, since: int, limit: int) -> Tuple[int, Optional[List[dict]]]:
+    """(latest seq, up to `limit` changes after `since`), the changes being
+    None when the log no longer reaches back to `since`."""
+    if not storage.shared:
+        changes = changelog.since(snap.repo.data, since)
+        return changelog.latest(snap.repo.data), None if changes is None else changes[:limit]
+    # Other workers log changes too, so ask the database.
+    marker = await storage.find("changelog")
+    floor = marker[0].get("floor", 0) if marker else 0
+    newest = await storage.find("changes", sort=[("id", -1)], limit=1)
+    latest = newest[0]["id"] if newest else floor
+    if since < floor:
+        return latest, None
+    return latest, await storage.find("changes", {"id": {"$gt": since}}, sort=[("id", 1)], limit=limit)
+
+async def current_documents(snap: Snapshot, keys: List[Tuple[str, str]]) -> dict:
+    """{(collection, id): document or None}."""
+    if not storage.shared:
+        return {k: snap.repo.profile if k == changelog.PROFILE_KEY else snap.repo[k[0]].get(k[1]) for k in keys}
+    found = dict.fromkeys(keys)
+    by_collection = {}
+    for collection, doc_id in keys:
+        by_collection.setdefault(collection, []).append(doc_id)
+    for collection, ids in by_collection.items():
+        query = {} if collection == "profile" else {"id": {"$in": ids}}
+        for doc in await storage.find(collection, query):
+            found[changelog.PROFILE_KEY if collection == "profile" else (collection, doc["id"])] = doc
+    return found
+
+async def all_documents(snap: Snapshot) -> dict:
+    if not storage.shared:
+        docs = {(name, d["id"]): d for name in changelog.PUBLISHED for d in snap.repo[name]}
+        docs[changelog.PROFILE_KEY] = snap.repo.profile
+        return docs
+    docs = {(name, d["id"]): d for name in changelog.PUBLISHED for d in await storage.find(name)}
+    profile = await storage.find("profile")
+    docs[changelog.PROFILE_KEY] = profile[0] if profile else None
+    return docs
+
+@api_router.get("/changes")
+async def get_changes(request: Request, since: int = Query(0, ge=0), limit: int = Query(500, ge=1, le=MAX_CHANGES),
+                      lang: Optional[str] = None):
+    """The public documents changed after version `since`, oldest change first.
+
+    Each change is an "upsert" with the document as the read endpoints show
+    it, or a "delete", also sent when a document stops being public. Ask
+    again with `since=version`, right away while `more` is true. `reset`
+    means the log no longer reaches back to `since` (or `since` is 0): the
+    client should drop its copy, and every public document follows.
+    """
+    snap = snapshot
+    resolved = requested_language(request, snap, lang)
+    latest, changes = await read_changes(snap, since, limit)
+    if since > latest:  # a version we never handed out, e.g. from a restored database
+        changes = None
+    more = False
+    if changes is None or since == 0:
+        reset, version = True, latest
+        docs = await all_documents(snap)
+        changed = [(key, latest) for key, doc in docs.items() if is_public(key[0], doc)]
+    else:
+        reset = False
+        changed, cut = changelog.collapse(changes, limit)
+        more = cut is not None or len(changes) == limit
+        version = cut if cut is not None else changes[-1]["id"] if changes else since
+        docs = await current_documents(snap, [key for key, _ in changed])
+    results = []
+    for (collection, doc_id), seq in changed:
+        doc = docs.get((collection, doc_id))
+        if is_public(collection, doc):
+            results.append({"seq": seq, "collection": collection, "id": doc_id, "op": "upsert",
+                            "document": dict(shaped(snap, doc, collection, resolved))})
+        else:
+            results.append({"seq": seq, "collection": collection, "id": doc_id, "op": "delete"})
+    return FastJSONResponse({"version": version, "reset": reset, "more": more, "changes": results},
+                            headers=language_headers(resolved, lang))
+
+# ----- ADMIN -----
+ADMIN_MODELS = {"projects": Project, "services": Service, "testimonials": Testimonial, "profile": Profile}
+AdminCollection = Literal["projects", "services", "testimonials"]
+MAX_BULK_MUTATIONS = int(os.environ.get("ADMIN_MAX_BULK", "5000"))
+
+admin_router = APIRouter(prefix="/admin", dependencies=[Depends(require_admin)])
+
+class Mutation(BaseModel):
+    # "create" fails if the id exists; "patch" merges `doc` into the stored one.
+    op: Literal["upsert", "create", "patch", "delete"]
+    collection: Literal["projects", "services", "testimonials", "profile"]
+    id: Optional[str] = None
+    doc: Optional[dict] = None
+
+class BulkMutations(BaseModel):
+    mutations: List[Mutation] = Field(..., min_length=1, max_length=MAX_BULK_MUTATIONS)
+
+# Serializes admin writes: each one derives the next snapshot from the current.
+admin_lock = asyncio.Lock()
+
+def admin_document(collection: str, doc: dict, existing: Optional[dict], loc: tuple) -> dict:
+    """Validate `doc` as a stored document, keeping `existing`'s created_at."""
+    model = ADMIN_MODELS[collection]
+    if existing is not None:
+        if existing.get("created_at") is not None:
+            doc = {"created_at": existing["created_at"], **doc}
+        if "updated_at" in model.model_fields:
+            doc["updated_at"] = datetime.utcnow()
+    try:
+        return model(**doc).dict()
+    except ValidationError as e:
+        raise RequestValidationError([{**err, "loc": (*loc, *err["loc"])} for err in e.errors()])
+
+def journal_entries(snap: Snapshot, mutations: List[Mutation]) -> List[dict]:
+    """Turn mutations into journal entries, checking them against `snap` as
+    it will look after the earlier ones in the same batch."""
+    docs = {}  # (collection, id) -> doc or None (deleted) within this batch
+    entries = []
+    for i, m in enumerate(mutations):
+        loc = ("body", "mutations", i) if len(mutations) > 1 else ("body",)
+        if m.collection == "profile":
+            if m.op in ("create", "delete"):
+                raise HTTPException(status_code=400, detail="The profile can be replaced but not created or deleted")
+            existing = docs.get(("profile", None), snap.repo.profile)
+            changes = {**(existing or {}), **(m.doc or {})} if m.op == "patch" else m.doc or {}
+            doc = admin_document("profile", changes, existing, loc)
+            docs[("profile", None)] = doc
+            entries.append({"op": "set", "collection": "profile", "doc": doc})
+            continue
+        doc_id = m.id or (m.doc or {}).get("id")
+        key = (m.collection, doc_id)
+        existing = docs[key] if key in docs else snap.repo[m.collection].get(doc_id) if doc_id else None
+        if m.op in ("patch", "delete") and existing is None:
+            raise HTTPException(status_code=404, detail=f"{m.collection}/{doc_id} not found")
+        if m.op == "create" and existing is not None:
+            raise HTTPException(status_code=409, detail=f"{m.collection}/{doc_id} already exists")
+        if m.op == "delete":
+            docs[key] = None
+            entries.append({"op": "delete", "collection": m.collection, "doc": {"id": doc_id}})
+        else:
+            changes = {**existing, **(m.doc or {})} if m.op == "patch" else m.doc or {}
+            doc = admin_document(m.collection, {**changes, **({"id": doc_id} if doc_id else {})}, existing, loc)
+            docs[(m.collection, doc["id"])] = doc
+            entries.append({"op": "insert", "collection": m.collection, "doc": doc})
+    return entries
+
+async def apply_mutations(mutations: List[Mutation]) -> Tuple[Snapshot, List[dict]]:
+    """Persist `mutations` with one storage write and swap in one new snapshot."""
+    global snapshot
+    async with admin_lock:
+        current = snapshot
+        entries = journal_entries(current, mutations)
+        logged = await log_changes(current.repo.data, [
+            changelog.PROFILE_KEY if e["collection"] == "profile" else (e["collection"], e["doc"]["id"])
+            for e in entries
+        ])
+        # Copy only the containers; untouched documents are shared with `current`.
+        data = {k: (list(v) if isinstance(v, list) and k != "contacts" else v)
+                for k, v in current.repo.data.items()}
+        JournalStore.apply(data, {"op": "batch", "entries": entries + logged})
+        with RELOAD_DURATION.time(("admin",)):
+            fresh = await asyncio.to_thread(build_snapshot, data, {"contacts": current.repo["contacts"]}, False)
+        async with storage.write_lock:
+            with STORAGE_DURATION.time(("apply_batch",)):
+                await storage.apply_batch(entries + logged)
+            snapshot = fresh
+            storage.adopt(data)
+        # Fold the write into data.json right away, so a later hand edit of
+        # the file isn't overlaid with it again when the journal is replayed.
+        await storage.checkpoint(live_data)
+        logger.info("Applied %d admin mutations; data version %d", len(entries), fresh.version)
+        return fresh, entries
+
+@admin_router.post("/bulk")
+async def admin_bulk(body: BulkMutations):
+    """Apply every mutation or none, with a single persist and cache invalidation."""
+    fresh, entries = await apply_mutations(body.mutations)
+    return {"applied": len(entries), "version": fresh.version}
+
+@admin_router.put("/profile", response_model=Profile)
+async def admin_replace_profile(doc: dict):
+    _, entries = await apply_mutations([Mutation(op="upsert", collection="profile", doc=doc)])
+    return entries[0]["doc"]
+
+@admin_router.post("/{collection}", status_code=201)
+async def admin_create(collection: AdminCollection, doc: dict):
+    _, entries = await apply_mutations([Mutation(op="create", collection=collection, doc=doc)])
+    return jsonable_encoder(entries[0]["doc"])
+
+@admin_router.put("/{collection}/{doc_id}")
+async def admin_replace(collection: AdminCollection, doc_id: str, doc: dict):
+    _, entries = await apply_mutations([Mutation(op="upsert", collection=collection, id=doc_id, doc=doc)])
+    return jsonable_encoder(entries[0]["doc"])
+
+@admin_router.patch("/{collection}/{doc_id}")
+async def admin_update(collection: AdminCollection, doc_id: str, changes: dict):
+    # Merged under admin_lock, so concurrent PATCHes don't drop each other's fields.
+    _, entries = await apply_mutations([Mutation(op="patch", collection=collection, id=doc_id, doc=changes)])
+    return jsonable_encoder(entries[0]["doc"])
+
+@admin_router.delete("/{collection}/{doc_id}", status_code=204)
+async def admin_delete(collection: AdminCollection, doc_id: str):
+    await apply_mutations([Mutation(op="delete", collection=collection, id=doc_id)])
+    return Response(status_code=204)
+
+api_router.include_router(admin_router)
+
+# ----- EXPORT / IMPORT -----
+ExportCollection = Literal["projects", "services", "testimonials", "profile", "contacts", "analytics"]
+EXPORT_BATCH = 500
+IMPORT_BATCH = int(os.environ.get("IMPORT_BATCH_SIZE", "500"))
+MAX_IMPORT_LINE = 1 << 20
+MAX_IMPORT_ERRORS = 100
+
+class HourlyVisits(BaseModel):
+    id: str
+    total: int = 0
+    pages: Dict[str, int] = {}
+    languages: Dict[str, int] = {}
+    referrers: Dict[str, int] = {}
+
+IMPORT_MODELS = {**ADMIN_MODELS, "contacts": Contact, "analytics": HourlyVisits}
+
+async def export_batches(collection: str):
+    if collection == "analytics":
+        # The rollups in memory include visits not flushed to storage yet.
+        docs = (await shared_rollups() if storage.shared else visit_rollups).documents()
+        for start in range(0, len(docs), EXPORT_BATCH):
+            yield docs[start:start + EXPORT_BATCH]
+        return
+    async for batch in storage.stream(collection, EXPORT_BATCH):
+        yield batch
+
+@api_router.get("/export/{collection}", dependencies=[Depends(require_admin)])
+async def export_collection(collection: ExportCollection):
+    """Every stored document of `collection` as NDJSON, streamed a batch at a time."""
+    async def body():
+        async for batch in export_batches(collection):
+            yield b"".join(jsoncodec.dumps(doc, default=str) + b"\n" for doc in batch)
+    return StreamingResponse(body(), media_type="application/x-ndjson",
+                             headers={"Content-Disposition": f'attachment; filename="{collection}.ndjson"'})
+
+async def ndjson_lines(request: Request):
+    """(line number, line) for each non-blank line of the request body,
+    holding at most one line in memory."""
+    buffer = b""
+    number = 0
+    async for chunk in request.stream():
+        *lines, buffer = (buffer + chunk).split(b"\n")
+        for line in lines:
+            number += 1
+            if line.strip():
+                yield number, line
+        if len(buffer) > MAX_IMPORT_LINE:
+            raise HTTPException(status_code=413, detail=f"Line {number + 1} is longer than {MAX_IMPORT_LINE} bytes")
+    if buffer.strip():
+        yield number + 1, buffer
+
+def naive_dates(doc: dict) -> dict:
+    """Store timestamps with offsets ("Z", "+02:00") as naive UTC, like the
+    ones we create, so they sort and compare with them."""
+    for key, value in doc.items():
+        if isinstance(value, datetime) and value.tzinfo is not None:
+            try:
+                doc[key] = naive_utc(value)
+            except OverflowError:
+                raise ValueError(f"{key}: out of range") from None
+    return doc
+
+async def import_batch(collection: str, docs: List[dict], staged):
+    if collection == "contacts":
+        # Contacts aren't part of any read model: persist, then add to the
+        # shared collection, like flush_contacts.
+        async with storage.write_lock:
+            with STORAGE_DURATION.time(("apply_batch",)):
+                await storage.apply_batch([{"op": "insert", "collection": "contacts", "doc": doc} for doc in docs])
+            for doc in docs:
+                snapshot.repo.insert("contacts", doc)
+    elif collection == "analytics":
+        async with storage.write_lock:
+            with STORAGE_DURATION.time(("merge_counters",)):
+                await storage.merge_counters("analytics", docs)
+            visit_rollups.merge(docs)
+    else:
+        # Published documents are applied together at the end: every
+        # apply_mutations() rebuilds the snapshot and rewrites data.json.
+        await asyncio.to_thread(staged.write, b"".join(jsoncodec.dumps(doc, default=str) + b"\n" for doc in docs))
+
+async def apply_staged(collection: str, staged):
+    def read():
+        staged.seek(0)
+        return [jsoncodec.loads(line) for line in staged]
+    docs = await asyncio.to_thread(read)
+    if docs:
+        await apply_mutations([Mutation(op="upsert", collection=collection, doc=doc) for doc in docs])
+
+@api_router.post("/import/{collection}", dependencies=[Depends(require_admin)])
+async def import_collection(request: Request, collection: ExportCollection):
+    """Upsert NDJSON documents by id, validating line by line. Contacts and
+    analytics are persisted every IMPORT_BATCH documents; published ones are
+    staged in a temporary file and applied in one write at the end. Invalid
+    lines are skipped and reported; analytics rollups are added to the
+    existing counts."""
+    model = IMPORT_MODELS[collection]
+    imported = failed = 0
+    errors = []
+    batch = []
+    with tempfile.TemporaryFile(dir=DATA_FILE.parent) as staged:
+        async for number, line in ndjson_lines(request):
+            try:
+                doc = jsoncodec.loads(line)
+                if not isinstance(doc, dict):
+                    raise TypeError("expected a JSON object")
+                batch.append(naive_dates(model(**doc).dict()))
+            except ValidationError as e:
+                error = "; ".join(f"{'.'.join(map(str, err['loc']))}: {err['msg']}" for err in e.errors())
+            except (ValueError, TypeError) as e:  # not JSON, or not an object
+                error = str(e)
+            else:
+                if len(batch) >= IMPORT_BATCH:
+                    await import_batch(collection, batch, staged)
+                    imported += len(batch)
+                    batch = []
+                continue
+            failed += 1
+            if len(errors) < MAX_IMPORT_ERRORS:
+                errors.append({"line": number, "error": error})
+        if batch:
+            await import_batch(collection, batch, staged)
+            imported += len(batch)
+        if collection not in ("contacts", "analytics"):
+            await apply_staged(collection, staged)
+    logger.info("Imported %d %s documents (%d invalid)", imported, collection, failed)
+    return {"imported": imported, "failed": failed, "errors": errors}
+
+# ----- IMAGES -----
+@api_router.get("/images/{digest}")
+async def get_image(digest: str):
+    """An uploaded original; its URL is its content hash, so it never changes."""
+    path = images.original(digest)
+    if path is None:
+        raise HTTPException(status_code=404, detail="Image not found")
+    return FileResponse(path, media_type=MEDIA_TYPES[path.suffix[1:]],
+                        headers={"Cache-Control": IMMUTABLE_CACHE_CONTROL})
+
+@api_router.get("/images/{digest}/{variant}")
+async def get_image_variant(digest: str, variant: str):
+    """`w<width>.<webp|jpg|png>`, rendered on first request and cached on disk."""
+    match = VARIANT_RE.fullmatch(variant)
+    path = await images.variant(digest, int(match[1]), match[2]) if match else None
+    if path is None:
+        raise HTTPException(status_code=404, detail="Image not found")
+    return FileResponse(path, media_type=MEDIA_TYPES[match[2]],
+                        headers={"Cache-Control": IMMUTABLE_CACHE_CONTROL})
+
+@api_router.post("/images", status_code=201, dependencies=[Depends(require_admin)])
+async def upload_image(request: Request):
+    """Store the raw request body as an image. Use the returned `url` as an
+    image_url/avatar_url; API responses then point at resized variants."""
+    try:
+        return await images.save(request.stream())
+    except OverflowError as e:
+        raise HTTPException(status_code=413, detail=str(e))
+    except InvalidImage as e:
+        raise HTTPException(status_code=415, detail=str(e))
+
+# ----- METRICS -----
+REGISTRY.gauge("data_version", "Version of the data snapshot being served.",
+               lambda: snapshot.version)
+REGISTRY.gauge("contact_queue_depth", "Contact submissions waiting to be persisted.",
+               contact_queue.qsize)
+REGISTRY.gauge("notification_queue_depth", "New contacts waiting to be added to a notification.",
+               notifier.queue.qsize)
+REGISTRY.gauge("read_model_entries", "Cached read payloads in the current snapshot.",
+               lambda: len(snapshot.read_model))
+
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    return Response(REGISTRY.render(), media_type=METRICS_CONTENT_TYPE)
 
 # ----- APP SETUP -----
+class DynamicGZipMiddleware(GZipMiddleware):
+    """Cached read payloads arrive already encoded, and images are compressed
+    formats; this only covers the other, dynamic responses."""
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "http" and scope["path"].startswith("/api/images/"):
+            await self.app(scope, receive, send)
+            return
+        await super().__call__(scope, receive, send)
+
 app.include_router(api_router)
+app.add_middleware(DynamicGZipMiddleware, minimum_size=MIN_SIZE)
 app.add_middleware(
     CORSMiddleware,
     allow_credentials=True,
     allow_origins=os.environ.get("CORS_ORIGINS", "*").split(","),
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor", "Link"],
 )
+# Outermost, so the timings include the other middleware.
+app.add_middleware(MetricsMiddleware)
 
 logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
 logger = logging.getLogger(__name__)
 
 @app.on_event("startup")
 async def startup_event():
-    global db_data
-    db_data = load_data()
-    logger.info("FufuDev Portfolio API started successfully!")
+    global snapshot
+    timings = app.state.startup_timings = {}
+    started = time.perf_counter()
+    await storage.open()
+    await rate_store.open()
+    await asyncio.to_thread(images.open)
+    cached = None
+    if startup_cache is not None and isinstance(storage, JsonFileBackend):
+        cached = await asyncio.to_thread(resume_from_cache)
+    data, snapshot = cached or (await load_data(), None)
+    timings["load"] = time.perf_counter() - started
+    visit_rollups.load(data.get("analytics") or [])
+    if snapshot is None:
+        with RELOAD_DURATION.time(("startup",)):
+            snapshot = await asyncio.to_thread(build_snapshot, data)
+        timings["build"] = time.perf_counter() - started - timings["load"]
+        if startup_cache is not None and isinstance(storage, JsonFileBackend):
+            # Nothing mutates `data` until startup finishes, so it can be pickled as is.
+            try:
+                await asyncio.to_thread(startup_cache.save, data, snapshot, store.position())
+            except Exception as e:  # best effort; the next start just builds again
+                logger.warning("Could not write startup cache: %s", e)
+    storage.adopt(data)
+    timings["precompiled"] = cached is not None and "build" not in timings
+    contact_queue.start()
+    await notifier.start()
+    app.state.analytics = asyncio.create_task(analytics_flusher())
+    app.state.maintenance = asyncio.create_task(storage_maintenance())
+    watch_interval = float(os.environ.get("DATA_WATCH_INTERVAL", "1.0"))
+    app.state.watcher = None
+    if watch_interval > 0 and isinstance(storage, JsonFileBackend):
+        watcher = DataFileWatcher(DATA_FILE, reload_data, lambda: store.snapshot_signature, watch_interval)
+        app.state.watcher = asyncio.create_task(watcher.run())
+    elif watch_interval > 0 and storage.shared:
+        # Other workers' admin writes reach us through the shared change log.
+        app.state.watcher = asyncio.create_task(shared_watcher(watch_interval))
+    timings["total"] = time.perf_counter() - started
+    logger.info("FufuDev Portfolio API started successfully in %.0fms (%s)!", timings["total"] * 1000,
+                "precompiled snapshot" if timings["precompiled"] else "full build")
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    await contact_queue.drain()
+    await notifier.close()
+    app.state.analytics.cancel()
+    await flush_visits()
+    app.state.maintenance.cancel()
+    if app.state.watcher:
+        app.state.watcher.cancel()
+    images.close()
+    await storage.close()
@@ -0,0 +1,631 @@
+"""Storage backends.
+
+`JsonFileBackend` keeps the data in `data.json` behind an append-only
+journal (`JournalStore`): writes go to a JSON-lines journal next to the
+snapshot, fsync'd in batches, which is periodically folded back into the
+snapshot with an atomic rename. `MotorBackend` keeps the same collections in
+MongoDB so several workers can share them.
+"""
+import json, os, time, asyncio, logging, threading
+from abc import ABC, abstractmethod
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from pathlib import Path
+from typing import AsyncIterator, Callable, Iterator, List, Optional, Sequence, Tuple
+
+import jsoncodec
+from watcher import file_signature
+from repository import INDEXED_FIELDS, sort_key
+
+logger = logging.getLogger(__name__)
+
+
+EMPTY_DATA = {"projects": [], "services": [], "profile": None, "testimonials": [], "contacts": [],
+              "analytics": [], "changes": [], "changelog": None}
+
+
+def empty_data() -> dict:
+    return {k: (list(v) if isinstance(v, list) else v) for k, v in EMPTY_DATA.items()}
+
+
+def merge_counts(base: dict, delta: dict) -> dict:
+    merged = dict(base)
+    for key, value in delta.items():
+        if isinstance(value, dict):
+            merged[key] = merge_counts(merged.get(key) or {}, value)
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            merged[key] = merged.get(key, 0) + value
+        else:
+            merged[key] = value
+    return merged
+
+
+def _fsync_dir(path: Path):
+    try:
+        fd = os.open(path, os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+
+class JournalStore:
+    def __init__(self, snapshot_path, fsync_batch: int = 32, fsync_interval: float = 1.0,
+                 compact_every: int = 1000):
+        self.snapshot_path = Path(snapshot_path)
+        self.journal_path = self.snapshot_path.with_suffix(".journal")
+        self.rotated_path = self.snapshot_path.with_suffix(".journal.old")
+        self.fsync_batch = fsync_batch
+        self.fsync_interval = fsync_interval
+        self.compact_every = compact_every
+        self._lock = threading.Lock()
+        self._fh = None
+        self._unsynced = 0
+        self._last_sync = time.monotonic()
+        self.journal_entries = 0
+        self.snapshot_signature = None
+        self._rotated_signature = None
+        self._journal_signature = None
+        self._journal_offset = 0
+
+    # ----- READ -----
+    def load(self) -> dict:
+        self.snapshot_signature = file_signature(self.snapshot_path)
+        if self.snapshot_path.exists():
+            with open(self.snapshot_path, "rb") as f:
+                data = jsoncodec.loads(f.read())
+        else:
+            data = empty_data()
+        for key, value in EMPTY_DATA.items():
+            data.setdefault(key, list(value) if isinstance(value, list) else value)
+
+        positions = {}
+        self.journal_entries = 0
+        self._rotated_signature = file_signature(self.rotated_path)
+        for entry in self._read_journal(self.rotated_path):
+            self.apply(data, entry, positions)
+        self._journal_signature = file_signature(self.journal_path)
+        self._journal_offset = 0
+        for entry in self._read_journal(self.journal_path):
+            self.apply(data, entry, positions)
+        if self.journal_entries:
+            logger.info("Replayed %d journal entries on top of %s", self.journal_entries, self.snapshot_path.name)
+        return data
+
+    def position(self) -> dict:
+        """How much of the files the last load() or replay_since() has read."""
+        return {
+            "snapshot": self.snapshot_signature,
+            "rotated": self._rotated_signature,
+            "journal": self._journal_signature and self._journal_signature[2],
+            "offset": self._journal_offset,
+            "entries": self.journal_entries,
+        }
+
+    def replay_since(self, position: dict) -> Optional[Iterator[dict]]:
+        """Journal entries appended after `position`, which came from position().
+
+        Returns None when that state can't be resumed from (the snapshot was
+        rewritten, a compaction rotated the journal, ...) and a full load()
+        is needed instead.
+        """
+        if (file_signature(self.snapshot_path) != position["snapshot"]
+                or file_signature(self.rotated_path) != position["rotated"]):
+            return None
+        journal = file_signature(self.journal_path)
+        offset = position["offset"]
+        if position["journal"] is None:
+            offset = 0
+        elif journal is None or journal[2] != position["journal"] or journal[1] < offset:
+            return None
+        self.snapshot_signature = position["snapshot"]
+        self._rotated_signature = position["rotated"]
+        self._journal_signature = journal
+        self._journal_offset = offset
+        self.journal_entries = position["entries"]
+        return self._read_journal(self.journal_path, offset)
+
+    def _read_journal(self, path: Path, offset: int = 0) -> Iterator[dict]:
+        if not path.exists():
+            return
+        live = path == self.journal_path
+        with open(path, "rb") as f:
+            f.seek(offset)
+            for raw in iter(f.readline, b""):
+                start, offset = offset, offset + len(raw)
+                if live:
+                    self._journal_offset = offset
+                line = raw.strip()
+                if not line:
+                    continue
+                try:
+                    entry = jsoncodec.loads(line)
+                except json.JSONDecodeError:
+                    # Only a torn final write can produce this; everything before it is intact.
+                    logger.warning("Skipping corrupt journal entry at %s:%d", path.name, start)
+                    continue
+                self.journal_entries += 1
+                yield entry
+
+    @staticmethod
+    def apply(data: dict, entry: dict, positions: dict = None):
+        """Apply one journal entry to `data`.
+
+        "insert" is idempotent by id and "delete" removes by id. "merge" adds
+        the doc's numbers (and nested {key: number} dicts) onto the stored doc
+        with the same id. "set" replaces a single-document collection such as
+        the profile, "prune" drops the docs whose doc["field"] is below
+        doc["below"], and "batch" applies its "entries" in order.
+        """
+        if positions is None:
+            positions = {}
+        op = entry.get("op")
+        if op == "batch" and isinstance(entry.get("entries"), list):
+            for sub in entry["entries"]:
+                JournalStore.apply(data, sub, positions)
+            return
+        collection, doc = entry.get("collection"), entry.get("doc")
+        if op not in ("insert", "merge", "delete", "set", "prune") or not collection or not isinstance(doc, dict):
+            logger.warning("Ignoring unknown journal entry: %r", entry)
+            return
+        if op == "set":
+            data[collection] = doc
+            return
+        if op == "prune":
+            field, below = doc["field"], doc["below"]
+            data[collection] = [d for d in data.get(collection) or [] if d.get(field, below) >= below]
+            positions.pop(collection, None)
+            return
+        items = data.setdefault(collection, [])
+        index = positions.get(collection)
+        if index is None:
+            index = positions[collection] = {d.get("id"): i for i, d in enumerate(items)}
+        pos = index.get(doc.get("id"))
+        if op == "delete":
+            if pos is not None:
+                del items[pos]
+                del positions[collection]  # every later position shifted
+        elif pos is None:
+            index[doc.get("id")] = len(items)
+            items.append(doc)
+        elif op == "merge":
+            items[pos] = merge_counts(items[pos], doc)
+        else:
+            items[pos] = doc
+
+    # ----- WRITE -----
+    def append(self, collection: str, doc: dict):
+        self.append_many(collection, [doc])
+
+    def append_many(self, collection: str, docs: Sequence[dict], op: str = "insert"):
+        self._write([{"op": op, "collection": collection, "doc": doc} for doc in docs])
+
+    def append_batch(self, entries: List[dict]):
+        """Journal `entries` as a single line, so replay applies all of them or none."""
+        self._write([{"op": "batch", "entries": entries}])
+
+    def _write(self, entries: List[dict]):
+        lines = b"".join(jsoncodec.dumps(entry, default=str) + b"\n" for entry in entries)
+        with self._lock:
+            if self._fh is None:
+                self._fh = self._open_journal()
+            self._fh.write(lines)
+            self._fh.flush()
+            self._unsynced += len(entries)
+            self.journal_entries += len(entries)
+            if (self._unsynced >= self.fsync_batch
+                    or time.monotonic() - self._last_sync >= self.fsync_interval):
+                self._sync_locked()
+
+    def _open_journal(self):
+        fh = open(self.journal_path, "ab")
+        if fh.tell() > 0:
+            with open(self.journal_path, "rb") as f:
+                f.seek(-1, os.SEEK_END)
+                torn = f.read(1) != b"\n"
+            if torn:
+                # Terminate a torn tail so it cannot swallow the next entry.
+                fh.write(b"\n")
+        return fh
+
+    def sync(self):
+        with self._lock:
+            self._sync_locked()
+
+    def _sync_locked(self):
+        if self._fh is not None and self._unsynced:
+            os.fsync(self._fh.fileno())
+        self._unsynced = 0
+        self._last_sync = time.monotonic()
+
+    @property
+    def needs_compaction(self) -> bool:
+        return self.journal_entries >= self.compact_every
+
+    # ----- COMPACTION -----
+    def begin_compaction(self, data: dict) -> dict:
+        """Freeze a copy of `data` and rotate the journal out from under it.
+
+        Must run on the thread that mutates `data`; the returned copy can then
+        be handed to `write_snapshot()` on any thread.
+        """
+        frozen = {k: (list(v) if isinstance(v, list) else v) for k, v in data.items()}
+        with self._lock:
+            if self._fh is not None:
+                self._sync_locked()
+                self._fh.close()
+                self._fh = None
+            if self.journal_path.exists():
+                if self.rotated_path.exists():
+                    # A previous compaction never finished; keep its entries too.
+                    with open(self.rotated_path, "ab") as dst:
+                        dst.write(self.journal_path.read_bytes())
+                        dst.flush()
+                        os.fsync(dst.fileno())
+                    self.journal_path.unlink()
+                else:
+                    os.replace(self.journal_path, self.rotated_path)
+            self.journal_entries = 0
+        return frozen
+
+    def write_snapshot(self, data: dict):
+        tmp = self.snapshot_path.with_suffix(".json.tmp")
+        self.snapshot_path.parent.mkdir(parents=True, exist_ok=True)
+        with open(tmp, "wb") as f:
+            jsoncodec.dump_indented(data, f.write, default=str)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, self.snapshot_path)
+        self.snapshot_signature = file_signature(self.snapshot_path)
+        _fsync_dir(self.snapshot_path.parent)
+        if self.rotated_path.exists():
+            self.rotated_path.unlink()
+
+    def compact(self, data: dict):
+        self.write_snapshot(self.begin_compaction(data))
+
+    def close(self):
+        with self._lock:
+            if self._fh is not None:
+                self._sync_locked()
+                self._fh.close()
+                self._fh = None
+
+
+# ----- BACKENDS -----
+class StorageBackend(ABC):
+    # True when other workers write to the same data, i.e. this process's
+    # in-memory copy is not authoritative.
+    shared = False
+    _write_lock: Optional[asyncio.Lock] = None
+
+    @property
+    def write_lock(self) -> asyncio.Lock:
+        """Held by writers from a write until the in-memory state includes it,
+        so a checkpoint never freezes a state missing a write it then drops
+        from the log."""
+        if self._write_lock is None:
+            self._write_lock = asyncio.Lock()
+        return self._write_lock
+
+    async def open(self):
+        pass
+
+    @abstractmethod
+    async def load(self) -> dict:
+        ...
+
+    @abstractmethod
+    async def insert_many(self, collection: str, docs: List[dict]):
+        ...
+
+    @abstractmethod
+    async def merge_counters(self, collection: str, deltas: List[dict]):
+        """Add each delta's counters onto the stored doc with the same id."""
+
+    @abstractmethod
+    async def apply_batch(self, entries: List[dict]):
+        """Apply journal-style "insert"/"delete"/"set"/"prune" entries, all or none."""
+
+    async def reserve_sequence(self, name: str, count: int, after: int) -> int:
+        """The first of `count` consecutive numbers of sequence `name`, all
+        above `after` and never handed out to another process."""
+        return after + 1
+
+    @abstractmethod
+    async def find(self, collection: str, filters: Optional[dict] = None,
+                   sort: Optional[List[Tuple[str, int]]] = None, limit: int = 0) -> List[dict]:
+        ...
+
+    @abstractmethod
+    def stream(self, collection: str, batch_size: int = 500) -> AsyncIterator[List[dict]]:
+        """Every stored document of `collection`, `batch_size` at a time."""
+
+    async def find_page(self, collection: str, filters: dict, before: Optional[Tuple[datetime, str]],
+                        limit: int) -> List[dict]:
+        """Newest-first page by (created_at, id), strictly older than `before`."""
+        docs = await self.find(collection, {k: v for k, v in filters.items() if v is not None})
+        keyed = sorted(((sort_key(d), d) for d in docs), key=lambda kd: kd[0], reverse=True)
+        return [d for k, d in keyed if before is None or k < before][:limit]
+
+    def adopt(self, data: dict):
+        """`data`, which the caller has validated and now serves, is the
+        loaded state; backends that answer reads from memory keep it."""
+
+    async def maintain(self, live: Callable[[], dict]):
+        """Periodic housekeeping; `live()` returns the in-memory state."""
+
+    async def checkpoint(self, live: Callable[[], dict]):
+        """Make the main copy match `live()` now, e.g. so a hand edit of it
+        isn't overlaid by older log entries. Takes `write_lock`."""
+
+    async def close(self):
+        pass
+
+
+class JsonFileBackend(StorageBackend):
+    def __init__(self, store: JournalStore):
+        self.store = store
+        self._data: Optional[dict] = None
+        # Snapshot writes get a thread of their own, so a long one never
+        # holds up the journal appends queued on the default executor.
+        self._writer: Optional[ThreadPoolExecutor] = None
+        self._compacting = asyncio.Lock()
+
+    async def load(self) -> dict:
+        # Not kept until adopt(): the caller may still reject what it read.
+        return await asyncio.to_thread(self.store.load)
+
+    async def apply_batch(self, entries: List[dict]):
+        await asyncio.to_thread(self.store.append_batch, entries)
+
+    async def stream(self, collection: str, batch_size: int = 500) -> AsyncIterator[List[dict]]:
+        docs = (self._data or {}).get(collection)
+        if isinstance(docs, dict):
+            yield [docs]
+            return
+        # Writers replace lists or append to them, so a prefix of the length
+        # seen now is a consistent view.
+        docs = docs or []
+        for start in range(0, len(docs), batch_size):
+            yield docs[start:start + batch_size]
+
+    def adopt(self, data: dict):
+        """Make `data`, already containing every persisted write, the loaded state."""
+        self._data = data
+
+    def resume(self, data: dict, position: dict) -> Optional[Iterator[dict]]:
+        """Adopt `data`, saved at store `position()`, as the loaded state.
+
+        Returns the journal entries written since, which the caller applies,
+        or None (adopting nothing) if `data` is out of date. Blocking.
+        """
+        entries = self.store.replay_since(position)
+        if entries is not None:
+            self.adopt(data)
+        return entries
+
+    async def insert_many(self, collection: str, docs: List[dict]):
+        await asyncio.to_thread(self.store.append_many, collection, docs)
+
+    async def merge_counters(self, collection: str, deltas: List[dict]):
+        await asyncio.to_thread(self.store.append_many, collection, deltas, "merge")
+
+    async def find(self, collection, filters=None, sort=None, limit=0):
+        # The in-memory Repository answers queries for this backend; this
+        # exists for callers that only hold a StorageBackend.
+        docs = [d for d in (self._data or {}).get(collection) or []
+                if all(d.get(k) == v for k, v in (filters or {}).items())]
+        for field, direction in reversed(sort or []):
+            docs.sort(key=lambda d: str(d.get(field)), reverse=direction < 0)
+        return docs[:limit] if limit else docs
+
+    async def maintain(self, live: Callable[[], dict]):
+        self.store.sync()
+        if self.store.needs_compaction:
+            await self.checkpoint(live)
+
+    async def checkpoint(self, live: Callable[[], dict]):
+        async with self._compacting:  # one rotated journal at a time
+            async with self.write_lock:  # only the freeze; the write can overlap appends
+                frozen = self.store.begin_compaction(live())
+            if self._writer is None:
+                self._writer = ThreadPoolExecutor(1, thread_name_prefix="snapshot-writer")
+            started = time.perf_counter()
+            await asyncio.get_running_loop().run_in_executor(self._writer, self.store.write_snapshot, frozen)
+            logger.info("Compacted journal into %s in %.0fms", self.store.snapshot_path.name,
+                        (time.perf_counter() - started) * 1000)
+
+    async def close(self):
+        if self._writer is not None:
+            self._writer.shutdown()
+            self._writer = None
+        self.store.close()
+
+
+DATE_FIELDS = ("created_at", "updated_at", "replied_at")
+DUPLICATE_KEY = 11000
+
+def _escape_key(key: str) -> str:
+    # MongoDB field names can't contain "." or start with "$".
+    return key.replace("%", "%25").replace(".", "%2E").replace("$", "%24")
+
+def _unescape_key(key: str) -> str:
+    return key.replace("%24", "$").replace("%2E", ".").replace("%25", "%")
+
+def _coerce_dates(doc: dict) -> dict:
+    doc = dict(doc)
+    for field in DATE_FIELDS:
+        value = doc.get(field)
+        if isinstance(value, str):
+            try:
+                doc[field] = datetime.fromisoformat(value)
+            except ValueError:
+                pass
+    return doc
+
+
+class MotorBackend(StorageBackend):
+    """MongoDB via Motor. One pooled client per process, opened at startup.
+
+    `client` may be any Motor-compatible client (e.g. mongomock_motor's) for
+    local testing. When the content collections are empty and `seed_file`
+    exists, they are seeded from it once.
+    """
+    shared = True
+    COLLECTIONS = ("projects", "services", "testimonials", "contacts", "changes")
+    COUNTER_COLLECTIONS = ("analytics",)
+    SINGLE_DOCUMENTS = ("profile", "changelog")
+
+    def __init__(self, url: Optional[str] = None, db_name: str = "FufuDev", client=None,
+                 seed_file=None, max_pool_size: int = 50):
+        self.url = url
+        self.db_name = db_name
+        self.client = client
+        self.seed_file = Path(seed_file) if seed_file else None
+        self.max_pool_size = max_pool_size
+        self.db = None
+
+    async def open(self):
+        if self.client is None:
+            from motor.motor_asyncio import AsyncIOMotorClient
+            self.client = AsyncIOMotorClient(self.url, maxPoolSize=self.max_pool_size,
+                                             tz_aware=False)
+        self.db = self.client[self.db_name]
+        for name in (*self.COLLECTIONS, *self.COUNTER_COLLECTIONS, "profile"):
+            await self.db[name].create_index("id", unique=True)
+        for name, fields in INDEXED_FIELDS.items():
+            for field in fields:
+                await self.db[name].create_index(field)
+        await self.db.contacts.create_index([("created_at", -1), ("id", -1)])
+        for field in ("status", "language"):
+            await self.db.contacts.create_index([(field, 1), ("created_at", -1), ("id", -1)])
+        if self.seed_file and self.seed_file.exists() and not await self.db.projects.count_documents({}, limit=1):
+            await self.seed(JournalStore(self.seed_file).load())
+
+    async def seed(self, data: dict):
+        from pymongo.errors import BulkWriteError
+        for name in self.COLLECTIONS:
+            try:
+                await self.insert_many(name, data.get(name) or [])
+            except BulkWriteError:
+                pass  # another worker seeded concurrently; ids are unique
+        for name in self.SINGLE_DOCUMENTS:
+            if data.get(name):
+                await self.db[name].replace_one({}, _coerce_dates(data[name]), upsert=True)
+        logger.info("Seeded MongoDB database %s from %s", self.db_name, self.seed_file.name)
+
+    async def load(self) -> dict:
+        data = {}
+        for name in self.COLLECTIONS:
+            data[name] = await self.db[name].find({}, {"_id": 0}).to_list(length=None)
+        for name in self.SINGLE_DOCUMENTS:
+            data[name] = await self.db[name].find_one({}, {"_id": 0})
+        for name in self.COUNTER_COLLECTIONS:
+            data[name] = [
+                {k: ({_unescape_key(kk): vv for kk, vv in v.items()} if isinstance(v, dict) else v)
+                 for k, v in doc.items()}
+                async for doc in self.db[name].find({}, {"_id": 0})
+            ]
+        return data
+
+    async def insert_many(self, collection: str, docs: List[dict]):
+        from pymongo.errors import BulkWriteError
+        if not docs:
+            return
+        try:
+            # Copies, so Mongo's generated _id never leaks into in-memory docs.
+            await self.db[collection].insert_many([_coerce_dates(d) for d in docs], ordered=False)
+        except BulkWriteError as e:
+            # Ids already stored by an earlier attempt make a retry a no-op.
+            if any(err.get("code") != DUPLICATE_KEY for err in e.details.get("writeErrors", [])):
+                raise
+
+    async def merge_counters(self, collection: str, deltas: List[dict]):
+        from pymongo import UpdateOne
+        ops = []
+        for delta in deltas:
+            inc = {}
+            for key, value in delta.items():
+                if isinstance(value, dict):
+                    inc.update({f"{key}.{_escape_key(k)}": n for k, n in value.items()})
+                elif key != "id":
+                    inc[key] = value
+            ops.append(UpdateOne({"id": delta["id"]}, {"$inc": inc}, upsert=True))
+        if ops:
+            await self.db[collection].bulk_write(ops, ordered=False)
+
+    async def apply_batch(self, entries: List[dict]):
+        from pymongo import DeleteMany, DeleteOne, ReplaceOne
+        from pymongo.errors import ConfigurationError, OperationFailure
+        grouped = {}
+        for entry in entries:
+            doc = entry["doc"]
+            if entry["op"] == "delete":
+                op = DeleteOne({"id": doc["id"]})
+            elif entry["op"] == "prune":
+                op = DeleteMany({doc["field"]: {"$lt": doc["below"]}})
+            elif entry["op"] == "set":
+                op = ReplaceOne({}, _coerce_dates(doc), upsert=True)
+            else:
+                op = ReplaceOne({"id": doc["id"]}, _coerce_dates(doc), upsert=True)
+            grouped.setdefault(entry["collection"], []).append(op)
+
+        async def write(session=None):
+            for name, ops in grouped.items():
+                await self.db[name].bulk_write(ops, ordered=True, session=session)
+
+        try:
+            async with await self.client.start_session() as session:
+                async with session.start_transaction():
+                    await write(session)
+        except (OperationFailure, ConfigurationError, NotImplementedError) as e:
+            # Standalone servers (and mocks) have no transactions.
+            if isinstance(e, OperationFailure) and e.code not in (20, 263):
+                raise
+            logger.warning("MongoDB transactions unavailable (%s); applying the batch without one", e)
+            await write()
+
+    async def reserve_sequence(self, name: str, count: int, after: int) -> int:
+        from pymongo import ReturnDocument
+        await self.db.sequences.update_one({"_id": name}, {"$max": {"value": after}}, upsert=True)
+        doc = await self.db.sequences.find_one_and_update(
+            {"_id": name}, {"$inc": {"value": count}}, return_document=ReturnDocument.AFTER)
+        return doc["value"] - count + 1
+
+    async def stream(self, collection: str, batch_size: int = 500) -> AsyncIterator[List[dict]]:
+        batch = []
+        async for doc in self.db[collection].find({}, {"_id": 0}, batch_size=batch_size):
+            if collection in self.COUNTER_COLLECTIONS:
+                doc = {k: ({_unescape_key(kk): vv for kk, vv in v.items()} if isinstance(v, dict) else v)
+                       for k, v in doc.items()}
+            batch.append(doc)
+            if len(batch) >= batch_size:
+                yield batch
+                batch = []
+        if batch:
+            yield batch
+
+    async def find_page(self, collection, filters, before, limit):
+        query = {k: v for k, v in filters.items() if v is not None}
+        if before is not None:
+            created, doc_id = before
+            query["$or"] = [{"created_at": {"$lt": created}},
+                            {"created_at": created, "id": {"$lt": doc_id}}]
+        return await self.find(collection, query, [("created_at", -1), ("id", -1)], limit)
+
+    async def find(self, collection, filters=None, sort=None, limit=0):
+        cursor = self.db[collection].find(filters or {}, {"_id": 0})
+        if sort:
+            cursor = cursor.sort(sort)
+        if limit:
+            cursor = cursor.limit(limit)
+        return await cursor.to_list(length=None)
+
+    async def close(self):
+        if self.client is not None:
+            self.client.close()
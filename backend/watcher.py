@@ -0,0 +1,59 @@
+"""Polling watcher that notices edits to the data file.
+
+Uses (mtime, size, inode) signatures rather than inotify so it works the same
+on every platform and inside containers with bind-mounted volumes. A change
+only fires once the signature has been stable for one interval, so editors
+that write the file in several steps don't trigger a reload of a half-written
+document.
+"""
+import os, asyncio, logging
+from pathlib import Path
+from typing import Awaitable, Callable, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+Signature = Optional[Tuple[int, int, int]]
+
+
+def file_signature(path) -> Signature:
+    try:
+        st = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return (st.st_mtime_ns, st.st_size, st.st_ino)
+
+
+class DataFileWatcher:
+    def __init__(self, path, on_change: Callable[[], Awaitable[None]],
+                 known: Callable[[], Signature], interval: float = 1.0):
+        self.path = Path(path)
+        self.on_change = on_change
+        self.known = known
+        self.interval = interval
+        self._pending: Signature = None
+        self._rejected: Signature = None
+
+    async def run(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                await self.poll()
+            except Exception:
+                logger.exception("Reloading %s failed", self.path.name)
+
+    async def poll(self):
+        signature = file_signature(self.path)
+        if signature is None or signature in (self.known(), self._rejected):
+            self._pending = None
+            return
+        if signature != self._pending:
+            self._pending = signature
+            return
+        self._pending = None
+        logger.info("%s changed on disk, reloading", self.path.name)
+        try:
+            await self.on_change()
+        except Exception:
+            # Don't retry the same broken file every tick; wait for the next edit.
+            self._rejected = signature
+            raise
@@ -1,7 +1,8 @@
-import React from "react";
+import React, { useEffect } from "react";
 import "./App.css";
-import { BrowserRouter, Routes, Route } from "react-router-dom";
-import { LanguageProvider } from './contexts/LanguageContext';
+import { BrowserRouter, Routes, Route, useLocation } from "react-router-dom";
+import { LanguageProvider, useLanguage } from './contexts/LanguageContext';
+import { analyticsAPI } from './services/api';
 import { Toaster } from './components/ui/toaster';
 import Navigation from './components/Navigation';
 import Footer from './components/Footer';
@@ -11,12 +12,26 @@ import Services from './pages/Services';
 import About from './pages/About';
 import Contact from './pages/Contact';
 
+function VisitTracker() {
+  const location = useLocation();
+  const { language } = useLanguage();
+
+  useEffect(() => {
+    analyticsAPI.trackVisit(location.pathname, language);
+    // Only page changes count as visits, not language toggles.
+    // eslint-disable-next-line react-hooks/exhaustive-deps
+  }, [location.pathname]);
+
+  return null;
+}
+
 function App() {
   return (
     <div className="App">
       <BrowserRouter>
         <LanguageProvider>
           <div className="min-h-screen bg-white dark:bg-gray-900 transition-colors">
+            <VisitTracker />
             <Navigation />
             <main className="pt-16">
               <Routes>
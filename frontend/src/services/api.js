@@ -20,6 +20,21 @@ apiClient.interceptors.response.use(
   }
 );
 
+// Bootstrap API
+// Projects, services, profile and testimonials arrive in one request (the
+// same URL index.html preloads), shared by every caller below.
+let bootstrapRequest = null;
+
+export const bootstrapAPI = {
+  get: () => {
+    if (!bootstrapRequest) {
+      bootstrapRequest = apiClient.get('/bootstrap').then((response) => response.data);
+      bootstrapRequest.catch(() => { bootstrapRequest = null; });
+    }
+    return bootstrapRequest;
+  }
+};
+
 // Contact API
 export const contactAPI = {
   submit: async (data) => {
@@ -36,8 +51,8 @@ export const contactAPI = {
 // Projects API
 export const projectsAPI = {
   getAll: async () => {
-    const response = await apiClient.get('/projects');
-    return response.data;
+    const data = await bootstrapAPI.get();
+    return data.projects;
   },
   
   getById: async (id) => {
@@ -49,23 +64,68 @@ export const projectsAPI = {
 // Services API
 export const servicesAPI = {
   getAll: async () => {
-    const response = await apiClient.get('/services');
-    return response.data;
+    const data = await bootstrapAPI.get();
+    return data.services;
   }
 };
 
 // Profile API
 export const profileAPI = {
   get: async () => {
-    const response = await apiClient.get('/profile');
-    return response.data;
+    const data = await bootstrapAPI.get();
+    if (!data.profile) throw new Error('Profile not found');
+    return data.profile;
   }
 };
 
 // Testimonials API
 export const testimonialsAPI = {
   getAll: async () => {
-    const response = await apiClient.get('/testimonials');
+    const data = await bootstrapAPI.get();
+    return data.testimonials;
+  }
+};
+
+// Search API
+export const searchAPI = {
+  search: async (q, lang, limit = 10) => {
+    const response = await apiClient.get('/search', { params: { q, lang, limit } });
+    return response.data;
+  }
+};
+
+// Analytics API
+// Visits are queued and sent in batches with navigator.sendBeacon, which
+// survives page unloads and never blocks rendering.
+const visitQueue = [];
+let visitTimer = null;
+
+const flushVisits = () => {
+  visitTimer = null;
+  if (!visitQueue.length) return;
+  const body = JSON.stringify({ visits: visitQueue.splice(0, 100) });
+  const url = `${API_BASE}/analytics/visit`;
+  if (!(navigator.sendBeacon && navigator.sendBeacon(url, body))) {
+    fetch(url, { method: 'POST', body, keepalive: true }).catch(() => {});
+  }
+};
+
+if (typeof window !== 'undefined') {
+  window.addEventListener('pagehide', flushVisits);
+}
+
+export const analyticsAPI = {
+  trackVisit: (page, language) => {
+    visitQueue.push({ page, language, referrer: document.referrer || null });
+    if (visitQueue.length >= 20) {
+      flushVisits();
+    } else if (!visitTimer) {
+      visitTimer = setTimeout(flushVisits, 5000);
+    }
+  },
+
+  getStats: async () => {
+    const response = await apiClient.get('/analytics/stats');
     return response.data;
   }
 };
@@ -0,0 +1,77 @@
+"""Fixtures that run `server.app` in-process against a temporary copy of the data.
+
+The server module reads its configuration from the environment when it is
+imported, so that is set up first. Each test then gets its own data
+directory: the fixtures point the module's storage, rate limits, images and
+notifications at fresh instances before the app starts.
+"""
+import os, sys, shutil, asyncio, tempfile
+from pathlib import Path
+
+import pytest
+
+BACKEND = Path(__file__).resolve().parent.parent / "backend"
+sys.path.insert(0, str(BACKEND))
+
+ADMIN_TOKEN = "test-admin-token"
+os.environ.update(
+    ADMIN_TOKEN=ADMIN_TOKEN,
+    DATA_FILE=str(Path(tempfile.mkdtemp(prefix="portfolio-tests-")) / "data.json"),
+    DATA_WATCH_INTERVAL="0",
+    STARTUP_CACHE="0",
+    NOTIFY_SINKS="",
+)
+
+from fastapi.testclient import TestClient  # noqa: E402
+
+import server as server_module  # noqa: E402
+from images import ImageStore, VariantCache  # noqa: E402
+from notify import FileOutbox, Notifier  # noqa: E402
+from ratelimit import MemoryCounterStore, SlidingWindowLimit  # noqa: E402
+from storage import JournalStore, JsonFileBackend  # noqa: E402
+
+SEED_FILE = BACKEND / "data" / "data.json"
+ADMIN = {"Authorization": f"Bearer {ADMIN_TOKEN}"}
+
+
+@pytest.fixture
+def anyio_backend():
+    return "asyncio"
+
+
+@pytest.fixture
+def data_file(tmp_path) -> Path:
+    path = tmp_path / "data.json"
+    shutil.copy(SEED_FILE, path)
+    return path
+
+
+@pytest.fixture
+def server(data_file, monkeypatch):
+    """The server module, wired to `data_file`; the app is not started."""
+    store = JournalStore(data_file)
+    monkeypatch.setattr(server_module, "DATA_FILE", data_file)
+    monkeypatch.setattr(server_module, "store", store)
+    monkeypatch.setattr(server_module, "storage", JsonFileBackend(store))
+    rate_store = MemoryCounterStore()
+    monkeypatch.setattr(server_module, "rate_store", rate_store)
+    monkeypatch.setattr(server_module, "contact_limits", tuple(
+        (key, SlidingWindowLimit(rate_store, limit.limit, limit.window, limit.prefix))
+        for key, limit in server_module.contact_limits
+    ))
+    monkeypatch.setattr(server_module, "images", ImageStore(
+        data_file.parent / "uploads", VariantCache(data_file.parent / "image-cache", 64 * 2**20), workers=1))
+    monkeypatch.setattr(server_module, "notifier", Notifier([], FileOutbox(data_file.with_suffix(".outbox.json"))))
+    monkeypatch.setattr(server_module, "admin_lock", asyncio.Lock())
+    return server_module
+
+
+@pytest.fixture
+def client(server):
+    with TestClient(server.app) as c:
+        yield c
+
+
+def persisted(data_file: Path) -> dict:
+    """What a restarted server would load from `data_file` and its journal."""
+    return JournalStore(data_file).load()
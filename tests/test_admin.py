@@ -0,0 +1,236 @@
+"""The admin API, export and import."""
+import json, asyncio
+
+import httpx
+import pytest
+from fastapi.testclient import TestClient
+from pydantic import ValidationError
+
+import changelog
+from storage import MotorBackend
+from tests.conftest import ADMIN, persisted
+
+PROJECT = {"id": "p-new", "name": "Portfolio", "description": {"en": "This site", "fr": "Ce site"},
+           "technologies": ["React", "FastAPI"], "type": "Website"}
+
+
+@pytest.mark.parametrize("method, path", [
+    ("post", "/api/admin/projects"),
+    ("put", "/api/admin/projects/uuid1"),
+    ("patch", "/api/admin/projects/uuid1"),
+    ("delete", "/api/admin/projects/uuid1"),
+    ("put", "/api/admin/profile"),
+    ("post", "/api/admin/bulk"),
+    ("get", "/api/contacts"),
+    ("get", "/api/export/contacts"),
+    ("post", "/api/import/projects"),
+    ("post", "/api/images"),
+])
+def test_requires_token(client, method, path):
+    kwargs = {} if method in ("get", "delete") else {"json": {}}
+    response = client.request(method, path, headers={"Authorization": "Bearer wrong"}, **kwargs)
+    assert response.status_code == 401
+    assert client.request(method, path, **kwargs).status_code == 401
+
+
+def test_create_update_delete(client, data_file):
+    response = client.post("/api/admin/projects", json=PROJECT, headers=ADMIN)
+    assert response.status_code == 201
+    assert response.json()["status"] == "active"
+    assert client.get("/api/projects/p-new").json()["name"] == "Portfolio"
+    assert client.post("/api/admin/projects", json=PROJECT, headers=ADMIN).status_code == 409
+
+    created = response.json()["created_at"]
+    replaced = client.put("/api/admin/projects/p-new", json={**PROJECT, "name": "Site"}, headers=ADMIN).json()
+    assert replaced["name"] == "Site" and replaced["created_at"] == created
+    patched = client.patch("/api/admin/projects/p-new", json={"featured": True}, headers=ADMIN).json()
+    assert patched["name"] == "Site" and patched["featured"] is True
+    assert client.get("/api/projects", params={"type": "Website"}).json()[0]["featured"] is True
+
+    assert client.delete("/api/admin/projects/p-new", headers=ADMIN).status_code == 204
+    assert client.get("/api/projects/p-new").status_code == 404
+    assert client.delete("/api/admin/projects/p-new", headers=ADMIN).status_code == 404
+    assert client.patch("/api/admin/projects/p-new", json={}, headers=ADMIN).status_code == 404
+    assert "p-new" not in {p["id"] for p in persisted(data_file)["projects"]}
+
+    patched = client.patch("/api/admin/services/uuid4", json={"active": False}, headers=ADMIN)
+    assert patched.status_code == 200
+    assert [s["id"] for s in client.get("/api/services").json()] == ["uuid3"]
+    assert {s["id"]: s["active"] for s in persisted(data_file)["services"]}["uuid4"] is False
+
+
+@pytest.mark.anyio
+async def test_concurrent_writes(server, data_file):
+    await server.app.router.startup()
+    try:
+        transport = httpx.ASGITransport(app=server.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test", headers=ADMIN) as client:
+            created = await asyncio.gather(*(client.post("/api/admin/projects", json={**PROJECT, "name": name})
+                                             for name in ("First", "Second")))
+            await asyncio.gather(client.patch("/api/admin/projects/uuid1", json={"featured": True}),
+                                 client.patch("/api/admin/projects/uuid1", json={"name": "Patched"}))
+    finally:
+        await server.app.router.shutdown()
+
+    assert sorted(r.status_code for r in created) == [201, 409]
+    [winner] = [r.json()["name"] for r in created if r.status_code == 201]
+    projects = {p["id"]: p for p in persisted(data_file)["projects"]}
+    assert projects["p-new"]["name"] == winner
+    assert (projects["uuid1"]["name"], projects["uuid1"]["featured"]) == ("Patched", True)
+
+
+def test_invalid_documents(client):
+    response = client.post("/api/admin/projects", json={"name": "No description"}, headers=ADMIN)
+    assert response.status_code == 422
+    assert client.post("/api/admin/contacts", json={}, headers=ADMIN).status_code == 422
+
+
+def test_replace_profile(client, data_file):
+    profile = client.get("/api/profile").json()
+    response = client.put("/api/admin/profile", json={**profile, "skills": ["Python"]}, headers=ADMIN)
+    assert response.status_code == 200
+    assert client.get("/api/profile").json()["skills"] == ["Python"]
+    assert persisted(data_file)["profile"]["skills"] == ["Python"]
+
+
+def test_bulk(client, data_file):
+    response = client.post("/api/admin/bulk", headers=ADMIN, json={"mutations": [
+        {"op": "upsert", "collection": "projects", "doc": PROJECT},
+        {"op": "delete", "collection": "testimonials", "id": "uuid6"},
+        {"op": "upsert", "collection": "services", "id": "uuid3", "doc": {**client.get(
+            "/api/services").json()[0], "order": 5}},
+    ]})
+    assert response.status_code == 200
+    assert response.json()["applied"] == 3
+    data = persisted(data_file)
+    assert "p-new" in {p["id"] for p in data["projects"]}
+    assert {t["id"] for t in data["testimonials"]} == {"uuid5"}
+
+    # All or nothing: the second mutation fails, so the first is not applied.
+    response = client.post("/api/admin/bulk", headers=ADMIN, json={"mutations": [
+        {"op": "delete", "collection": "projects", "id": "uuid1"},
+        {"op": "delete", "collection": "projects", "id": "missing"},
+    ]})
+    assert response.status_code == 404
+    assert client.get("/api/projects/uuid1").status_code == 200
+    response = client.post("/api/admin/bulk", headers=ADMIN, json={"mutations": [
+        {"op": "delete", "collection": "profile"}]})
+    assert response.status_code == 400
+    response = client.post("/api/admin/bulk", headers=ADMIN, json={"mutations": [
+        {"op": "patch", "collection": "projects", "id": "uuid2", "doc": {"name": "Patched"}},
+        {"op": "create", "collection": "projects", "doc": PROJECT}]})
+    assert response.status_code == 409
+    assert client.get("/api/projects/uuid2").json()["name"] == "Amazon Checker"
+    assert client.post("/api/admin/bulk", headers=ADMIN, json={"mutations": []}).status_code == 422
+
+
+def test_export(client):
+    response = client.get("/api/export/projects", headers=ADMIN)
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+    docs = [json.loads(line) for line in response.text.splitlines()]
+    assert [d["id"] for d in docs] == ["uuid1", "uuid2"]
+    profile = client.get("/api/export/profile", headers=ADMIN).text.splitlines()
+    assert len(profile) == 1 and json.loads(profile[0])["id"] == "profile"
+    assert client.get("/api/export/secrets", headers=ADMIN).status_code == 422
+
+
+def test_rejected_reload_keeps_serving_exports(client, server, data_file):
+    data = json.loads(data_file.read_text())
+    data["projects"][0] = {"id": "uuid1", "name": "BROKEN"}
+    data_file.write_text(json.dumps(data))
+    with pytest.raises(ValidationError):
+        client.portal.call(server.reload_data)
+    client.post("/api/contact", json={"name": "Ada", "email": "ada@example.com", "subject": "Hi", "message": "Hello"})
+    client.portal.call(server.contact_queue.join)
+
+    projects = [json.loads(line) for line in client.get("/api/export/projects", headers=ADMIN).text.splitlines()]
+    assert [p["name"] for p in projects] == ["FufuBot", "Amazon Checker"]
+    contacts = client.get("/api/export/contacts", headers=ADMIN).text.splitlines()
+    assert [json.loads(line)["email"] for line in contacts] == ["ada@example.com"]
+
+
+def test_hand_edit_after_admin_write(client, server, data_file):
+    client.patch("/api/admin/projects/uuid1", json={"name": "ByAdmin"}, headers=ADMIN)
+    version = client.get("/api/changes").json()["version"]
+    data = json.loads(data_file.read_text())
+    assert data["projects"][0]["name"] == "ByAdmin"
+    data["projects"][0]["name"] = "ByHand"
+    data_file.write_text(json.dumps(data))
+    client.portal.call(server.reload_data)
+
+    assert client.get("/api/projects/uuid1").json()["name"] == "ByHand"
+    changes = client.get("/api/changes", params={"since": version}).json()["changes"]
+    assert [(c["id"], c["document"]["name"]) for c in changes] == [("uuid1", "ByHand")]
+    assert [p["name"] for p in persisted(data_file)["projects"]] == ["ByHand", "Amazon Checker"]
+
+
+def test_shared_storage_follows_other_workers(server, data_file, monkeypatch):
+    mongomock_motor = pytest.importorskip("mongomock_motor")
+    database = mongomock_motor.AsyncMongoMockClient()
+    monkeypatch.setattr(server, "storage", MotorBackend(client=database, seed_file=data_file))
+    with TestClient(server.app) as client:
+        seen = changelog.latest(server.snapshot.repo.data)
+        # Another worker writes to the same database, change log included.
+        other = MotorBackend(client=database)
+        client.portal.call(other.open)
+        project = {**client.portal.call(other.find, "projects", {"id": "uuid1"})[0], "name": "ByOtherWorker"}
+        first = client.portal.call(other.reserve_sequence, "changes", 1, seen)
+        client.portal.call(other.apply_batch, [{"op": "insert", "collection": "projects", "doc": project},
+                                               *changelog.journal_entries({}, [("projects", "uuid1")], first, 100)])
+        client.patch("/api/admin/projects/uuid2", json={"name": "ByUs"}, headers=ADMIN)
+        version = server.snapshot.version
+
+        assert client.portal.call(server.refresh_shared, seen) == first + 1
+        assert server.snapshot.version == version + 1
+        assert [p["name"] for p in client.get("/api/projects").json()] == ["ByOtherWorker", "ByUs"]
+        # Nothing new since, and our own writes don't need a rebuild.
+        assert client.portal.call(server.refresh_shared, first + 1) == first + 1
+        client.patch("/api/admin/projects/uuid2", json={"name": "ByUsAgain"}, headers=ADMIN)
+        client.portal.call(server.refresh_shared, first + 1)
+        assert server.snapshot.version == version + 2
+
+
+def test_import(client, data_file):
+    exported = client.get("/api/export/projects", headers=ADMIN).text
+    lines = [json.loads(line) for line in exported.splitlines()]
+    body = "\n".join([json.dumps({**lines[0], "name": "Renamed"}), "", "not json", json.dumps({"id": "x"}),
+                      json.dumps(PROJECT)])
+    response = client.post("/api/import/projects", content=body, headers=ADMIN)
+    assert response.status_code == 200
+    result = response.json()
+    assert result["imported"] == 2 and result["failed"] == 2
+    assert [e["line"] for e in result["errors"]] == [3, 4]
+    assert client.get("/api/projects/uuid1").json()["name"] == "Renamed"
+    assert {p["id"] for p in persisted(data_file)["projects"]} == {"uuid1", "uuid2", "p-new"}
+
+
+def test_import_applies_published_documents_once(client, server, data_file, monkeypatch):
+    monkeypatch.setattr(server, "IMPORT_BATCH", 2)
+    version = server.snapshot.version
+    body = "\n".join(json.dumps({**PROJECT, "id": f"p{i}"}) for i in range(5))
+    assert client.post("/api/import/projects", content=body, headers=ADMIN).json()["imported"] == 5
+    assert server.snapshot.version == version + 1
+    assert len(persisted(data_file)["projects"]) == 7
+
+
+def test_import_contacts(client, data_file):
+    contact = {"name": "Ada", "email": "ada@example.com", "subject": "Hi", "message": "Hello"}
+    response = client.post("/api/import/contacts", content=json.dumps(contact), headers=ADMIN)
+    assert response.json()["imported"] == 1
+    assert [c["email"] for c in client.get("/api/contacts", headers=ADMIN).json()] == ["ada@example.com"]
+    exported = client.get("/api/export/contacts", headers=ADMIN).text.splitlines()
+    assert json.loads(exported[0])["message"] == "Hello"
+    assert len(persisted(data_file)["contacts"]) == 1
+
+
+def test_import_normalizes_timezones(client, data_file):
+    contact = {"name": "Ada", "email": "ada@example.com", "subject": "Hi", "message": "Hello"}
+    body = "\n".join([json.dumps({**contact, "id": "a", "created_at": "2024-01-01T00:00:00Z"}),
+                      json.dumps({**contact, "id": "b", "created_at": "2024-01-01T03:00:00+02:00"}),
+                      json.dumps({**contact, "id": "c", "created_at": "0001-01-01T00:00:00+01:00"})])
+    result = client.post("/api/import/contacts", content=body, headers=ADMIN).json()
+    assert result["imported"] == 2 and [e["line"] for e in result["errors"]] == [3]
+    listed = client.get("/api/contacts", headers=ADMIN).json()
+    assert [(c["id"], c["created_at"]) for c in listed] == [("b", "2024-01-01T01:00:00"), ("a", "2024-01-01T00:00:00")]
+    assert client.post("/api/contact", json={**contact, "message": "new"}).status_code == 200
@@ -0,0 +1,90 @@
+"""Visit tracking, its stats and the /metrics endpoint."""
+import json
+
+import pytest
+from fastapi.testclient import TestClient
+
+from storage import MotorBackend
+from tests.conftest import ADMIN, persisted
+
+VISIT = {"page": "/projects", "referrer": "https://example.com", "userAgent": "pytest", "language": "fr"}
+
+
+def test_record_visits(client, server, data_file):
+    assert client.post("/api/analytics/visit", json=VISIT).json() == {"accepted": 1}
+    response = client.post("/api/analytics/visit", json={"visits": [VISIT, {**VISIT, "page": "/"}]})
+    assert response.status_code == 202
+    assert response.json() == {"accepted": 2}
+    # navigator.sendBeacon posts a list as text/plain.
+    response = client.post("/api/analytics/visit", content='[{"page": "/"}]', headers={"Content-Type": "text/plain"})
+    assert response.json() == {"accepted": 1}
+
+    stats = client.get("/api/analytics/stats").json()
+    assert stats["total"] == 4
+    assert stats["pages"] == {"/projects": 2, "/": 2}
+    assert stats["languages"]["fr"] == 3
+    assert sum(stats["hours"].values()) == 4
+
+    client.portal.call(server.flush_visits)
+    assert sum(doc["total"] for doc in persisted(data_file)["analytics"]) == 4
+
+
+def test_visits_survive_compaction(server, data_file):
+    with TestClient(server.app) as client:
+        client.post("/api/analytics/visit", json=[VISIT] * 5)
+        client.portal.call(server.flush_visits)
+        client.post("/api/analytics/visit", json=[VISIT] * 2)
+        # The admin write checkpoints data.json while two visits are unflushed.
+        client.patch("/api/admin/projects/uuid1", json={"featured": True}, headers=ADMIN)
+    assert sum(doc["total"] for doc in persisted(data_file)["analytics"]) == 7
+    with TestClient(server.app) as client:
+        assert client.get("/api/analytics/stats").json()["total"] == 7
+
+
+def test_shared_storage_counts_every_worker(server, data_file, monkeypatch):
+    mongomock_motor = pytest.importorskip("mongomock_motor")
+    database = mongomock_motor.AsyncMongoMockClient()
+    monkeypatch.setattr(server, "storage", MotorBackend(client=database, seed_file=data_file))
+    with TestClient(server.app) as client:
+        client.post("/api/analytics/visit", json=[VISIT] * 2)
+        client.portal.call(server.flush_visits)
+        client.post("/api/analytics/visit", json={**VISIT, "page": "/"})
+        # Another worker flushed visits of its own.
+        other = MotorBackend(client=database)
+        client.portal.call(other.open)
+        hour = next(iter(server.visit_rollups.hours))
+        client.portal.call(other.merge_counters, "analytics", [
+            {"id": hour, "total": 4, "pages": {"/about.html": 4}, "languages": {"en": 4}, "referrers": {}}])
+
+        stats = client.get("/api/analytics/stats").json()
+        assert stats["total"] == 7
+        assert stats["pages"] == {"/about.html": 4, "/projects": 2, "/": 1}
+        exported = client.get("/api/export/analytics", headers=ADMIN).text.splitlines()
+        assert [json.loads(line)["total"] for line in exported] == [7]
+
+
+def test_invalid_visits(client):
+    assert client.post("/api/analytics/visit", content="nope").status_code == 400
+    assert client.post("/api/analytics/visit", json=[VISIT] * 101).status_code == 400
+    assert client.post("/api/analytics/visit", json={"referrer": "x"}).status_code == 422
+    assert client.get("/api/analytics/stats").json()["total"] == 0
+
+
+def test_malformed_urls(client):
+    visits = [VISIT, {"page": "http://[oops", "referrer": "http://[oops"}]
+    assert client.post("/api/analytics/visit", json=visits).json() == {"accepted": 2}
+    stats = client.get("/api/analytics/stats").json()
+    assert stats["pages"] == {"/projects": 1, "(other)": 1}
+    assert stats["referrers"] == {"example.com": 1, "(direct)": 1}
+
+
+def test_metrics(client):
+    client.get("/api/projects")
+    client.get("/api/projects/missing")
+    response = client.get("/metrics")
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain")
+    text = response.text
+    assert "# TYPE http_request_duration_seconds histogram" in text
+    assert "data_version " in text
+    assert "contact_queue_depth 0" in text
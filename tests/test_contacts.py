@@ -0,0 +1,188 @@
+"""POST /api/contact and GET /api/contacts, including many submissions at once."""
+import json, base64, asyncio
+
+import httpx
+import pytest
+
+import jsoncodec
+from storage import JournalStore
+from tests.conftest import ADMIN, persisted
+
+CONTACT = {"name": "Ada", "email": "ada@example.com", "subject": "Hello", "message": "A bot please", "language": "en"}
+
+
+def wait_for_contacts(client, server):
+    """Contacts are persisted in batches; wait for the queued ones."""
+    client.portal.call(server.contact_queue.join)
+
+
+def test_create_contact(client, server, data_file):
+    response = client.post("/api/contact", json=CONTACT)
+    assert response.status_code == 200
+    body = response.json()
+    assert body["success"] is True and body["id"]
+    wait_for_contacts(client, server)
+
+    listed = client.get("/api/contacts", headers=ADMIN).json()
+    assert [c["id"] for c in listed] == [body["id"]]
+    assert listed[0]["status"] == "new"
+    assert {k: listed[0][k] for k in CONTACT} == CONTACT
+    assert [c["id"] for c in persisted(data_file)["contacts"]] == [body["id"]]
+
+
+def test_invalid_contact(client):
+    assert client.post("/api/contact", json={"name": "Ada"}).status_code == 422
+    assert client.post("/api/contact", json={**CONTACT, "email": 5}).status_code == 422
+
+
+def test_duplicate_contact_is_stored_once(client, server, data_file):
+    first = client.post("/api/contact", json=CONTACT).json()
+    second = client.post("/api/contact", json=CONTACT).json()
+    assert second == first
+    wait_for_contacts(client, server)
+    assert len(persisted(data_file)["contacts"]) == 1
+
+
+def test_rate_limit(client):
+    statuses = [client.post("/api/contact", json={**CONTACT, "message": str(i)}).status_code for i in range(3)]
+    assert statuses == [200, 200, 200]
+    response = client.post("/api/contact", json={**CONTACT, "message": "later"})
+    assert response.status_code == 429  # three per email address
+    assert int(response.headers["retry-after"]) > 0
+    response = client.post("/api/contact", json={**CONTACT, "email": "bob@example.com"})
+    assert response.status_code == 200
+    response = client.post("/api/contact", json={**CONTACT, "email": "eve@example.com"})
+    assert response.status_code == 429  # and five per address
+
+
+def test_contacts_pagination_and_filters(client, server, monkeypatch):
+    monkeypatch.setattr(server, "contact_limits", ())
+    ids = [client.post("/api/contact", json={**CONTACT, "message": str(i), "language": "fr" if i % 2 else "en"})
+           .json()["id"] for i in range(7)]
+    wait_for_contacts(client, server)
+
+    seen, cursor = [], None
+    while True:
+        params = {"limit": 3, **({"cursor": cursor} if cursor else {})}
+        response = client.get("/api/contacts", headers=ADMIN, params=params)
+        seen += [c["id"] for c in response.json()]
+        cursor = response.headers.get("x-next-cursor")
+        if cursor is None:
+            break
+        assert 'rel="next"' in response.headers["link"]
+    assert sorted(seen) == sorted(ids) and len(seen) == len(set(seen))
+
+    french = client.get("/api/contacts", headers=ADMIN, params={"language": "fr"}).json()
+    assert len(french) == 3 and all(c["language"] == "fr" for c in french)
+    assert client.get("/api/contacts", headers=ADMIN, params={"status": "replied"}).json() == []
+    assert client.get("/api/contacts", headers=ADMIN, params={"cursor": "not-a-cursor"}).status_code == 400
+    assert client.get("/api/contacts", headers=ADMIN, params={"limit": 0}).status_code == 422
+
+
+def test_timezones_in_timeline(client, server):
+    docs = [{**CONTACT, "id": "aware", "created_at": "2024-01-01T12:00:00+02:00"},
+            {**CONTACT, "id": "naive", "created_at": "2024-01-01T11:00:00"},
+            {**CONTACT, "id": "utc", "created_at": "2024-01-01T09:00:00Z"}]
+    for doc in docs:
+        server.snapshot.repo.insert("contacts", doc)
+    assert [c["id"] for c in client.get("/api/contacts", headers=ADMIN).json()] == ["naive", "aware", "utc"]
+
+    cursor = base64.urlsafe_b64encode(json.dumps(["2024-01-01T11:00:00+01:00", "x"]).encode()).decode()
+    response = client.get("/api/contacts", headers=ADMIN, params={"cursor": cursor})
+    assert response.status_code == 200
+    assert [c["id"] for c in response.json()] == ["aware", "utc"]
+    cursor = base64.urlsafe_b64encode(json.dumps(["0001-01-01T00:00:00+05:00", "x"]).encode()).decode()
+    assert client.get("/api/contacts", headers=ADMIN, params={"cursor": cursor}).status_code == 400
+
+
+def test_indexing_failure_does_not_persist_again(client, server, data_file):
+    def broken(collection, doc):
+        raise TypeError("can't compare offset-naive and offset-aware datetimes")
+    with pytest.MonkeyPatch.context() as patch:
+        patch.setattr(server.snapshot.repo, "insert", broken)
+        first = client.post("/api/contact", json=CONTACT).json()
+        wait_for_contacts(client, server)
+    second = client.post("/api/contact", json={**CONTACT, "message": "again"}).json()
+    wait_for_contacts(client, server)
+    assert [c["id"] for c in persisted(data_file)["contacts"]] == [first["id"], second["id"]]
+    assert [c["id"] for c in client.get("/api/contacts", headers=ADMIN).json()] == [second["id"]]
+
+
+def test_unpersistable_contacts_are_dead_lettered(client, server, data_file):
+    async def broken(collection, docs):
+        raise ValueError("not serializable")
+    with pytest.MonkeyPatch.context() as patch:
+        patch.setattr(server.storage, "insert_many", broken)
+        contact_id = client.post("/api/contact", json=CONTACT).json()["id"]
+        wait_for_contacts(client, server)
+    lines = data_file.with_suffix(".deadletter.ndjson").read_bytes().splitlines()
+    assert [jsoncodec.loads(line)["id"] for line in lines] == [contact_id]
+    client.post("/api/contact", json={**CONTACT, "message": "again"})
+    wait_for_contacts(client, server)
+    assert len(persisted(data_file)["contacts"]) == 1
+
+
+# ----- CONCURRENCY -----
+async def post_all(server, bodies):
+    transport = httpx.ASGITransport(app=server.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        return await asyncio.gather(*(client.post("/api/contact", json=body) for body in bodies))
+
+
+@pytest.mark.anyio
+async def test_concurrent_contacts_are_all_persisted(server, data_file, monkeypatch):
+    monkeypatch.setattr(server, "contact_limits", ())
+    bodies = [{**CONTACT, "name": f"Sender {i}", "email": f"sender{i}@example.com", "message": f"Message {i} " * 20}
+              for i in range(300)]
+    await server.app.router.startup()
+    try:
+        responses = await post_all(server, bodies)
+    finally:
+        await server.app.router.shutdown()
+
+    assert [r.status_code for r in responses] == [200] * len(bodies)
+    ids = [r.json()["id"] for r in responses]
+    assert len(set(ids)) == len(ids)
+    stored = {c["id"]: c for c in persisted(data_file)["contacts"]}
+    assert len(stored) == len(persisted(data_file)["contacts"]) == len(bodies)
+    for contact_id, body in zip(ids, bodies):
+        assert {k: stored[contact_id][k] for k in body} == body
+
+
+@pytest.mark.anyio
+async def test_concurrent_duplicates_are_stored_once(server, data_file, monkeypatch):
+    monkeypatch.setattr(server, "contact_limits", ())
+    await server.app.router.startup()
+    try:
+        responses = await post_all(server, [CONTACT] * 200)
+    finally:
+        await server.app.router.shutdown()
+
+    assert {r.status_code for r in responses} == {200}
+    assert len({r.json()["id"] for r in responses}) == 1
+    assert len(persisted(data_file)["contacts"]) == 1
+
+
+@pytest.mark.anyio
+async def test_concurrent_contacts_survive_compaction(server, data_file, monkeypatch):
+    # Maintenance compacts the journal into data.json every few writes while we post.
+    store = JournalStore(data_file, fsync_interval=0.01, compact_every=3)
+    monkeypatch.setattr(server, "store", store)
+    monkeypatch.setattr(server, "storage", type(server.storage)(store))
+    monkeypatch.setattr(server, "contact_limits", ())
+    monkeypatch.setattr(server.contact_queue, "batch_size", 7)
+    bodies = [{**CONTACT, "email": f"sender{i}@example.com", "message": f"Message {i}"} for i in range(400)]
+    await server.app.router.startup()
+    try:
+        responses = []
+        for start in range(0, len(bodies), 50):
+            responses += await post_all(server, bodies[start:start + 50])
+            await asyncio.sleep(0.02)
+    finally:
+        await server.app.router.shutdown()
+
+    assert {r.status_code for r in responses} == {200}
+    assert jsoncodec.loads(data_file.read_bytes())["contacts"]  # compacted at least once
+    contacts = persisted(data_file)["contacts"]
+    assert sorted(c["id"] for c in contacts) == sorted(r.json()["id"] for r in responses)
+    assert sorted(c["message"] for c in contacts) == sorted(b["message"] for b in bodies)
@@ -0,0 +1,109 @@
+"""The public read endpoints: projects, services, profile, testimonials,
+search, bootstrap and changes."""
+from tests.conftest import ADMIN
+
+
+def test_root(client):
+    response = client.get("/api/")
+    assert response.status_code == 200
+    assert response.json() == {"message": "FufuDev Portfolio API", "version": "1.0.0"}
+
+
+def test_projects(client):
+    response = client.get("/api/projects")
+    assert response.status_code == 200
+    projects = response.json()
+    assert {p["name"] for p in projects} == {"FufuBot", "Amazon Checker"}
+    for project in projects:
+        assert project["type"] == "Discord Bot"
+        assert {"id", "name", "description", "technologies", "status", "type"} <= project.keys()
+        assert {"en", "fr"} <= project["description"].keys()
+
+
+def test_projects_filters_and_fields(client):
+    assert len(client.get("/api/projects", params={"featured": True}).json()) == 2
+    assert client.get("/api/projects", params={"type": "Website"}).json() == []
+    projects = client.get("/api/projects", params={"fields": "id,name"}).json()
+    assert projects and all(p.keys() == {"id", "name"} for p in projects)
+    response = client.get("/api/projects", params={"fields": "id,password"})
+    assert response.status_code == 400
+
+
+def test_project_by_id(client):
+    response = client.get("/api/projects/uuid1")
+    assert response.status_code == 200
+    assert response.json()["name"] == "FufuBot"
+    response = client.get("/api/projects/missing")
+    assert response.status_code == 404
+
+
+def test_localized(client):
+    response = client.get("/api/projects/uuid1", params={"lang": "fr"})
+    assert response.headers["content-language"] == "fr"
+    assert response.json()["description"].startswith("Bot Discord avancé")
+    response = client.get("/api/services", params={"lang": "auto"}, headers={"Accept-Language": "fr-CA,en;q=0.5"})
+    assert response.headers["content-language"] == "fr"
+    assert "Accept-Language" in response.headers["vary"]
+    assert all(isinstance(s["description"], str) for s in response.json())
+
+
+def test_services_profile_testimonials(client):
+    services = client.get("/api/services").json()
+    assert [s["id"] for s in services] == ["uuid3", "uuid4"]
+    profile = client.get("/api/profile").json()
+    assert profile["id"] == "profile" and {"name", "email", "bio", "skills"} <= profile.keys()
+    testimonials = client.get("/api/testimonials").json()
+    assert {t["id"] for t in testimonials} == {"uuid5", "uuid6"}
+    assert all(t["approved"] for t in testimonials)
+
+
+def test_etag(client):
+    response = client.get("/api/projects")
+    etag = response.headers["etag"]
+    revalidated = client.get("/api/projects", headers={"If-None-Match": etag})
+    assert revalidated.status_code == 304
+    assert revalidated.content == b""
+    client.patch("/api/admin/projects/uuid1", json={"name": "FufuBot 2"}, headers=ADMIN)
+    assert client.get("/api/projects", headers={"If-None-Match": etag}).status_code == 200
+
+
+def test_search(client):
+    response = client.get("/api/search", params={"q": "amaz"})
+    assert response.status_code == 200
+    body = response.json()
+    assert body["query"] == "amaz"
+    assert body["results"][0]["id"] == "uuid2"
+    assert body["results"][0]["collection"] == "projects"
+    assert client.get("/api/search", params={"q": "discord", "collection": "services"}).json()["results"]
+    assert client.get("/api/search", params={"q": "x", "collection": "contacts"}).status_code == 400
+    assert client.get("/api/search", params={"q": ""}).status_code == 422
+
+
+def test_bootstrap(client):
+    response = client.get("/api/bootstrap", params={"lang": "en"})
+    assert response.status_code == 200
+    body = response.json()
+    assert {"projects", "services", "profile", "testimonials"} <= body.keys()
+    assert "max-age=60" in response.headers["cache-control"]
+    digest = response.headers["link"].split("v=")[1].split(">")[0]
+    pinned = client.get("/api/bootstrap", params={"lang": "en", "v": digest})
+    assert "immutable" in pinned.headers["cache-control"]
+    assert pinned.content == response.content
+
+
+def test_changes(client):
+    client.patch("/api/admin/testimonials/uuid5", json={"rating": 4}, headers=ADMIN)
+    first = client.get("/api/changes").json()
+    assert first["reset"] is True and first["version"] > 0
+    assert {(c["collection"], c["id"]) for c in first["changes"]} >= {("projects", "uuid1"), ("profile", "profile")}
+
+    client.patch("/api/admin/projects/uuid1", json={"status": "archived"}, headers=ADMIN)
+    client.patch("/api/admin/services/uuid3", json={"order": 9}, headers=ADMIN)
+    body = client.get("/api/changes", params={"since": first["version"]}).json()
+    assert body["reset"] is False and body["more"] is False
+    ops = {(c["collection"], c["id"]): c["op"] for c in body["changes"]}
+    assert ops == {("projects", "uuid1"): "delete", ("services", "uuid3"): "upsert"}
+
+    latest = client.get("/api/changes", params={"since": body["version"]}).json()
+    assert latest["changes"] == [] and latest["version"] == body["version"]
+    assert client.get("/api/changes", params={"since": 10**9}).json()["reset"] is True
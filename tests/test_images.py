@@ -0,0 +1,63 @@
+"""Image uploads and their resized variants."""
+import io
+
+import pytest
+
+import images as images_module
+from tests.conftest import ADMIN
+
+Image = pytest.importorskip("PIL.Image")
+
+
+def png(width=640, height=480) -> bytes:
+    buffer = io.BytesIO()
+    Image.new("RGB", (width, height), (200, 40, 90)).save(buffer, "PNG")
+    return buffer.getvalue()
+
+
+def test_upload_and_variants(client):
+    response = client.post("/api/images", content=png(), headers=ADMIN)
+    assert response.status_code == 201
+    upload = response.json()
+    assert (upload["format"], upload["width"], upload["height"]) == ("png", 640, 480)
+
+    original = client.get(upload["url"])
+    assert original.status_code == 200
+    assert original.headers["content-type"] == "image/png"
+    assert "immutable" in original.headers["cache-control"]
+
+    variant = client.get(f"{upload['url']}/w256.webp")
+    assert variant.status_code == 200
+    assert variant.headers["content-type"] == "image/webp"
+    assert Image.open(io.BytesIO(variant.content)).size == (256, 192)
+    assert client.get(f"{upload['url']}/w256.webp").content == variant.content
+    assert client.get(f"{upload['url']}/w300.webp").status_code == 404
+    assert client.get(f"{upload['url']}/w256.bmp").status_code == 404
+
+
+def test_missing_image(client):
+    assert client.get("/api/images/" + "0" * 32).status_code == 404
+    assert client.get("/api/images/" + "0" * 32 + "/w256.webp").status_code == 404
+
+
+def test_rejected_uploads(client, server, monkeypatch):
+    assert client.post("/api/images", content=b"not an image", headers=ADMIN).status_code == 415
+    monkeypatch.setattr(server.images, "max_upload", 1000)
+    assert client.post("/api/images", content=png(), headers=ADMIN).status_code == 413
+
+
+def test_too_many_pixels(tmp_path, monkeypatch):
+    path = tmp_path / "large.png"
+    path.write_bytes(png(100, 100))
+    assert images_module.probe(str(path)) == ("PNG", 100, 100)
+    monkeypatch.setattr(images_module, "MAX_PIXELS", 9_999)
+    with pytest.raises(images_module.InvalidImage):
+        images_module.probe(str(path))
+
+
+def test_uploaded_image_in_responses(client):
+    url = client.post("/api/images", content=png(), headers=ADMIN).json()["url"]
+    client.patch("/api/admin/projects/uuid1", json={"image_url": url}, headers=ADMIN)
+    image_url = client.get("/api/projects/uuid1").json()["image_url"]
+    assert image_url.startswith(url + "/w800.")
+    assert client.get(image_url).status_code == 200
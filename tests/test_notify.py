@@ -0,0 +1,281 @@
+"""The contact notification dispatcher, against local webhook and SMTP stand-ins."""
+import json, hmac, asyncio, inspect, hashlib, threading, socketserver
+from email import message_from_bytes, policy
+
+import httpx
+import pytest
+
+from notify import FileOutbox, Notifier, SmtpSink, WebhookSink
+
+pytestmark = pytest.mark.anyio
+
+CONTACTS = [{"id": f"c{i}", "name": f"Sender {i}", "email": f"sender{i}@example.com", "subject": f"Hello {i}",
+             "message": f"Message {i}", "created_at": "2026-01-01T12:00:00"} for i in range(3)]
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1_000_000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+class Webhook:
+    """Answers each POST with the next of `statuses`; the last one repeats."""
+    def __init__(self, *statuses, headers=None):
+        self.statuses = list(statuses)
+        self.headers = headers or {}
+        self.requests = []
+
+    def handle(self, request: httpx.Request) -> httpx.Response:
+        self.requests.append(request)
+        status = self.statuses.pop(0) if len(self.statuses) > 1 else self.statuses[0]
+        return httpx.Response(status, headers=self.headers if status >= 300 else {})
+
+    def sink(self, secret=None) -> WebhookSink:
+        client = httpx.AsyncClient(transport=httpx.MockTransport(self.handle))
+        return WebhookSink("http://hooks.test/contacts", secret=secret, client=client)
+
+    def payloads(self):
+        return [json.loads(r.content) for r in self.requests]
+
+
+async def eventually(condition, timeout: float = 5.0):
+    """Wait until `condition()` (maybe a coroutine) is true."""
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + timeout
+    while True:
+        result = condition()
+        if inspect.isawaitable(result):
+            result = await result
+        if result:
+            return
+        assert loop.time() < deadline, "condition not met in time"
+        await asyncio.sleep(0.01)
+
+
+def dispatcher(sink, tmp_path, **options) -> Notifier:
+    options = {"digest_window": 0.05, "base_delay": 30, "max_delay": 600, "poll_interval": 3600, **options}
+    return Notifier([sink], FileOutbox(tmp_path / "outbox.json"), **options)
+
+
+def delivered(notifier, webhook, requests: int):
+    async def check():
+        return len(webhook.requests) >= requests and await notifier.outbox.count() == 0
+    return check
+
+
+def attempted(notifier, webhook, requests: int):
+    async def check():
+        messages = notifier.outbox.messages
+        return len(webhook.requests) >= requests and bool(messages) and messages[0]["attempts"] == requests
+    return check
+
+
+# ----- WEBHOOK -----
+async def test_contacts_are_sent_as_one_signed_digest(tmp_path):
+    webhook = Webhook(200)
+    notifier = dispatcher(webhook.sink(secret="s3cret"), tmp_path)
+    await notifier.start()
+    try:
+        notifier.notify(CONTACTS)
+        await eventually(delivered(notifier, webhook, 1))
+    finally:
+        await notifier.close()
+
+    [payload] = webhook.payloads()
+    assert payload["event"] == "contacts.created"
+    assert payload["summary"] == "3 new contacts"
+    assert [c["id"] for c in payload["contacts"]] == ["c0", "c1", "c2"]
+    request = webhook.requests[0]
+    expected = hmac.new(b"s3cret", request.content, hashlib.sha256).hexdigest()
+    assert request.headers["x-signature"] == "sha256=" + expected
+
+
+async def test_failed_delivery_is_retried_with_backoff(tmp_path):
+    webhook = Webhook(503, 200, headers={"Retry-After": "900"})
+    clock = Clock()
+    notifier = dispatcher(webhook.sink(), tmp_path, clock=clock)
+    await notifier.start()
+    try:
+        notifier.notify(CONTACTS[:1])
+        await eventually(attempted(notifier, webhook, 1))
+        [message] = notifier.outbox.messages
+        assert "503" in message["last_error"]
+        assert message["next_attempt"] == clock.now + 900  # Retry-After beats the backoff
+
+        await notifier.deliver_due()
+        assert len(webhook.requests) == 1  # not due yet
+        clock.now += 900
+        await notifier.deliver_due()
+        await eventually(delivered(notifier, webhook, 2))
+    finally:
+        await notifier.close()
+    assert webhook.payloads()[1]["summary"] == "New contact: Hello 0"
+
+
+async def test_gives_up_after_max_attempts(tmp_path):
+    webhook = Webhook(500)
+    clock = Clock()
+    notifier = dispatcher(webhook.sink(), tmp_path, clock=clock, max_attempts=3)
+    await notifier.start()
+    try:
+        notifier.notify(CONTACTS[:1])
+        await eventually(attempted(notifier, webhook, 1))
+        for _ in range(2):
+            clock.now += 600
+            await notifier.deliver_due()
+        assert len(webhook.requests) == 3
+        assert await notifier.outbox.count() == 0
+    finally:
+        await notifier.close()
+
+
+async def test_permanent_failure_is_not_retried(tmp_path):
+    webhook = Webhook(400)
+    notifier = dispatcher(webhook.sink(), tmp_path)
+    await notifier.start()
+    try:
+        notifier.notify(CONTACTS[:1])
+        await eventually(delivered(notifier, webhook, 1))
+    finally:
+        await notifier.close()
+    assert len(webhook.requests) == 1
+
+
+def test_backoff_grows_with_jitter():
+    notifier = Notifier([], FileOutbox("unused.json"), base_delay=10, max_delay=100)
+    for attempts, ceiling in ((1, 10), (2, 20), (3, 40), (8, 100)):
+        delays = [notifier.backoff(attempts) for _ in range(50)]
+        assert all(ceiling / 2 <= d <= ceiling for d in delays)
+        assert len(set(delays)) > 1
+
+
+# ----- OUTBOX -----
+async def test_outbox_survives_a_restart(tmp_path):
+    # Shut down while the contact is still waiting for its digest window.
+    webhook = Webhook(200)
+    notifier = dispatcher(webhook.sink(), tmp_path, digest_window=60)
+    await notifier.start()
+    notifier.notify(CONTACTS[:2])
+    await notifier.close()
+    assert webhook.requests == []
+
+    restarted = dispatcher(webhook.sink(), tmp_path)
+    await restarted.start()
+    try:
+        await eventually(delivered(restarted, webhook, 1))
+    finally:
+        await restarted.close()
+    assert [c["id"] for c in webhook.payloads()[0]["contacts"]] == ["c0", "c1"]
+
+
+async def test_unconfigured_sink_messages_are_dropped(tmp_path):
+    webhook = Webhook(503)
+    clock = Clock()
+    notifier = dispatcher(webhook.sink(), tmp_path, clock=clock)
+    await notifier.start()
+    notifier.notify(CONTACTS[:1])
+    await eventually(attempted(notifier, webhook, 1))
+    await notifier.close()
+
+    smtp_only = Notifier([SmtpSink("127.0.0.1", 1, security="none")], FileOutbox(tmp_path / "outbox.json"),
+                         clock=clock)
+    await smtp_only.outbox.open()
+    assert await smtp_only.outbox.count() == 1
+    clock.now += 3600
+    await smtp_only.deliver_due()
+    assert await smtp_only.outbox.count() == 0
+    await smtp_only.outbox.close()
+
+
+# ----- SMTP -----
+class SmtpHandler(socketserver.StreamRequestHandler):
+    """Just enough SMTP for smtplib; RCPT is answered with the server's `rcpt_reply`."""
+    def handle(self):
+        server = self.server
+        server.connections += 1
+        self.reply("220 localhost ready")
+        while True:
+            line = self.rfile.readline()
+            if not line:
+                return
+            command = line[:4].decode().upper()
+            if command in ("EHLO", "HELO"):
+                self.reply("250 localhost")
+            elif command == "MAIL":
+                self.reply("250 OK")
+            elif command == "RCPT":
+                self.reply(server.rcpt_reply)
+            elif command == "DATA":
+                self.reply("354 End data with <CR><LF>.<CR><LF>")
+                data = b""
+                while not data.endswith(b"\r\n.\r\n"):
+                    data += self.rfile.readline()
+                server.messages.append(message_from_bytes(data[:-5], policy=policy.default))
+                self.reply("250 Queued")
+            elif command == "RSET" or command == "NOOP":
+                self.reply("250 OK")
+            elif command == "QUIT":
+                self.reply("221 Bye")
+                return
+            else:
+                self.reply("502 Not implemented")
+
+    def reply(self, text: str):
+        self.wfile.write(text.encode() + b"\r\n")
+
+
+@pytest.fixture
+def smtp_server():
+    server = socketserver.ThreadingTCPServer(("127.0.0.1", 0), SmtpHandler)
+    server.daemon_threads = True
+    server.connections, server.messages, server.rcpt_reply = 0, [], "250 OK"
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def smtp_sink(server) -> SmtpSink:
+    return SmtpSink("127.0.0.1", server.server_address[1], sender="site@example.com",
+                    recipients=["owner@example.com"], security="none")
+
+
+async def test_smtp_digest_reuses_one_session(tmp_path, smtp_server):
+    notifier = dispatcher(smtp_sink(smtp_server), tmp_path)
+    await notifier.start()
+    try:
+        notifier.notify(CONTACTS[:2])
+        await eventually(lambda: len(smtp_server.messages) == 1)
+        notifier.notify(CONTACTS[2:])
+        await eventually(lambda: len(smtp_server.messages) == 2)
+    finally:
+        await notifier.close()
+
+    digest, single = smtp_server.messages
+    assert digest["Subject"] == "2 new contacts"
+    assert digest["To"] == "owner@example.com"
+    assert "Message 0" in digest.get_content() and "Message 1" in digest.get_content()
+    assert single["Subject"] == "New contact: Hello 2"
+    assert single["Reply-To"] == "sender2@example.com"
+    assert smtp_server.connections == 1
+
+
+async def test_smtp_rejection_is_permanent(tmp_path, smtp_server):
+    smtp_server.rcpt_reply = "550 No such user"
+    notifier = dispatcher(smtp_sink(smtp_server), tmp_path)
+    await notifier.start()
+    try:
+        notifier.notify(CONTACTS[:1])
+        await eventually(lambda: smtp_server.connections == 1)  # the message is in the outbox by now
+        await eventually(lambda: outbox_empty(notifier))
+    finally:
+        await notifier.close()
+    assert smtp_server.messages == []
+
+
+async def outbox_empty(notifier) -> bool:
+    return await notifier.outbox.count() == 0